@@ -1,9 +1,485 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import re, os, sys
-import pandas as pd
+import re, os, sys, csv, glob, gzip, mmap, itertools, argparse
+from collections import deque
+import instrumentation
+from instrumentation import stage
+# pandas, openpyxl, tkinter and the process pool are imported where they are used: cleaning one
+# PSORTb/CELLO report or UniProt export from a script should not pay for loading them (see startup_time.py)
+
+# -----------------------------
+# Cleaning functions (one file each; raise on failure)
+# -----------------------------
+def open_text(path, encoding=None):
+    # Opens a report for reading as text, transparently decompressing gzip input
+    with open(path, 'rb') as f:
+        gzipped = f.read(2) == b'\x1f\x8b'
+    if gzipped:
+        return gzip.open(path, 'rt', encoding=encoding)
+    return open(path, 'r', encoding=encoding)
+
+def _output_base(input_path):
+    # report.txt.gz -> report, so compressed inputs get the same output names as plain ones
+    if input_path.endswith(".gz"):
+        input_path = input_path[:-3]
+    return os.path.splitext(input_path)[0]
+
+def iter_psortb_records(lines):
+    # Yields (SeqID, localization) from PSORTb "normal" output while reading.
+    # Only the current line and the one after it are held, so memory stays flat.
+    seqid_found, final_prediction_found = None, None
+    prev = None
+    for line in itertools.chain(lines, [None]):
+        if prev is not None:
+            if 'SeqID:' in prev:
+                seqid_found = prev.split('SeqID: ')[-1].strip()
+            if 'Final Prediction:' in prev and line is not None:
+                final_prediction_found = re.sub(r'\d+', '', line.strip()).strip()
+            if seqid_found and final_prediction_found:
+                yield seqid_found, final_prediction_found
+                seqid_found, final_prediction_found = None, None
+        prev = line
+
+def iter_cello_records(lines):
+    # Yields the last two columns (SeqID, localization) of every CELLO line that has them
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 2:
+            yield fields[-2], fields[-1]
+
+def _write_records(records, output_path):
+    count = 0
+    with open(output_path, 'w') as outfile:
+        for seqid, localization in records:
+            outfile.write(f"{seqid}\t{localization}\n")
+            count += 1
+    return count
+
+def _clean_localization_file(tool, iter_records, input_path, output_path, store, run):
+    # Reading, parsing and writing are interleaved (streamed), so they are one stage.
+    # With store (a results_store.py database), the cleaned records are also loaded into it.
+    output_path = output_path or _output_base(input_path) + "_cleaned.txt"
+    with stage("clean", tool=tool, file=input_path) as s, open_text(input_path) as infile:
+        s.add(_write_records(iter_records(infile), output_path))
+        s.read(input_path)
+        s.wrote(output_path)
+    if store:
+        from results_store import run_name, store_localization, read_cleaned_localizations
+        store_localization(store, run or run_name(input_path), tool, read_cleaned_localizations(output_path),
+                           source=input_path)
+    return output_path
+
+def clean_psortb_file(input_path, output_path=None, store=None, run=None):
+    return _clean_localization_file("psortb", iter_psortb_records, input_path, output_path, store, run)
+
+def clean_cello_file(input_path, output_path=None, store=None, run=None):
+    return _clean_localization_file("cello", iter_cello_records, input_path, output_path, store, run)
+
+# DAVID terms are 'GO:0006412~translation'; the ID prefix before '~' is kept
+TERM_SUFFIX = re.compile(r'~.*')
+
+def strip_term(term): return TERM_SUFFIX.sub('', term).strip()
+
+DAVID_REQUIRED = ['Term','Count','PValue','FDR','Genes']
+DAVID_FORMATS = ("xlsx", "csv", "parquet")
+
+def read_david_chart(input_path):
+    # Reads a DAVID chart into (overview, significant, gene blocks) with column-wise operations.
+    # Same row rules as the original line-by-line cleaner: rows whose last column is blank or
+    # missing are skipped, as are rows whose PValue or FDR is not a number; FDR <= 0.05 is significant.
+    import pandas as pd
+    df = pd.read_csv(input_path, sep='\t', dtype=str, encoding='utf-8', keep_default_na=False,
+                     quoting=csv.QUOTE_NONE, on_bad_lines='skip')
+    df.columns = [str(c).strip() for c in df.columns]
+    missing = [c for c in DAVID_REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing {missing}")
+    df = df[df.iloc[:, -1].fillna('').str.strip() != '']
+    pval = pd.to_numeric(df['PValue'].str.strip(), errors='coerce')
+    fdr = pd.to_numeric(df['FDR'].str.strip(), errors='coerce')
+    keep = pval.notna() & fdr.notna()
+    terms = df.loc[keep, 'Term'].str.replace(TERM_SUFFIX, '', regex=True).str.strip()
+    overview = pd.DataFrame({'Term': terms, 'Count': df.loc[keep, 'Count'],
+                             'PValue': pval[keep], 'FDR': fdr[keep]})
+    sig = overview.loc[overview['FDR'] <= 0.05, ['Term', 'Count', 'FDR']]
+    gene_blocks = terms + '\n' + df.loc[keep, 'Genes'] + '\n'
+    return overview.reset_index(drop=True), sig.reset_index(drop=True), gene_blocks.tolist()
+
+def _write_sheets_xlsx(path, sheets):
+    # Streams rows through a write-only workbook, so memory does not grow with the number of rows
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    for name, frame in sheets.items():
+        ws = wb.create_sheet(name)
+        ws.append(list(frame.columns))
+        for row in frame.itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(path)
+
+def clean_david_file(input_path, output_format="xlsx"):
+    if output_format not in DAVID_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}'. Choose from: {', '.join(DAVID_FORMATS)}")
+    with stage("load", tool="david", file=input_path) as s:
+        overview, sig, gene_blocks = read_david_chart(input_path)
+        s.add(len(overview))
+        s.read(input_path)
+    base = os.path.splitext(input_path)[0]
+    genes_out = base+"_genes_cleaned.txt"
+    with stage("write", tool="david", file=input_path) as s:
+        outputs = _write_david_outputs(base, output_format, overview, sig)
+        with open(genes_out,"w",encoding="utf-8") as g: g.write("\n".join(gene_blocks))
+        s.add(len(overview))
+        s.wrote(genes_out, *outputs)
+    return outputs + (genes_out,)
+
+def _write_david_outputs(base, output_format, overview, sig):
+    if output_format == "xlsx":
+        outputs = (base+"_cleaned.xlsx",)
+        _write_sheets_xlsx(outputs[0], {"Overview": overview, "Sig_Categories": sig})
+    elif output_format == "csv":
+        outputs = (base+"_cleaned_overview.csv", base+"_cleaned_sig.csv")
+        overview.to_csv(outputs[0], index=False)
+        sig.to_csv(outputs[1], index=False)
+    else:
+        outputs = (base+"_cleaned_overview.parquet", base+"_cleaned_sig.parquet")
+        overview.to_parquet(outputs[0], index=False)
+        sig.to_parquet(outputs[1], index=False)
+    return outputs
+
+# Every byte except ASCII letters; bytes.translate drops these from sequence lines in one C-level pass
+_NON_RESIDUE_BYTES = bytes(b for b in range(256) if not (65 <= b <= 90 or 97 <= b <= 122))
+FASTA_CHUNK_SIZE = 64 * 1024 * 1024
+
+def _uniprot_chunk_to_fasta(data):
+    # Converts a run of whole UniProt records (bytes) to FASTA bytes; same rules as the original line parser.
+    # Also returns (name, length, offset of the sequence within the returned bytes) for the .fai index.
+    out, index, pos = [], [], 0
+    entry_id, seq, in_seq = None, [], False
+
+    def emit():
+        nonlocal pos
+        sequence = b"".join(seq)
+        record = b">%s\n%s\n" % (entry_id, sequence)
+        index.append((entry_id, len(sequence), pos + len(entry_id) + 2))
+        out.append(record)
+        pos += len(record)
+
+    for raw in data.split(b"\n"):
+        # Line codes start in column 0; sequence lines are indented and may begin with e.g. "ID" residues
+        line = raw.strip()
+        if raw.startswith(b"ID"):
+            if entry_id and seq: emit()
+            entry_id = line.split()[1].split(b"_")[0]
+            seq, in_seq = [], False
+        elif raw.startswith(b"SQ"): in_seq = True
+        elif raw.startswith(b"//"):
+            if entry_id and seq: emit()
+            entry_id, seq, in_seq = None, [], False
+        elif in_seq: seq.append(line.translate(None, _NON_RESIDUE_BYTES))
+    return b"".join(out), index
+
+def _record_chunks(buf, chunk_size):
+    # Yields (start, end) offsets of roughly chunk_size bytes, each ending just after a "//" line,
+    # where the parser state is always reset, so chunks can be converted independently
+    start, size = 0, len(buf)
+    while start < size:
+        cut = buf.find(b"\n//", min(start + chunk_size, size) - 1)
+        if cut == -1:
+            yield start, size
+            return
+        eol = buf.find(b"\n", cut + 3)
+        end = size if eol == -1 else eol + 1
+        yield start, end
+        start = end
+
+def _convert_uniprot_range(input_path, start, end):
+    # Worker entry point: re-maps the file (mmap objects cannot be pickled) and converts one chunk
+    with open(input_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        return _uniprot_chunk_to_fasta(buf[start:end])
+
+def clean_fasta_metadata_file(input_path, workers=1, chunk_size=FASTA_CHUNK_SIZE, output_path=None):
+    # Memory-maps the UniProt text export and converts it chunk by chunk, in parallel when workers > 1.
+    # Chunks are written in input order, so the output matches the sequential converter byte for byte.
+    # A samtools-style .fai index is written next to the FASTA at the same time.
+    output_path = output_path or os.path.splitext(input_path)[0] + "_cleaned.fasta"
+    # Conversion and writing overlap, so the whole file is one stage
+    with stage("convert", tool="fasta", file=input_path) as s:
+        s.add(_convert_uniprot_file(input_path, output_path, workers, chunk_size))
+        s.read(input_path)
+        s.wrote(output_path, output_path + ".fai")
+    return output_path
+
+def _convert_uniprot_file(input_path, output_path, workers, chunk_size):
+    # Returns the number of records written. The .fai is stamped once both files are closed: the FASTA
+    # can be flushed after it, and an index older than its FASTA is taken for stale and rebuilt by a
+    # full scan (read_fasta_index).
+    written = _write_uniprot_fasta(input_path, output_path, workers, chunk_size)
+    os.utime(output_path + ".fai")
+    return written
+
+def _write_uniprot_fasta(input_path, output_path, workers, chunk_size):
+    written = 0
+    with open(input_path, 'rb') as f, open(output_path, 'wb') as outfile, \
+            open(output_path + ".fai", 'w') as faifile:
+
+        def write_chunk(converted):
+            nonlocal written
+            data, index = converted
+            base = outfile.tell()
+            outfile.write(data)
+            for name, length, offset in index:
+                faifile.write(f"{name.decode()}\t{length}\t{base + offset}\t{length}\t{length + 1}\n")
+            written += len(index)
+
+        if os.fstat(f.fileno()).st_size == 0:
+            return written
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            chunks = list(_record_chunks(buf, chunk_size))
+            if workers == 1 or len(chunks) == 1:
+                for start, end in chunks:
+                    write_chunk(_uniprot_chunk_to_fasta(buf[start:end]))
+                return written
+        # Keep a bounded window of chunks in flight so finished output never piles up in memory
+        from concurrent.futures import ProcessPoolExecutor
+        window = 2 * (workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for start, end in chunks:
+                pending.append(pool.submit(_convert_uniprot_range, input_path, start, end))
+                if len(pending) >= window:
+                    write_chunk(pending.popleft().result())
+            while pending:
+                write_chunk(pending.popleft().result())
+    return written
+
+# -----------------------------
+# FASTA index (.fai) and subset extraction
+# -----------------------------
+def write_fasta_index(fasta_path):
+    # Scans any FASTA file (single- or multi-line sequences) and writes a samtools-style .fai next to it:
+    # name, sequence length, byte offset of the sequence, residues per line, bytes per line
+    fai_path = fasta_path + ".fai"
+    with open(fasta_path, 'rb') as f, open(fai_path, 'w') as out:
+        name, length, offset, linebases, linewidth = None, 0, 0, 0, 0
+        pos = 0
+        for line in f:
+            if line.startswith(b">"):
+                if name is not None:
+                    out.write(f"{name}\t{length}\t{offset}\t{linebases}\t{linewidth}\n")
+                name = line[1:].split()[0].decode() if line[1:].strip() else ""
+                length, offset, linebases, linewidth = 0, pos + len(line), 0, 0
+            elif name is not None:
+                residues = len(line.rstrip(b"\r\n"))
+                if not linebases:
+                    linebases, linewidth = residues, len(line)
+                length += residues
+            pos += len(line)
+        if name is not None:
+            out.write(f"{name}\t{length}\t{offset}\t{linebases}\t{linewidth}\n")
+    return fai_path
+
+def read_fasta_index(fasta_path):
+    # Returns {name: (length, offset, linebases, linewidth)}, (re)building the .fai if it is missing or stale.
+    # The first record wins when a name occurs more than once.
+    fai_path = fasta_path + ".fai"
+    if not os.path.exists(fai_path) or os.path.getmtime(fai_path) < os.path.getmtime(fasta_path):
+        write_fasta_index(fasta_path)
+    index = {}
+    with open(fai_path, 'r') as f:
+        for line in f:
+            name, length, offset, linebases, linewidth = line.rstrip("\n").split("\t")
+            index.setdefault(name, (int(length), int(offset), int(linebases), int(linewidth)))
+    return index
+
+def read_accession_list(path):
+    # One accession per line (as written by most_changed_proteins.py); commas and whitespace also separate
+    with open(path, 'r') as f:
+        return [acc for acc in re.split(r'[\s,;]+', f.read()) if acc]
+
+def _lookup_name(index, accession):
+    if accession in index:
+        return accession
+    # sp|P12345|NAME_ORG style identifiers
+    parts = accession.split("|")
+    if len(parts) > 1 and parts[1] in index:
+        return parts[1]
+    return None
+
+def extract_fasta_subset(fasta_path, accessions, output_path):
+    # Pulls only the listed sequences out of an indexed FASTA with one seek and read per accession.
+    # Returns (number written, accessions not found).
+    with stage("subset", file=fasta_path) as s:
+        written, missing = _extract_indexed(fasta_path, read_fasta_index(fasta_path), accessions, output_path)
+        s.add(written)
+        s.wrote(output_path)
+    return written, missing
+
+def _extract_indexed(fasta_path, index, accessions, output_path):
+    written, missing, seen = 0, [], set()
+    with open(fasta_path, 'rb') as f, open(output_path, 'wb') as out:
+        for accession in accessions:
+            name = _lookup_name(index, accession)
+            if name is None:
+                missing.append(accession)
+                continue
+            if name in seen:
+                continue
+            seen.add(name)
+            length, offset, linebases, linewidth = index[name]
+            if linebases:
+                full_lines, rest = divmod(length, linebases)
+                span = full_lines * linewidth + rest
+            else:
+                span = 0
+            f.seek(offset)
+            sequence = f.read(span).replace(b"\r", b"").replace(b"\n", b"")
+            out.write(b">%s\n%s\n" % (name.encode(), sequence))
+            written += 1
+    return written, missing
+
+# CLI name -> (per-file cleaner, label used in status messages)
+FILE_CLEANERS = {
+    "psortb": (clean_psortb_file, "psortb"),
+    "cello": (clean_cello_file, "CELLO"),
+    "david": (clean_david_file, "DAVID"),
+    "fasta": (clean_fasta_metadata_file, "FASTA"),
+}
+
+def _describe_outputs(outputs):
+    return ", ".join(outputs) if isinstance(outputs, tuple) else outputs
+
+def _clean_files(tool, files):
+    cleaner, label = FILE_CLEANERS[tool]
+    for input_path in files:
+        try:
+            outputs = cleaner(input_path)
+            print(f"{label} cleaned: {_describe_outputs(outputs)}")
+        except Exception as e:
+            print(f"Error cleaning {label} file {input_path}: {e}")
+
+def clean_psortb(files): _clean_files("psortb", files)
+def clean_cello(files): _clean_files("cello", files)
+def clean_david(files): _clean_files("david", files)
+def clean_fasta_metadata(files): _clean_files("fasta", files)
+
+# -----------------------------
+# Headless batch engine
+# -----------------------------
+def collect_inputs(patterns):
+    # Expands directories and glob patterns into a de-duplicated list of input files.
+    # Directories skip files this tool has already produced (*_cleaned*).
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, f) for f in sorted(os.listdir(pattern))
+                       if "_cleaned" not in f]
+            matches = [m for m in matches if os.path.isfile(m)]
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+        else:
+            matches = [pattern]
+        for m in matches:
+            if m not in paths:
+                paths.append(m)
+    return paths
+
+def _run_cleaner(tool, input_path, **options):
+    # Runs in a worker process; errors are returned rather than raised so one bad file never stops the batch
+    try:
+        return input_path, FILE_CLEANERS[tool][0](input_path, **options), None
+    except Exception as e:
+        return input_path, None, f"{type(e).__name__}: {e}"
+
+def clean_batch(tool, paths, workers=None, on_result=None, **options):
+    # Cleans every path with one tool across a process pool; options are passed on to the cleaner.
+    # Returns (input_path, outputs, error) tuples in input order; on_result is called as each file finishes.
+    if tool not in FILE_CLEANERS:
+        raise ValueError(f"Unknown tool '{tool}'. Choose from: {', '.join(FILE_CLEANERS)}")
+    results = {}
+    if len(paths) == 1 and tool == "fasta":
+        # A single UniProt export is split into chunks instead, so the workers are still used
+        results[paths[0]] = _run_cleaner(tool, paths[0], workers=workers, **options)
+        if on_result: on_result(*results[paths[0]])
+    elif workers == 1 or len(paths) <= 1:
+        for path in paths:
+            results[path] = _run_cleaner(tool, path, **options)
+            if on_result: on_result(*results[path])
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        if options.get("store"):
+            from results_store import create_store
+            create_store(options["store"])
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(instrumentation.recorded, _run_cleaner, tool, path, **options) for path in paths]
+            for fut in as_completed(futures):
+                result, recording = fut.result()
+                instrumentation.absorb(recording)
+                results[result[0]] = result
+                if on_result: on_result(*result)
+    return [results[p] for p in paths]
+
+def _print_result(input_path, outputs, error):
+    if error:
+        print(f"FAILED  {input_path}: {error}")
+    else:
+        print(f"OK      {input_path} -> {_describe_outputs(outputs)}")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        launch_gui()
+        return 0
+
+    parser = argparse.ArgumentParser(
+        prog="Cleaner.py",
+        description="Clean PSORTb, CELLO, DAVID and UniProt text files without the GUI. "
+                    "Run with no arguments to open the GUI.")
+    tools = parser.add_subparsers(dest="tool", required=True)
+    for tool, (_, label) in FILE_CLEANERS.items():
+        sub = tools.add_parser(tool, help=f"clean {label} files")
+        sub.add_argument("inputs", nargs="+", help="input files, directories or glob patterns")
+        sub.add_argument("-j", "--workers", type=int, default=None,
+                         help="worker processes (default: number of CPUs)")
+    for tool in ("psortb", "cello"):
+        tools.choices[tool].add_argument("--store", metavar="DB",
+                                         help="also load the localizations into this results store (results_store.py)")
+        tools.choices[tool].add_argument("--run", help="run name in the store (default: from each file name)")
+    tools.choices["david"].add_argument("--format", choices=DAVID_FORMATS, default="xlsx",
+                                        help="table output: streamed .xlsx (default), two .csv or two .parquet files")
+    sub = tools.add_parser("subset", help="extract listed accessions from a cleaned (indexed) FASTA")
+    sub.add_argument("fasta", help="_cleaned.fasta file; its .fai index is built if missing")
+    sub.add_argument("accessions", help="text file of accessions, e.g. from most_changed_proteins.py")
+    sub.add_argument("-o", "--output", help="output FASTA (default: <accessions>.fasta)")
+    for sub in tools.choices.values():
+        instrumentation.add_arguments(sub)
+    args = parser.parse_args(argv)
+    instrumentation.configure(args.report, args.profile, tool=f"Cleaner {args.tool}")
+
+    if args.tool == "subset":
+        output_path = args.output or os.path.splitext(args.accessions)[0] + ".fasta"
+        written, missing = extract_fasta_subset(args.fasta, read_accession_list(args.accessions), output_path)
+        print(f"{written} sequences written to {output_path}")
+        if missing:
+            print(f"{len(missing)} accessions not found: {', '.join(missing[:20])}"
+                  + (" ..." if len(missing) > 20 else ""))
+        return 0
+
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        print("No input files found.")
+        return 1
+    options = {"output_format": args.format} if args.tool == "david" else {}
+    if getattr(args, "store", None):
+        if args.run and len(paths) > 1:
+            parser.error("--run names a single input; leave it out to name runs after the files")
+        options.update(store=args.store, run=args.run)
+    results = clean_batch(args.tool, paths, workers=args.workers, on_result=_print_result, **options)
+    failed = sum(1 for _, _, error in results if error)
+    print(f"\n{len(results) - failed} cleaned, {failed} failed")
+    return 1 if failed else 0
 
 def launch_gui():
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from gui_worker import BackgroundRunner
     root = tk.Tk()
     root.title("Cleaner")
     root.geometry("600x650")
@@ -11,102 +487,8 @@ def launch_gui():
     container = tk.Frame(root)
     container.pack(expand=True, padx=20, pady=20)
 
-    # -----------------------------
-    # Cleaning functions (unchanged)
-    # -----------------------------
-    def clean_psortb(files):
-        for input_path in files:
-            try:
-                output_path = os.path.splitext(input_path)[0] + "_cleaned.txt"
-                with open(input_path, 'r') as infile, open(output_path, 'w') as outfile:
-                    lines = infile.readlines()
-                    seqid_found, final_prediction_found = None, None
-                    for i, line in enumerate(lines):
-                        if 'SeqID:' in line:
-                            seqid_found = line.split('SeqID: ')[-1].strip()
-                        if 'Final Prediction:' in line and i + 1 < len(lines):
-                            next_line = re.sub(r'\d+', '', lines[i + 1].strip()).strip()
-                            final_prediction_found = next_line
-                        if seqid_found and final_prediction_found:
-                            outfile.write(f"{seqid_found}\t{final_prediction_found}\n")
-                            seqid_found, final_prediction_found = None, None
-                print(f"psortb cleaned: {output_path}")
-            except Exception as e:
-                print(f"Error cleaning psortb file {input_path}: {e}")
-
-    def clean_cello(files):
-        for input_path in files:
-            try:
-                with open(input_path, 'r') as infile:
-                    lines = infile.readlines()
-                last_two_columns = [line.split()[-2:] for line in lines if len(line.split()) >= 2]
-                output_path = os.path.splitext(input_path)[0] + "_cleaned.txt"
-                with open(output_path, 'w') as outfile:
-                    for row in last_two_columns:
-                        outfile.write("\t".join(row) + "\n")
-                print(f"CELLO cleaned: {output_path}")
-            except Exception as e:
-                print(f"Error cleaning CELLO file {input_path}: {e}")
-
-    def strip_term(term): return re.sub(r'~.*', '', term).strip()
-
-    def clean_david(files):
-        for input_path in files:
-            try:
-                with open(input_path, 'r', encoding='utf-8') as infile:
-                    lines = infile.readlines()
-                headers = lines[0].strip().split('\t')
-                required = ['Term','Count','PValue','FDR','Genes']
-                col_index = {c: headers.index(c) for c in required if c in headers}
-                if len(col_index) < len(required):
-                    missing = [c for c in required if c not in headers]
-                    print(f"Error: Missing {missing} in {input_path}")
-                    continue
-                overview, sig, gene_blocks = [], [], []
-                for line in lines[1:]:
-                    parts = line.strip().split('\t')
-                    if len(parts) < len(headers): continue
-                    term = strip_term(parts[col_index['Term']])
-                    count = parts[col_index['Count']]
-                    try:
-                        pval, fdr = float(parts[col_index['PValue']]), float(parts[col_index['FDR']])
-                    except ValueError: continue
-                    genes = parts[col_index['Genes']]
-                    overview.append({'Term':term,'Count':count,'PValue':pval,'FDR':fdr})
-                    if fdr <= 0.05: sig.append({'Term':term,'Count':count,'FDR':fdr})
-                    gene_blocks.append(f"{term}\n{genes}\n")
-                base = os.path.splitext(input_path)[0]
-                excel_out, genes_out = base+"_cleaned.xlsx", base+"_genes_cleaned.txt"
-                with pd.ExcelWriter(excel_out, engine="openpyxl") as w:
-                    pd.DataFrame(overview).to_excel(w,index=False,sheet_name="Overview")
-                    pd.DataFrame(sig).to_excel(w,index=False,sheet_name="Sig_Categories")
-                with open(genes_out,"w",encoding="utf-8") as g: g.write("\n".join(gene_blocks))
-                print(f"DAVID cleaned: {excel_out}, {genes_out}")
-            except Exception as e: print(f"Error cleaning DAVID file {input_path}: {e}")
-
-    def clean_fasta_metadata(files):
-        for input_path in files:
-            try:
-                output_path = os.path.splitext(input_path)[0] + "_cleaned.fasta"
-                with open(input_path,'r') as infile, open(output_path,'w') as outfile:
-                    entry_id, seq, in_seq = None, [], False
-                    for line in infile:
-                        line=line.strip()
-                        if line.startswith("ID"):
-                            if entry_id and seq:
-                                outfile.write(f">{entry_id}\n{''.join(seq)}\n")
-                            entry_id=line.split()[1].split("_")[0]
-                            seq,in_seq=[],False
-                        elif line.startswith("SQ"): in_seq=True
-                        elif line.startswith("//"):
-                            if entry_id and seq:
-                                outfile.write(f">{entry_id}\n{''.join(seq)}\n")
-                            entry_id,seq,in_seq=None,[],False
-                        elif in_seq: seq.append("".join(filter(str.isalpha,line)))
-                print(f"FASTA cleaned: {output_path}")
-            except Exception as e: print(f"Error cleaning FASTA file {input_path}: {e}")
-
-    tool_cleaners = {"psortb":clean_psortb,"CELLO":clean_cello,"DAVID":clean_david,"FASTA Metadata":clean_fasta_metadata}
+    # Button label -> FILE_CLEANERS key
+    tool_cleaners = {"psortb": "psortb", "CELLO": "cello", "DAVID": "david", "FASTA Metadata": "fasta"}
 
     # -----------------------------
     # Tool windows with corrected layout
@@ -121,8 +503,34 @@ def launch_gui():
 
         selected_files, btns = [], []
         file_buttons_frame = tk.Frame(win)  # Created but not packed yet
-        clean_btn = tk.Button(win, text="Clean", bg="lightblue",
-                              command=lambda: tool_cleaners[tool_name](selected_files))
+        runner = BackgroundRunner(win)
+
+        def clean_selected():
+            # Files are cleaned in parallel worker processes; the window stays responsive meanwhile
+            tool = tool_cleaners[tool_name]
+            label = FILE_CLEANERS[tool][1]
+            files = list(selected_files)
+
+            def done(results, cancelled):
+                clean_btn.config(state="normal")
+                if cancelled:
+                    messagebox.showinfo("Cancelled", f"{label} cleaning was cancelled.", parent=win)
+                    return
+                # _run_cleaner reports cleaning errors in its own result; the pool reports crashes
+                results = [result or (path, None, error) for path, (result, error) in zip(files, results)]
+                for result in results:
+                    _print_result(*result)
+                failed = [f"{os.path.basename(path)}: {error}" for path, _, error in results if error]
+                if failed:
+                    messagebox.showerror("Error", f"Some {label} files could not be cleaned:\n" + "\n".join(failed),
+                                         parent=win)
+                else:
+                    messagebox.showinfo("Done", f"{len(files)} {label} file(s) cleaned.", parent=win)
+
+            if runner.run([(_run_cleaner, (tool, path)) for path in files], done):
+                clean_btn.config(state="disabled")
+
+        clean_btn = tk.Button(win, text="Clean", bg="lightblue", command=clean_selected)
 
         def check_all_selected(n):
             if len(selected_files)==n and all(selected_files):
@@ -162,4 +570,4 @@ def launch_gui():
     root.mainloop()
 
 if __name__=="__main__":
-    launch_gui()
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import numpy as np
+
+# -------------------------
+# Accession interning
+# -------------------------
+# Every distinct accession string gets a dense integer ID (0, 1, 2, ... in first-seen order).
+# Protein sets are then sorted, de-duplicated NumPy integer arrays, which take a fraction of the
+# memory of Python sets of strings and support vectorized unions/intersections.
+
+ID_DTYPE = np.int32
+
+class AccessionIndex:
+    def __init__(self, accessions=()):
+        self._ids = {}
+        self._accessions = []
+        for accession in accessions:
+            self.intern(accession)
+
+    def __len__(self):
+        return len(self._accessions)
+
+    def __contains__(self, accession):
+        return accession in self._ids
+
+    def intern(self, accession):
+        accession_id = self._ids.get(accession)
+        if accession_id is None:
+            accession_id = self._ids[accession] = len(self._accessions)
+            self._accessions.append(accession)
+        return accession_id
+
+    def encode(self, accessions):
+        # Accessions (any iterable, duplicates allowed) -> sorted unique ID array, interning new ones
+        intern = self.intern
+        ids = np.fromiter((intern(a) for a in accessions), dtype=np.int64)
+        return np.unique(ids).astype(ID_DTYPE)
+
+    def lookup(self, accessions):
+        # Like encode() but never grows the index; unknown accessions are dropped
+        ids = [self._ids[a] for a in accessions if a in self._ids]
+        return np.unique(np.array(ids, dtype=np.int64)).astype(ID_DTYPE)
+
+    def decode(self, ids):
+        accessions = self._accessions
+        return [accessions[i] for i in np.asarray(ids).tolist()]
+
+# -------------------------
+# Set algebra on sorted ID arrays
+# -------------------------
+def union(a, b):
+    return np.union1d(a, b).astype(ID_DTYPE)
+
+def intersection(a, b):
+    return np.intersect1d(a, b, assume_unique=True).astype(ID_DTYPE)
+
+def difference(a, b):
+    return np.setdiff1d(a, b, assume_unique=True).astype(ID_DTYPE)
+
+def union_all(id_sets):
+    id_sets = list(id_sets)
+    if not id_sets:
+        return np.empty(0, dtype=ID_DTYPE)
+    return np.unique(np.concatenate(id_sets)).astype(ID_DTYPE)
+
+def intersection_all(id_sets):
+    id_sets = sorted(id_sets, key=len)
+    if not id_sets:
+        return np.empty(0, dtype=ID_DTYPE)
+    result = id_sets[0]
+    for ids in id_sets[1:]:
+        result = intersection(result, ids)
+    return result
+
+def group_by_membership(id_sets):
+    # Splits every ID that occurs in any set by which sets contain it, in one vectorized pass.
+    # Returns {bitmask: sorted ID array}, where bit i of the mask means "present in id_sets[i]";
+    # unique-to-i is groups[1 << i] and shared-by-all is groups[(1 << n) - 1].
+    id_sets = list(id_sets)
+    universe = union_all(id_sets)
+    if not len(universe):
+        return {}
+    # Presence bits packed 8 sets per byte (so any number of sets fits), one row per ID in the union
+    packed = np.zeros((len(universe), (len(id_sets) + 7) // 8), dtype=np.uint8)
+    for i, ids in enumerate(id_sets):
+        packed[np.searchsorted(universe, ids), i >> 3] |= np.uint8(1 << (i & 7))
+    patterns, inverse, counts = np.unique(packed, axis=0, return_inverse=True, return_counts=True)
+    grouped = universe[np.argsort(inverse.ravel(), kind="stable")]
+    groups = {}
+    for pattern, ids in zip(patterns, np.split(grouped, np.cumsum(counts)[:-1])):
+        groups[int.from_bytes(pattern.tobytes(), "little")] = ids
+    return groups
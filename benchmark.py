@@ -0,0 +1,272 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from synthetic_data import generate_study
+from instrumentation import peak_rss_mb, reset_peak_rss
+
+# -------------------------
+# Benchmark suite
+# -------------------------
+# Times and memory-profiles the headless entry points on synthetic data (synthetic_data.py) and
+# writes a JSON report; `compare` checks a new report against an older one for regressions.
+# Every case runs in its own fresh process, so imports, peak RSS and caches never leak between
+# cases. Input generation and any per-case setup are not timed. The parse cache is off unless
+# --cache is given, so Excel parsing is part of the measurement.
+
+# -------------------------
+# Cases: case(files, workdir) does the untimed setup and returns (callable doing the timed work,
+# number of input records it handles)
+# -------------------------
+def _count_lines(path):
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+def _count_sheet_rows(path, sheet=None, header_rows=1):
+    # Rows with a first cell below the header rows; the synthetic workbooks are written without
+    # dimensions, so the rows are counted rather than read from max_row
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        return sum(1 for row in ws.iter_rows(min_row=header_rows + 1, max_col=1, values_only=True)
+                   if row and row[0] is not None)
+    finally:
+        wb.close()
+
+def case_clean_psortb(files, workdir):
+    from Cleaner import clean_psortb_file
+    out = os.path.join(workdir, "psortb_cleaned.txt")
+    path = files["psortb"][0]
+    return lambda: clean_psortb_file(path, out), _count_lines(path) // 10
+
+def case_clean_cello(files, workdir):
+    from Cleaner import clean_cello_file
+    out = os.path.join(workdir, "cello_cleaned.txt")
+    path = files["cello"][0]
+    return lambda: clean_cello_file(path, out), _count_lines(path) - 1
+
+def case_clean_david(files, workdir):
+    # DAVID outputs always go next to the input, so the chart is copied into the work directory
+    from Cleaner import clean_david_file
+    path = shutil.copy(files["david"][0], workdir)
+    return lambda: clean_david_file(path), _count_lines(path) - 1
+
+def case_clean_fasta(files, workdir):
+    from Cleaner import clean_fasta_metadata_file
+    out = os.path.join(workdir, "uniprot_cleaned.fasta")
+    path = files["uniprot"][0]
+    with open(path, "rb") as f:
+        records = sum(1 for line in f if line.startswith(b"//"))
+    return lambda: clean_fasta_metadata_file(path, output_path=out), records
+
+def case_summary(files, workdir):
+    # most_changed_proteins' aggregation: read the replicates, summarize, write Summary and list
+    from most_changed_proteins import process_workbook
+    out, summary = os.path.join(workdir, "most_changed.txt"), os.path.join(workdir, "summary.tsv")
+    path = files["workbook"][0]
+    return lambda: process_workbook(path, 5, 1000, out, summary), _count_sheet_rows(path, "Protein list")
+
+def case_cog_lists(files, workdir):
+    from parse_and_compare_COGs import create_cog_lists
+    out = os.path.join(workdir, "proteins_per_COG.txt")
+    path = files["eggnog_xlsx"][0]
+    # Two comment rows and the header come before the annotations
+    return lambda: create_cog_lists(path, out), _count_sheet_rows(path, header_rows=3)
+
+def case_cog_lists_tsv(files, workdir):
+    from parse_and_compare_COGs import create_cog_lists
+    out = os.path.join(workdir, "proteins_per_COG_tsv.txt")
+    path = files["eggnog"][0]
+    return lambda: create_cog_lists(path, out), _count_lines(path) - 4
+
+def case_compare_cogs(files, workdir):
+    # compare_multiple_cogs alone, on maps parsed during setup
+    from parse_and_compare_COGs import parse_cog_map, cog_map_to_file_data, compare_multiple_cogs
+    file_data = [cog_map_to_file_data(parse_cog_map(p)) for p in files["eggnog"]]
+    titles = [os.path.basename(p) for p in files["eggnog"]]
+    records = sum(len(entry["proteins"]) for data in file_data for entry in data.values())
+    return lambda: compare_multiple_cogs(file_data, titles), records
+
+def case_exclusivity(files, workdir):
+    from protein_exclusivity import compare_protein_sets
+    out = os.path.join(workdir, "Protein_exclusivity.xlsx")
+    records = sum(_count_sheet_rows(p, "Protein list") for p in files["workbook"])
+    return lambda: compare_protein_sets(files["workbook"], out), records
+
+CASES = {
+    "clean_psortb": case_clean_psortb,
+    "clean_cello": case_clean_cello,
+    "clean_david": case_clean_david,
+    "clean_fasta": case_clean_fasta,
+    "summary": case_summary,
+    "cog_lists": case_cog_lists,
+    "cog_lists_tsv": case_cog_lists_tsv,
+    "compare_cogs": case_compare_cogs,
+    "exclusivity": case_exclusivity,
+}
+
+# -------------------------
+# Measurement
+# -------------------------
+def measure_case(name, files, repeat=3, trace=False, use_cache=False):
+    # Runs in a fresh worker process: setup, `repeat` timed runs, then optionally one run under
+    # tracemalloc for the peak of Python allocations. The tools' own progress messages are dropped.
+    workdir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    if use_cache:
+        os.environ["PROTEOMICS_CACHE_DIR"] = os.path.join(workdir, "cache")
+    else:
+        os.environ["PROTEOMICS_CACHE"] = "0"
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run, items = CASES[name](files, workdir)
+            setup_rss = peak_rss_mb()
+            separate = reset_peak_rss()
+            wall, cpu = [], []
+            for _ in range(repeat):
+                start_wall, start_cpu = time.perf_counter(), time.process_time()
+                run()
+                wall.append(round(time.perf_counter() - start_wall, 4))
+                cpu.append(round(time.process_time() - start_cpu, 4))
+            result = {"wall_s": wall, "cpu_s": cpu, "best_s": min(wall), "median_s": sorted(wall)[len(wall) // 2],
+                      "items": items, "items_per_s": round(items / min(wall)) if min(wall) else None,
+                      "peak_rss_mb": peak_rss_mb(), "setup_rss_mb": setup_rss,
+                      # without a reset the peak also covers setup
+                      "peak_includes_setup": not separate}
+            if trace:
+                import tracemalloc
+                tracemalloc.start()
+                run()
+                result["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+                tracemalloc.stop()
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _environment():
+    versions = {}
+    for package in ("numpy", "pandas", "openpyxl", "scipy"):
+        try:
+            versions[package] = __import__(package).__version__
+        except ImportError:
+            versions[package] = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "packages": versions, "commit": commit}
+
+def run_benchmarks(n_proteins=10000, runs=3, replicates=3, repeat=3, cases=None, data_dir=None,
+                   trace=False, use_cache=False, seed=0, on_result=None):
+    # Generates (or reuses, when data_dir already holds the same study) the inputs and measures every case
+    cases = list(cases or CASES)
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown case(s): {', '.join(unknown)}. Choose from: {', '.join(CASES)}")
+    scale = {"proteins": n_proteins, "runs": runs, "replicates": replicates, "seed": seed}
+    own_dir = data_dir is None
+    data_dir = data_dir or tempfile.mkdtemp(prefix="bench_data_")
+    try:
+        files = _load_manifest(data_dir, scale)
+        if files is None:
+            files = generate_study(data_dir, n_proteins, runs, replicates, seed=seed)
+        report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "scale": scale, "repeat": repeat,
+                  "cache": use_cache, "environment": _environment(), "cases": {}}
+        spawn = multiprocessing.get_context("spawn")
+        for name in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                result = pool.submit(measure_case, name, files, repeat, trace, use_cache).result()
+            report["cases"][name] = result
+            if on_result:
+                on_result(name, result)
+        return report
+    finally:
+        if own_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+def _load_manifest(data_dir, scale):
+    try:
+        with open(os.path.join(data_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if any(manifest.get(k) != v for k, v in scale.items()):
+        return None
+    return manifest["files"]
+
+# -------------------------
+# Comparing reports
+# -------------------------
+def compare_reports(baseline, current, tolerance=0.10):
+    # Rows of (case, metric, old, new, ratio, regressed) for the cases both reports contain
+    rows = []
+    for name, new in current["cases"].items():
+        old = baseline["cases"].get(name)
+        if not old:
+            continue
+        for metric in ("best_s", "peak_rss_mb"):
+            if old.get(metric) and new.get(metric) is not None:
+                ratio = new[metric] / old[metric]
+                rows.append((name, metric, old[metric], new[metric], ratio, ratio > 1 + tolerance))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmark.py",
+        description="Time and memory-profile the analysis tools on synthetic data, and compare reports.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmark cases and write a JSON report")
+    run.add_argument("-n", "--proteins", type=int, default=10000, help="proteins per run (10^3 to 10^6)")
+    run.add_argument("--runs", type=int, default=3, help="runs in the synthetic study")
+    run.add_argument("--replicates", type=int, default=3, help="SpC/TIC replicate columns")
+    run.add_argument("--repeat", type=int, default=3, help="timed repetitions per case")
+    run.add_argument("--cases", help="comma-separated subset of: " + ", ".join(CASES))
+    run.add_argument("--data-dir", help="keep (and reuse) the generated inputs here")
+    run.add_argument("--tracemalloc", action="store_true", help="also record the peak of Python allocations")
+    run.add_argument("--cache", action="store_true", help="measure with the parse cache on")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("-o", "--output", default="benchmark.json")
+    compare = commands.add_parser("compare", help="compare a report against a baseline report")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--tolerance", type=float, default=0.10,
+                         help="allowed slowdown or memory growth before a case counts as a regression (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        if baseline["scale"] != current["scale"]:
+            print(f"Warning: different scales ({baseline['scale']} vs {current['scale']})")
+        rows = compare_reports(baseline, current, args.tolerance)
+        for name, metric, old, new, ratio, regressed in rows:
+            print(f"{'SLOWER' if regressed else 'ok    '} {name:<16} {metric:<12} {old:>10g} -> {new:<10g} x{ratio:.2f}")
+        return 1 if any(row[-1] for row in rows) else 0
+
+    def progress(name, result):
+        rss = f", peak RSS {result['peak_rss_mb']} MB" if result["peak_rss_mb"] is not None else ""
+        print(f"{name:<16} best {result['best_s']:.3f} s ({result['items']} records){rss}")
+
+    cases = [c.strip() for c in args.cases.split(",")] if args.cases else None
+    report = run_benchmarks(args.proteins, args.runs, args.replicates, args.repeat, cases, args.data_dir,
+                            args.tracemalloc, args.cache, args.seed, progress)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"Report written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
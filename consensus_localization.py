@@ -0,0 +1,150 @@
+import os
+import re
+import sys
+import argparse
+import numpy as np
+# pandas is imported by the functions that need it, so the ID and localization normalizers stay
+# cheap to import (results_store.py uses them)
+
+# -------------------------
+# Consensus localization (README LOCALIZATION step 6)
+# -------------------------
+# Joins the PSORTb and CELLO _cleaned.txt files from Cleaner.py with SOSUI results on protein ID,
+# maps every tool's wording onto one vocabulary, and calls a localization wherever at least two
+# sources agree. "Unknown" predictions count as no prediction.
+
+SOURCES = ("PSORTb", "CELLO", "SOSUI")
+UNKNOWN = "Unknown"
+
+# Lower-case, letters-only spellings -> shared vocabulary
+LOCALIZATION_SYNONYMS = {
+    "cytoplasmic": "Cytoplasmic", "cytoplasm": "Cytoplasmic",
+    "cytosol": "Cytoplasmic", "cytosolic": "Cytoplasmic",
+    "cytoplasmicmembrane": "CytoplasmicMembrane", "innermembrane": "CytoplasmicMembrane",
+    "plasmamembrane": "CytoplasmicMembrane", "membrane": "CytoplasmicMembrane",
+    "periplasmic": "Periplasmic", "periplasm": "Periplasmic",
+    "outermembrane": "OuterMembrane",
+    "cellwall": "CellWall",
+    "extracellular": "Extracellular", "secreted": "Extracellular", "secretory": "Extracellular",
+    "unknown": UNKNOWN, "": UNKNOWN, "na": UNKNOWN, "none": UNKNOWN,
+}
+
+def normalize_id(raw):
+    # "P12345 some description" -> "P12345"; ">sp|P12345|NAME_ORG" -> "P12345"
+    token = str(raw).strip().lstrip(">").split()
+    if not token:
+        return None
+    token = token[0]
+    parts = token.split("|")
+    return parts[1] if len(parts) > 2 else token
+
+def normalize_localization(raw):
+    if raw is None or (isinstance(raw, float) and np.isnan(raw)):
+        return UNKNOWN
+    key = re.sub(r"[^a-z]", "", str(raw).lower())
+    if key.startswith("unknown"):
+        # PSORTb: "Unknown (This protein may have multiple localization sites.)"
+        return UNKNOWN
+    return LOCALIZATION_SYNONYMS.get(key, str(raw).strip())
+
+# First-row ID cells that are column names, lower-cased without spaces or underscores: "SeqID",
+# "Protein name", "Protein AC", ... and the "CELLO" of a CELLO report's title line
+HEADER_CELLS = {"id", "seqid", "sequenceid", "sequence", "name", "proteinname", "protein", "proteins",
+                "proteinid", "proteinac", "proteinsac", "accession", "cello"}
+
+def looks_like_header(cell):
+    # The whole cell has to be a known column name, so data IDs like "id-1234" are never dropped
+    return re.sub(r"[\s_]", "", str(cell).lower()) in HEADER_CELLS
+
+def read_localization_table(path, source):
+    # Two-column (protein ID, localization) table -> DataFrame indexed by normalized ID.
+    # Cleaner.py's tab-separated _cleaned.txt files, CSV/TSV or Excel (e.g. pasted SOSUI output)
+    # are accepted; a first row whose ID cell reads like a column name is treated as a header.
+    import pandas as pd
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xls"):
+        raw = pd.read_excel(path, header=None, dtype=str)
+    else:
+        raw = pd.read_csv(path, sep="," if ext == ".csv" else "\t", header=None, dtype=str,
+                          usecols=[0, 1], quoting=3, on_bad_lines="skip", engine="python")
+    raw = raw.iloc[:, :2]
+    raw.columns = ["ProteinAC", source]
+    if len(raw) and looks_like_header(raw.iloc[0, 0]):
+        raw = raw.iloc[1:]
+    raw["ProteinAC"] = raw["ProteinAC"].map(normalize_id)
+    raw[source] = raw[source].map(normalize_localization)
+    raw = raw.dropna(subset=["ProteinAC"]).drop_duplicates("ProteinAC")
+    return raw.set_index("ProteinAC")
+
+def majority_call(predictions, min_votes=2):
+    # Vectorized vote over a (proteins x sources) frame of normalized labels.
+    # Returns (consensus label or None, votes for the most common label, number of predicting sources).
+    import pandas as pd
+    labels = predictions.where(predictions != UNKNOWN).to_numpy(dtype=object)
+    n, k = labels.shape
+    codes, categories = pd.factorize(labels.ravel(), use_na_sentinel=True)
+    codes = codes.reshape(n, k) + 1                     # 0 = no prediction
+    width = len(categories) + 1
+    counts = np.bincount((np.arange(n)[:, None] * width + codes).ravel(),
+                         minlength=n * width).reshape(n, width)[:, 1:]
+    sources = (codes > 0).sum(axis=1)
+    if not len(categories):
+        return np.full(n, None, dtype=object), np.zeros(n, dtype=int), sources
+    best = counts.argmax(axis=1)
+    votes = counts.max(axis=1)
+    tied = (counts == votes[:, None]).sum(axis=1) > 1
+    call = np.where((votes >= min_votes) & ~tied, np.asarray(categories, dtype=object)[best], None)
+    return call, votes, sources
+
+def build_consensus(tables, min_votes=2):
+    # tables: {source name: DataFrame from read_localization_table}; hash-joined on protein ID
+    import pandas as pd
+    merged = pd.concat(list(tables.values()), axis=1, join="outer")
+    merged.index.name = "ProteinAC"
+    sources = list(tables)
+    merged[sources] = merged[sources].fillna(UNKNOWN)
+    call, votes, predicting = majority_call(merged[sources], min_votes)
+    merged["Consensus"] = call
+    merged["Agreement"] = votes
+    merged["Sources"] = predicting
+    return merged.reset_index()
+
+def write_consensus(merged, output_path):
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext in (".tsv", ".txt", ".csv"):
+        merged.to_csv(output_path, sep="," if ext == ".csv" else "\t", index=False)
+    else:
+        merged.to_excel(output_path, index=False, sheet_name="Consensus")
+    return output_path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="consensus_localization.py",
+        description="Merge PSORTb, CELLO and SOSUI localizations and call the localization 2 of 3 agree on.")
+    parser.add_argument("--psortb", help="PSORTb _cleaned.txt from Cleaner.py")
+    parser.add_argument("--cello", help="CELLO _cleaned.txt from Cleaner.py")
+    parser.add_argument("--sosui", help="SOSUI results: ID and localization columns (.xlsx, .csv or .tsv)")
+    parser.add_argument("--min-votes", type=int, default=2, help="sources that must agree (default 2)")
+    parser.add_argument("-o", "--output", default="consensus_localization.xlsx",
+                        help="merged matrix (.xlsx, .csv or .tsv)")
+    parser.add_argument("--store", metavar="DB",
+                        help="also load the consensus calls into this results store (results_store.py)")
+    parser.add_argument("--run", help="run name in the store (default: from the first input's file name)")
+    args = parser.parse_args(argv)
+    paths = {"PSORTb": args.psortb, "CELLO": args.cello, "SOSUI": args.sosui}
+    tables = {source: read_localization_table(path, source) for source, path in paths.items() if path}
+    if len(tables) < 2:
+        parser.error("give at least two of --psortb, --cello and --sosui")
+    merged = build_consensus(tables, args.min_votes)
+    write_consensus(merged, args.output)
+    if args.store:
+        from results_store import run_name, store_localization
+        called = merged[merged["Consensus"].notna()]
+        store_localization(args.store, args.run or run_name(next(p for p in paths.values() if p)), "consensus",
+                           zip(called["ProteinAC"], called["Consensus"]), source=args.output)
+    called = merged["Consensus"].notna().sum()
+    print(f"{len(merged)} proteins, {called} with a consensus localization; saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
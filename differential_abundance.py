@@ -0,0 +1,181 @@
+import os
+import sys
+import csv
+import argparse
+import itertools
+import warnings
+import numpy as np
+from most_changed_proteins import load_replicate_data
+
+# -------------------------
+# Differential abundance between conditions
+# -------------------------
+# Python counterpart of the volcano analysis in SpC_TIC_violins.R. Each condition is one workbook
+# with a "Protein list" sheet; the SpC and TIC replicate columns are found the same way as in
+# most_changed_proteins.py. For every pair of conditions and every protein they share, computes
+# log2 fold change (B / A of the replicate means), Welch t-test and Mann-Whitney U p-values, and
+# Benjamini-Hochberg q-values, all as whole-array operations rather than one test per protein.
+
+MEASURES = ("SpC", "TIC")
+RESULT_COLUMNS = ["Comparison", "ProteinAC", "Measure", "Mean A", "Mean B", "log2FC",
+                  "p Welch", "q Welch", "p MannWhitney", "q MannWhitney"]
+
+def load_condition(path):
+    data = load_replicate_data(path)
+    if data is None:
+        raise ValueError(f"{os.path.basename(path)}: no usable 'Protein list' sheet")
+    proteins, spc_values, tic_values = data
+    return {"proteins": proteins, "SpC": spc_values, "TIC": tic_values}
+
+def shared_rows(proteins_a, proteins_b):
+    # Row numbers of the proteins present in both conditions, in condition A's order
+    # (the first row wins when a protein is listed twice)
+    first_b = {}
+    for i, protein in enumerate(proteins_b):
+        first_b.setdefault(protein, i)
+    rows_a, rows_b, seen = [], [], set()
+    for i, protein in enumerate(proteins_a):
+        if protein in first_b and protein not in seen:
+            seen.add(protein)
+            rows_a.append(i)
+            rows_b.append(first_b[protein])
+    return np.array(rows_a, dtype=np.intp), np.array(rows_b, dtype=np.intp)
+
+def _nan_stats(values):
+    n = np.count_nonzero(~np.isnan(values), axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return n, np.nanmean(values, axis=1), np.nanvar(values, axis=1, ddof=1)
+
+def welch_ttest(a, b):
+    # Two-sided Welch t-test of every row of b against the same row of a; NaN where R's t.test
+    # would fail (fewer than 2 values in a group, or no variance at all)
+    from scipy import stats
+    n_a, mean_a, var_a = _nan_stats(a)
+    n_b, mean_b, var_b = _nan_stats(b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        se_a, se_b = var_a / n_a, var_b / n_b
+        se2 = se_a + se_b
+        t = (mean_b - mean_a) / np.sqrt(se2)
+        df = se2 ** 2 / (se_a ** 2 / (n_a - 1) + se_b ** 2 / (n_b - 1))
+        p = 2 * stats.t.sf(np.abs(t), df)
+    p[(n_a < 2) | (n_b < 2) | ~(se2 > 0)] = np.nan
+    return p
+
+def mann_whitney(a, b):
+    # Two-sided Mann-Whitney U p-values per row. Rows are batched by their pattern of missing
+    # replicates so each batch is a single vectorized scipy call on complete data. Batches are
+    # split again into rows with and without ties, because scipy chooses between the exact and
+    # the tie-corrected normal test once per call; this keeps the per-protein choice.
+    from scipy import stats
+    p = np.full(a.shape[0], np.nan)
+    if not a.shape[0] or not a.shape[1] or not b.shape[1]:
+        return p
+    missing = np.concatenate([np.isnan(a), np.isnan(b)], axis=1)
+    patterns, inverse = np.unique(missing, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind="stable")
+    batches = np.split(order, np.cumsum(np.bincount(inverse, minlength=len(patterns)))[:-1])
+    for pattern, rows in zip(patterns, batches):
+        keep_a, keep_b = ~pattern[:a.shape[1]], ~pattern[a.shape[1]:]
+        if not keep_a.any() or not keep_b.any():
+            continue
+        sub_a, sub_b = a[np.ix_(rows, keep_a)], b[np.ix_(rows, keep_b)]
+        tied = (np.diff(np.sort(np.concatenate([sub_a, sub_b], axis=1), axis=1), axis=1) == 0).any(axis=1)
+        for part in (tied, ~tied):
+            if not part.any():
+                continue
+            with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                result = stats.mannwhitneyu(sub_b[part], sub_a[part], axis=1, alternative="two-sided")
+            p[rows[part]] = result.pvalue
+    return p
+
+def benjamini_hochberg(p):
+    # BH-adjusted q-values; NaN p-values stay NaN and are not counted as tests
+    p = np.asarray(p, dtype=float)
+    q = np.full(p.shape, np.nan)
+    tested = np.flatnonzero(~np.isnan(p))
+    if not len(tested):
+        return q
+    order = tested[np.argsort(p[tested], kind="stable")]
+    ranked = p[order] * len(order) / np.arange(1, len(order) + 1)
+    q[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return q
+
+def compare_conditions(cond_a, cond_b):
+    # All statistics for the proteins shared by two conditions, per measure
+    rows_a, rows_b = shared_rows(cond_a["proteins"], cond_b["proteins"])
+    result = {"proteins": [cond_a["proteins"][i] for i in rows_a]}
+    for measure in MEASURES:
+        a, b = cond_a[measure][rows_a], cond_b[measure][rows_b]
+        _, mean_a, _ = _nan_stats(a)
+        _, mean_b, _ = _nan_stats(b)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log2fc = np.log2(mean_b / mean_a)
+        p_welch, p_mwu = welch_ttest(a, b), mann_whitney(a, b)
+        result[measure] = {
+            "mean_a": mean_a, "mean_b": mean_b, "log2fc": log2fc,
+            "p_welch": p_welch, "q_welch": benjamini_hochberg(p_welch),
+            "p_mwu": p_mwu, "q_mwu": benjamini_hochberg(p_mwu),
+        }
+    return result
+
+def comparison_pairs(labels, reference=None):
+    # Every pair of conditions, or every condition against one reference
+    if reference is None:
+        return list(itertools.combinations(range(len(labels)), 2))
+    ref = labels.index(reference)
+    return [(ref, i) for i in range(len(labels)) if i != ref]
+
+def run_differential_abundance(paths, labels=None, reference=None):
+    labels = labels or [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    if len(labels) != len(paths):
+        raise ValueError("Give one label per input file.")
+    if reference is not None and reference not in labels:
+        raise ValueError(f"Reference '{reference}' is not one of the labels: {', '.join(labels)}")
+    conditions = [load_condition(p) for p in paths]
+    results = []
+    for i, j in comparison_pairs(labels, reference):
+        results.append((f"{labels[j]} vs {labels[i]}", compare_conditions(conditions[i], conditions[j])))
+    return results
+
+def _fmt(value):
+    return "NA" if np.isnan(value) else f"{value:.6g}"
+
+def write_results(results, output_path):
+    # One row per comparison, protein and measure; NA where a statistic is undefined
+    delimiter = "," if output_path.lower().endswith(".csv") else "\t"
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(RESULT_COLUMNS)
+        for comparison, result in results:
+            for measure in MEASURES:
+                cols = result[measure]
+                for k, protein in enumerate(result["proteins"]):
+                    writer.writerow([comparison, protein, measure] + [
+                        _fmt(cols[name][k]) for name in
+                        ("mean_a", "mean_b", "log2fc", "p_welch", "q_welch", "p_mwu", "q_mwu")])
+    return output_path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="differential_abundance.py",
+        description="Fold change, Welch t-test, Mann-Whitney U and BH q-values for the SpC/TIC replicates "
+                    "of proteins shared between conditions (one workbook per condition).")
+    parser.add_argument("workbooks", nargs="+", help="one Excel file per condition (at least 2)")
+    parser.add_argument("--labels", help="comma-separated condition labels (default: file names)")
+    parser.add_argument("--reference", help="compare every condition against this label only")
+    parser.add_argument("-o", "--output", default="differential_abundance.tsv",
+                        help="results table (.tsv or .csv)")
+    args = parser.parse_args(argv)
+    if len(args.workbooks) < 2:
+        parser.error("at least two workbooks are needed")
+    labels = [l.strip() for l in args.labels.split(",")] if args.labels else None
+    results = run_differential_abundance(args.workbooks, labels, args.reference)
+    write_results(results, args.output)
+    print(f"{len(results)} comparison(s) written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
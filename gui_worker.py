@@ -0,0 +1,150 @@
+import os
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, CancelledError
+import instrumentation
+
+# -------------------------
+# Background work for the Tk GUIs
+# -------------------------
+# Heavy calls (parsing workbooks, cleaning reports, comparisons) run in a worker pool instead of
+# inside Tk callbacks, so windows keep redrawing. Workers never touch Tk: each finished call is put
+# on a queue, which the Tk event loop polls with after() to move the progress bar and, once every
+# call is done, to hand the results back. A single call run in a thread can also report how far it
+# has got (report_progress, e.g. rows read), which the bar then shows. Cancel drops calls that have
+# not started yet. A call running in a thread stops at its next report_progress or check_cancelled
+# (both raise Cancelled once Cancel is pressed), so it does not go on to write its outputs; calls
+# already running in worker processes finish, but their results are reported as cancelled.
+
+POLL_MS = 100
+
+class Cancelled(Exception):
+    pass
+
+class BackgroundRunner:
+    def __init__(self, parent):
+        self.parent = parent
+        self.frame = tk.Frame(parent)
+        self.status = tk.Label(self.frame, text="")
+        self.status.pack()
+        self.bar = ttk.Progressbar(self.frame, length=300)
+        self.bar.pack(pady=5)
+        self.cancel_button = tk.Button(self.frame, text="Cancel", command=self.cancel)
+        self.cancel_button.pack()
+        self._queue = queue.Queue()
+        self._pool = None
+        self._futures = []
+        self._cancel_event = threading.Event()
+
+    @property
+    def busy(self):
+        return self._pool is not None
+
+    def run(self, calls, on_done, processes=True, workers=None, label="file"):
+        # calls: [(function, args tuple)]; with processes=True the functions and their results must be
+        # picklable (module-level functions). on_done(results, cancelled) is called in the Tk thread,
+        # results being (value, error message or None) per call, in call order.
+        if self.busy:
+            return False
+        if not calls:
+            on_done([], False)
+            return True
+        self._results = [(None, "cancelled")] * len(calls)
+        self._finished, self._cancelled = 0, False
+        self._cancel_event = threading.Event()
+        self._on_done, self._label = on_done, label
+        self._in_processes = processes and len(calls) > 1
+        pool_type = ProcessPoolExecutor if self._in_processes else ThreadPoolExecutor
+        self._pool = pool_type(max_workers=workers or min(len(calls), os.cpu_count() or 1) or 1)
+        if len(calls) == 1:
+            # One long call: the bar shows activity until the call reports progress
+            self.bar.config(mode="indeterminate")
+            self.bar.start(10)
+        else:
+            self.bar.config(mode="determinate", maximum=len(calls), value=0)
+        self.status.config(text=f"Processing {len(calls)} {label}{'s' if len(calls) != 1 else ''}...")
+        self.cancel_button.config(state="normal")
+        self.frame.pack(pady=10)
+        self._futures = []
+        for i, (function, args) in enumerate(calls):
+            if self._in_processes:
+                # Stages recorded in the workers come back with the results (see instrumentation.py)
+                future = self._pool.submit(instrumentation.recorded, function, *args)
+            else:
+                future = self._pool.submit(function, *args)
+            future.add_done_callback(lambda f, i=i: self._queue.put((i, f)))
+            self._futures.append(future)
+        self.parent.after(POLL_MS, self._poll)
+        return True
+
+    def report_progress(self, done, total=None, unit="rows"):
+        # Safe to call from the worker thread: done of total units of the single running call
+        self.check_cancelled()
+        self._queue.put((None, (done, total, unit)))
+
+    def check_cancelled(self):
+        # Called by work running in a thread; raises Cancelled once Cancel has been pressed
+        if self._cancel_event.is_set():
+            raise Cancelled()
+
+    def _show_progress(self, done, total, unit):
+        if self._cancelled or len(self._futures) != 1:
+            return
+        if total:
+            if str(self.bar.cget("mode")) != "determinate":
+                self.bar.stop()
+                self.bar.config(mode="determinate", maximum=total)
+            self.bar.config(value=min(done, total))
+            self.status.config(text=f"{done:,} of {total:,} {unit} read")
+        else:
+            self.status.config(text=f"{done:,} {unit} read")
+
+    def cancel(self):
+        if not self.busy:
+            return
+        self._cancelled = True
+        self._cancel_event.set()
+        for future in self._futures:
+            future.cancel()
+        self.cancel_button.config(state="disabled")
+        self.status.config(text="Cancelling...")
+
+    def _poll(self):
+        try:
+            while True:
+                i, item = self._queue.get_nowait()
+                if i is None:
+                    self._show_progress(*item)
+                    continue
+                future = item
+                self._finished += 1
+                if not self._cancelled:
+                    try:
+                        value = future.result()
+                        if self._in_processes:
+                            value, recording = value
+                            instrumentation.absorb(recording)
+                        self._results[i] = (value, None)
+                    except CancelledError:
+                        pass
+                    except Exception as e:
+                        self._results[i] = (None, f"{type(e).__name__}: {e}")
+                    if len(self._futures) > 1:
+                        self.bar.config(value=self._finished)
+                        self.status.config(text=f"{self._finished} of {len(self._futures)} {self._label}s done")
+        except queue.Empty:
+            pass
+        if self._finished < len(self._futures):
+            self.parent.after(POLL_MS, self._poll)
+            return
+        self._pool.shutdown(wait=False)
+        self._pool = None
+        self.bar.stop()
+        self.frame.pack_forget()
+        self._on_done(self._results, self._cancelled)
+
+def report_errors(results, names):
+    # "name: error" lines for the calls that failed
+    return "\n".join(f"{name}: {error}" for name, (_, error) in zip(names, results) if error)
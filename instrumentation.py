@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+
+# -------------------------
+# Opt-in run reports
+# -------------------------
+# The tools mark their stages (load, aggregate, compare, write, ...) with `with stage(name) as s:`.
+# While reporting is off, stage() returns a shared do-nothing object, so marked code costs nothing
+# measurable. Once on, through --report on a tool's command line or the PROTEOMICS_REPORT
+# environment variable (the report path), every stage records its wall and CPU time, peak RSS, the
+# records it handled and the bytes it read and wrote, and a JSON report is written when the process
+# exits. --profile STAGE (or PROTEOMICS_PROFILE) also runs that stage under cProfile, "hot" keeping
+# the profile of the slowest top-level stage; the .prof file opens with pstats or snakeviz.
+#
+# Peak RSS is per stage where /proc/self/clear_refs can reset the high-water mark (Linux), and the
+# process peak so far elsewhere; it covers this process only, not worker processes. Stages run in
+# worker processes are sent back with the results (recorded() / absorb()) and appear in the report.
+
+_state = {"report": None, "profile": None, "tool": None, "started": None, "pid": None}
+_records = []
+_local = threading.local()
+_hot = {"wall_s": -1.0, "stage": None, "stats": None}
+
+# -------------------------
+# Memory
+# -------------------------
+def peak_rss_mb():
+    # VmHWM where /proc exists: unlike ru_maxrss it does not include what a parent process had
+    # mapped before this one was started, and it can be reset between stages
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:            # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def reset_peak_rss():
+    # Returns False where the high-water mark cannot be reset
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+# -------------------------
+# Stages
+# -------------------------
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError, ValueError):
+        return 0
+
+class _NullStage:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def add(self, records): pass
+    def read(self, *paths): pass
+    def wrote(self, *paths): pass
+
+_NULL_STAGE = _NullStage()
+
+class Stage:
+    def __init__(self, name, labels):
+        self.name, self.labels = name, labels
+        self.records = self.bytes_read = self.bytes_written = 0
+        self.peak = None
+        self.profile = None
+
+    def add(self, records):
+        self.records += records
+
+    def read(self, *paths):
+        self.bytes_read += sum(_file_size(p) for p in paths)
+
+    def wrote(self, *paths):
+        self.bytes_written += sum(_file_size(p) for p in paths)
+
+    def __enter__(self):
+        stack = _stack()
+        # Fold the peak so far into the enclosing stages before the high-water mark is reset
+        current = peak_rss_mb()
+        for outer in stack:
+            outer.peak = _max(outer.peak, current)
+        self.separate_rss = reset_peak_rss()
+        self.path = "/".join([s.name for s in stack] + [self.name])
+        profile = _state["profile"]
+        if profile == self.name or (profile == "hot" and not stack):
+            if not any(s.profile for s in stack):
+                import cProfile
+                self.profile = cProfile.Profile()
+        stack.append(self)
+        self.started = time.perf_counter(), time.process_time(), time.strftime("%Y-%m-%dT%H:%M:%S")
+        if self.profile:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile:
+            self.profile.disable()
+        wall = time.perf_counter() - self.started[0]
+        cpu = time.process_time() - self.started[1]
+        _stack().pop()
+        self.peak = _max(self.peak, peak_rss_mb())
+        for outer in _stack():
+            outer.peak = _max(outer.peak, self.peak)
+        _records.append({"stage": self.name, "path": self.path, **self.labels, "started": self.started[2],
+                         "wall_s": round(wall, 4), "cpu_s": round(cpu, 4), "peak_rss_mb": self.peak,
+                         "rss_is_process_peak": not self.separate_rss, "records": self.records,
+                         "bytes_read": self.bytes_read, "bytes_written": self.bytes_written,
+                         "pid": os.getpid(), "failed": exc_type is not None})
+        if self.profile:
+            # The collected stats (unlike the profiler) can be pickled back from worker processes
+            self.profile.create_stats()
+            _keep_hottest(wall, self.path, self.profile.stats)
+        return False
+
+def _keep_hottest(wall, path, stats):
+    if wall > _hot["wall_s"]:
+        _hot.update(wall_s=wall, stage=path, stats=stats)
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+def enabled():
+    return _state["report"] is not None
+
+def stage(name, **labels):
+    # Context manager for one stage; labels (file=..., tool=...) are copied into its report entry
+    if _state["report"] is None:
+        return _NULL_STAGE
+    return Stage(name, labels)
+
+# -------------------------
+# Worker processes
+# -------------------------
+def drain():
+    # Removes and returns what this process has recorded so far: (stages, hottest profile or None)
+    taken = _records[:]
+    del _records[:len(taken)]
+    hot = (_hot["wall_s"], _hot["stage"], _hot["stats"]) if _hot["stats"] is not None else None
+    _hot.update(wall_s=-1.0, stage=None, stats=None)
+    return taken, hot
+
+def recorded(function, *args, **kwargs):
+    # Worker entry point: runs function and returns (its result, what it recorded)
+    drain()
+    result = function(*args, **kwargs)
+    return result, drain()
+
+def absorb(recording):
+    # Adds what recorded() brought back from a worker process to this process's report
+    stages, hot = recording
+    if enabled():
+        _records.extend(stages)
+        if hot:
+            _keep_hottest(*hot)
+
+# -------------------------
+# Configuration and the report
+# -------------------------
+def configure(report=None, profile=None, tool=None):
+    # Turns reporting on when a report path is given (or PROTEOMICS_REPORT is set); the environment
+    # is updated too, so worker processes record their stages as well
+    report = report or os.environ.get("PROTEOMICS_REPORT") or None
+    profile = profile or os.environ.get("PROTEOMICS_PROFILE") or None
+    if profile and not report:
+        raise ValueError("--profile needs a report path (--report or PROTEOMICS_REPORT)")
+    if not report:
+        return False
+    os.environ["PROTEOMICS_REPORT"] = report
+    if profile:
+        os.environ["PROTEOMICS_PROFILE"] = profile
+    first = _state["report"] is None
+    _state.update(report=report, profile=profile, tool=tool or _state["tool"] or _default_tool())
+    if first:
+        _state.update(started=(time.perf_counter(), time.process_time(), time.strftime("%Y-%m-%dT%H:%M:%S")),
+                      pid=os.getpid())
+        atexit.register(_write_at_exit)
+    return True
+
+def add_arguments(parser):
+    parser.add_argument("--report", metavar="JSON",
+                        help="write a per-stage run report (time, CPU, memory, records, bytes) to this file")
+    parser.add_argument("--profile", metavar="STAGE",
+                        help="also cProfile this stage ('hot': the slowest top-level stage) next to the report")
+
+def _default_tool():
+    return os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+
+def _totals(stages):
+    totals = {}
+    for s in stages:
+        t = totals.setdefault(s["path"], {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "records": 0,
+                                          "bytes_read": 0, "bytes_written": 0, "peak_rss_mb": None})
+        t["calls"] += 1
+        for key in ("wall_s", "cpu_s", "records", "bytes_read", "bytes_written"):
+            t[key] += s[key]
+        t["peak_rss_mb"] = _max(t["peak_rss_mb"], s["peak_rss_mb"])
+    for t in totals.values():
+        t["wall_s"], t["cpu_s"] = round(t["wall_s"], 4), round(t["cpu_s"], 4)
+    return totals
+
+def build_report():
+    stages = list(_records)
+    started = _state["started"] or (time.perf_counter(), time.process_time(), None)
+    return {"tool": _state["tool"], "argv": sys.argv[1:], "pid": os.getpid(), "started": started[2],
+            "wall_s": round(time.perf_counter() - started[0], 4),
+            "cpu_s": round(time.process_time() - started[1], 4),
+            "peak_rss_mb": _max(peak_rss_mb(), max((s["peak_rss_mb"] for s in stages if s["pid"] == os.getpid()
+                                                    and s["peak_rss_mb"] is not None), default=None)),
+            "stages": stages, "totals": _totals(stages), "profile": None}
+
+def write_report(path=None):
+    # Writes the report (and the profile dump, if one was taken) and returns the report path
+    path = path or _state["report"]
+    report = build_report()
+    if _hot["stats"] is not None:
+        import marshal
+        stage_name = _hot["stage"].replace("/", ".")
+        profile_path = f"{os.path.splitext(path)[0]}.{stage_name}.prof"
+        with open(profile_path, "wb") as f:
+            marshal.dump(_hot["stats"], f)      # the format of cProfile.Profile.dump_stats
+        report["profile"] = {"stage": _hot["stage"], "wall_s": round(_hot["wall_s"], 4), "path": profile_path}
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+    return path
+
+def _write_at_exit():
+    # Only the process that turned reporting on writes the report; workers hand their stages back
+    multiprocessing = sys.modules.get("multiprocessing")
+    if os.getpid() != _state["pid"] or (multiprocessing and multiprocessing.parent_process() is not None):
+        return
+    try:
+        path = write_report()
+        print(f"Run report written to {path}", file=sys.stderr)
+    except OSError as e:
+        print(f"Could not write run report: {e}", file=sys.stderr)
+
+# Worker processes (and tools run under PROTEOMICS_REPORT without --report) start recording on import
+if os.environ.get("PROTEOMICS_REPORT"):
+    configure()
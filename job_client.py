@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import random
+import asyncio
+import argparse
+import urllib.error
+import urllib.request
+from Cleaner import open_text, clean_psortb_file, clean_cello_file
+
+# -------------------------
+# Asynchronous job submission (README LOCALIZATION steps 2-4, COG step 1)
+# -------------------------
+# Splits a _cleaned.fasta into batches (bounded by sequence count and size), submits them to a
+# prediction service with a limited number of jobs in flight, retries transient failures with
+# exponential backoff and jitter, polls until each job is done, concatenates the batch reports in
+# input order and hands the merged report to the existing cleaner for that tool.
+# The service is reached through a backend object with three coroutines:
+#   submit(tool, fasta) -> job id,  status(job id) -> "running" | "done" | "failed",  fetch(job id) -> text
+# HttpBackend speaks the REST protocol of mock_job_server.py; other services plug in the same way.
+
+TOOLS = ("psortb", "cello", "eggnog")
+REPORT_SUFFIXES = {"psortb": "_psortb.txt", "cello": "_cello.txt", "eggnog": ".emapper.annotations"}
+
+class TransientError(Exception):
+    # Failures worth retrying: timeouts, refused connections, HTTP 429 and 5xx, failed jobs
+    pass
+
+# -------------------------
+# Batching
+# -------------------------
+def iter_fasta_records(path):
+    # Yields whole records (header plus sequence lines) as text
+    record = []
+    with open_text(path) as f:
+        for line in f:
+            if line.startswith(">") and record:
+                yield "".join(record)
+                record = []
+            if line.strip():
+                record.append(line if line.endswith("\n") else line + "\n")
+    if record:
+        yield "".join(record)
+
+def split_fasta(path, max_sequences=500, max_bytes=1 << 20):
+    # Groups records into batches of at most max_sequences records and (except for a single oversized
+    # record) max_bytes characters; services usually cap both
+    batches, batch, size = [], [], 0
+    for record in iter_fasta_records(path):
+        if batch and (len(batch) >= max_sequences or size + len(record) > max_bytes):
+            batches.append("".join(batch))
+            batch, size = [], 0
+        batch.append(record)
+        size += len(record)
+    if batch:
+        batches.append("".join(batch))
+    return batches
+
+# -------------------------
+# Backends
+# -------------------------
+class HttpBackend:
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, data=None):
+        request = urllib.request.Request(self.base_url + path, data=data, method="POST" if data else "GET",
+                                         headers={"Content-Type": "text/plain"} if data else {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read().decode()
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                raise TransientError(f"HTTP {e.code} from {path}") from e
+            raise
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise TransientError(f"{path}: {e}") from e
+
+    # urllib blocks, so each request runs on a worker thread while the event loop keeps the other jobs moving
+    async def submit(self, tool, fasta):
+        body = await asyncio.to_thread(self._request, f"/jobs/{tool}", fasta.encode())
+        return json.loads(body)["job_id"]
+
+    async def status(self, job_id):
+        body = await asyncio.to_thread(self._request, f"/jobs/{job_id}")
+        return json.loads(body)["status"]
+
+    async def fetch(self, job_id):
+        return await asyncio.to_thread(self._request, f"/jobs/{job_id}/result")
+
+# -------------------------
+# Submission
+# -------------------------
+async def run_batch(backend, tool, fasta, retries=5, backoff=1.0, max_backoff=30.0, poll_interval=5.0):
+    # One batch from submission to report. A request that fails transiently is repeated and a job
+    # that ends as "failed" is submitted again; both draw on one budget of `retries` retries per batch.
+    failures = 0
+
+    async def retry_later(error):
+        nonlocal failures
+        if failures == retries:
+            raise error
+        # Full jitter keeps many clients (or many batches) from retrying in lockstep
+        await asyncio.sleep(random.uniform(0, min(max_backoff, backoff * 2 ** failures)))
+        failures += 1
+
+    async def request(call):
+        while True:
+            try:
+                return await call()
+            except TransientError as e:
+                await retry_later(e)
+
+    while True:
+        job_id = await request(lambda: backend.submit(tool, fasta))
+        state = await request(lambda: backend.status(job_id))
+        while state not in ("done", "failed"):
+            await asyncio.sleep(poll_interval)
+            state = await request(lambda: backend.status(job_id))
+        if state == "done":
+            return await request(lambda: backend.fetch(job_id))
+        await retry_later(TransientError(f"job {job_id} failed"))
+
+async def run_batches(backend, tool, batches, concurrency=4, on_done=None, **options):
+    # Runs every batch with at most `concurrency` jobs in flight; reports come back in batch order.
+    # on_done(finished, total) is called as batches complete.
+    limit = asyncio.Semaphore(concurrency)
+    finished = 0
+
+    async def one(fasta):
+        nonlocal finished
+        async with limit:
+            report = await run_batch(backend, tool, fasta, **options)
+        finished += 1
+        if on_done:
+            on_done(finished, len(batches))
+        return report
+
+    return await asyncio.gather(*(one(fasta) for fasta in batches))
+
+def clean_report(tool, report_path, output_dir=None):
+    # Hands a merged report to the step that normally follows the website download; the result goes
+    # to output_dir (default: next to the report)
+    output_dir = output_dir or os.path.dirname(os.path.abspath(report_path))
+    base = os.path.splitext(os.path.basename(report_path))[0]
+    if tool == "psortb":
+        return clean_psortb_file(report_path, os.path.join(output_dir, base + "_cleaned.txt"))
+    if tool == "cello":
+        return clean_cello_file(report_path, os.path.join(output_dir, base + "_cleaned.txt"))
+    from parse_and_compare_COGs import create_cog_lists
+    return create_cog_lists(report_path, os.path.join(output_dir, base + "_proteins_per_COG.txt"))
+
+async def submit_fasta(fasta_path, tools, backend, max_sequences=500, max_bytes=1 << 20,
+                       concurrency=4, output_dir=None, on_done=None, **options):
+    # Submits one FASTA to every tool; the tools run side by side, each with its own concurrency
+    # limit. Returns {tool: (merged report path, cleaned output path)}.
+    batches = split_fasta(fasta_path, max_sequences, max_bytes)
+    if not batches:
+        raise ValueError(f"{os.path.basename(fasta_path)}: no FASTA records found")
+    base = os.path.splitext(os.path.basename(fasta_path))[0]
+    output_dir = output_dir or os.path.dirname(os.path.abspath(fasta_path))
+
+    async def one_tool(tool):
+        reports = await run_batches(backend, tool, batches, concurrency,
+                                    on_done=(lambda k, n: on_done(tool, k, n)) if on_done else None, **options)
+        report_path = os.path.join(output_dir, base + REPORT_SUFFIXES[tool])
+        with open(report_path, "w") as out:
+            for report in reports:
+                out.write(report if report.endswith("\n") or not report else report + "\n")
+        return tool, (report_path, await asyncio.to_thread(clean_report, tool, report_path, output_dir))
+
+    return dict(await asyncio.gather(*(one_tool(tool) for tool in tools)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="job_client.py",
+        description="Submit a cleaned FASTA to PSORTb, CELLO and/or eggNOG-mapper in batches and clean the results.")
+    parser.add_argument("fasta", help="_cleaned.fasta from Cleaner.py or uniprot_store.py")
+    parser.add_argument("--tools", default="psortb,cello,eggnog", help="comma-separated: " + ", ".join(TOOLS))
+    parser.add_argument("--server", default="http://127.0.0.1:8765", help="job service URL")
+    parser.add_argument("--batch-size", type=int, default=500, help="sequences per job (default 500)")
+    parser.add_argument("--max-batch-bytes", type=int, default=1 << 20, help="FASTA characters per job")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="jobs in flight per tool (default 4)")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--backoff", type=float, default=1.0, help="first retry delay in seconds, doubled each time")
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("-o", "--output-dir", help="where merged reports go (default: next to the FASTA)")
+    args = parser.parse_args(argv)
+    tools = [t.strip().lower() for t in args.tools.split(",") if t.strip()]
+    unknown = [t for t in tools if t not in TOOLS]
+    if unknown:
+        parser.error(f"unknown tool(s): {', '.join(unknown)}")
+
+    def progress(tool, finished, total):
+        print(f"{tool}: {finished} of {total} batches done")
+
+    results = asyncio.run(submit_fasta(
+        args.fasta, tools, HttpBackend(args.server, args.timeout), args.batch_size, args.max_batch_bytes,
+        args.concurrency, args.output_dir, progress,
+        retries=args.retries, backoff=args.backoff, poll_interval=args.poll_interval))
+    for tool, (report_path, cleaned) in results.items():
+        print(f"{tool}: {report_path} -> {cleaned}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import sys
+import json
+import time
+import random
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------------------
+# Local stand-in for the PSORTb / CELLO / eggNOG-mapper services
+# -------------------------
+# Speaks the small REST protocol job_client.HttpBackend uses, so batching, concurrency, retries
+# and the hand-off to the cleaners can be exercised offline:
+#   POST /jobs/<tool>         FASTA body       -> 202 {"job_id": ...}
+#   GET  /jobs/<id>                            -> 200 {"status": "running" | "done" | "failed"}
+#   GET  /jobs/<id>/result                     -> 200 report text in the tool's own format
+# Latency and failure rates are configurable; predictions are deterministic per sequence ID.
+
+TOOLS = ("psortb", "cello", "eggnog")
+LOCALIZATIONS = ("Cytoplasmic", "CytoplasmicMembrane", "Periplasmic", "OuterMembrane", "Extracellular")
+CELLO_LOCALIZATIONS = ("Cytoplasmic", "InnerMembrane", "Periplasmic", "OuterMembrane", "Extracellular")
+COG_CODES = ("C", "E", "G", "J", "K", "KT", "M", "S", "-", "EG", "L", "P")
+
+def _pick(seq_id, choices):
+    return choices[zlib.crc32(seq_id.encode()) % len(choices)]
+
+def fasta_ids(fasta):
+    return [line[1:].split()[0] for line in fasta.splitlines() if line.startswith(">") and line[1:].strip()]
+
+def psortb_report(ids):
+    out = []
+    for seq_id in ids:
+        loc = _pick(seq_id, LOCALIZATIONS)
+        out.append(f"SeqID: {seq_id}\n  Analysis Report:\n    CMSVM+  Unknown  [No details]\n"
+                   f"  Localization Scores:\n    {loc:<22} 9.97\n  Final Prediction:\n"
+                   f"    {loc:<22} 9.97\n" + "-" * 79 + "\n\n")
+    return "".join(out)
+
+def cello_report(ids):
+    return "".join(f"{i + 1}\t{seq_id}\t{_pick(seq_id, CELLO_LOCALIZATIONS)}\n" for i, seq_id in enumerate(ids))
+
+def eggnog_report(ids):
+    lines = ["## emapper-mock", "## time: 0",
+             "#query\tseed_ortholog\tevalue\tscore\teggNOG_OGs\tmax_annot_lvl\tCOG_category\tDescription"]
+    for seq_id in ids:
+        lines.append(f"{seq_id}\t{seq_id}\t1e-50\t200.0\tCOG0001@1|root\t2|Bacteria\t{_pick(seq_id, COG_CODES)}\t-")
+    lines.append(f"## {len(ids)} queries scanned")
+    return "\n".join(lines) + "\n"
+
+REPORTS = {"psortb": psortb_report, "cello": cello_report, "eggnog": eggnog_report}
+
+class MockJobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, error_rate=0.0, job_failure_rate=0.0, seed=None):
+        super().__init__(address, MockJobHandler)
+        self.latency = latency                    # seconds until a job is done
+        self.error_rate = error_rate              # chance of a 503 on any request
+        self.job_failure_rate = job_failure_rate  # chance a job ends as "failed"
+        self.random = random.Random(seed)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.stats = {"submitted": 0, "errors": 0, "failed_jobs": 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+class MockJobHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, code, body, content_type="application/json"):
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _flaky(self):
+        server = self.server
+        with server.lock:
+            failed = server.random.random() < server.error_rate
+            if failed:
+                server.stats["errors"] += 1
+        if failed:
+            self._send(503, {"error": "temporarily unavailable"})
+        return failed
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "jobs" or parts[1] not in TOOLS:
+            return self._send(404, {"error": "unknown endpoint"})
+        fasta = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        if self._flaky():
+            return
+        server = self.server
+        with server.lock:
+            job_id = f"{parts[1]}-{len(server.jobs) + 1}"
+            fails = server.random.random() < server.job_failure_rate
+            server.jobs[job_id] = {"tool": parts[1], "ids": fasta_ids(fasta),
+                                   "ready": time.monotonic() + server.latency, "fails": fails}
+            server.stats["submitted"] += 1
+            if fails:
+                server.stats["failed_jobs"] += 1
+        self._send(202, {"job_id": job_id})
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) < 2 or parts[0] != "jobs":
+            return self._send(404, {"error": "unknown endpoint"})
+        if self._flaky():
+            return
+        job = self.server.jobs.get(parts[1])
+        if job is None:
+            return self._send(404, {"error": "unknown job"})
+        done = time.monotonic() >= job["ready"]
+        if len(parts) == 2:
+            status = "running" if not done else ("failed" if job["fails"] else "done")
+            return self._send(200, {"status": status})
+        if len(parts) == 3 and parts[2] == "result" and done and not job["fails"]:
+            return self._send(200, REPORTS[job["tool"]](job["ids"]), "text/plain")
+        self._send(409, {"error": "result not available"})
+
+def start_in_thread(host="127.0.0.1", port=0, **options):
+    # Starts a server on a background thread (port 0 picks a free port); call .shutdown() when done
+    server = MockJobServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="mock_job_server.py",
+                                     description="Offline stand-in for the PSORTb, CELLO and eggNOG-mapper services.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds until each job finishes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--job-failure-rate", type=float, default=0.0, help="fraction of jobs that end as failed")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    server = MockJobServer((args.host, args.port), latency=args.latency, error_rate=args.error_rate,
+                           job_failure_rate=args.job_failure_rate, seed=args.seed)
+    print(f"Mock job server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,27 @@
 import os
-import statistics
-import openpyxl
-from openpyxl import Workbook
-import tkinter as tk
-from tkinter import Tk, filedialog, simpledialog
-
-def select_excel_file():
-    root = Tk()
-    root.withdraw()
+import sys
+import csv
+import argparse
+import warnings
+import numpy as np
+import instrumentation
+from instrumentation import stage
+from parse_cache import cached_parse
+# openpyxl and tkinter are imported where they are used, so headless runs that hit the parse
+# cache never load them (see startup_time.py)
+
+def select_excel_file(root=None):
+    from tkinter import Tk, filedialog
+    if root is None:
+        root = Tk()
+        root.withdraw()
     file_path = filedialog.askopenfilename(
-        title="Select Excel File", filetypes=[("Excel files", "*.xlsx")]
+        parent=root, title="Select Excel File", filetypes=[("Excel files", "*.xlsx")]
     )
     return file_path
 
 def get_thresholds():
+    from tkinter import simpledialog
     try:
         min_spc = float(simpledialog.askstring("Minimum SpC", "Enter minimum SpC value:"))
         min_tic = float(simpledialog.askstring("Minimum TIC", "Enter minimum TIC value:"))
@@ -23,93 +31,310 @@ def get_thresholds():
         return None, None
 
 def get_output_filename():
+    from tkinter import simpledialog
     filename = simpledialog.askstring(
         "Output File Name",
         "Enter filename for significantly changed proteins (without extension):"
     )
     return f"{filename}.txt" if filename else None
 
-def load_workbook_and_identify_columns(file_path):
-    wb = openpyxl.load_workbook(file_path)
-    if "Protein list" not in wb.sheetnames:
-        print("Sheet 'Protein list' not found.")
-        return None, None, None, None
+def load_workbook_and_identify_columns(file_path, read_only=False):
+    # read_only=True streams the sheet instead of loading every cell of every sheet;
+    # the caller must then close the workbook when done (it is closed here when nothing is returned)
+    import openpyxl
+    wb = openpyxl.load_workbook(file_path, read_only=read_only)
+    found = False
+    try:
+        if "Protein list" not in wb.sheetnames:
+            print("Sheet 'Protein list' not found.")
+            return None, None, None, None
 
-    sheet = wb["Protein list"]
-    headers = [cell.value for cell in sheet[1]]
+        sheet = wb["Protein list"]
+        headers = list(next(sheet.iter_rows(max_row=1, values_only=True), ()))
 
-    try:
-        protein_col = headers.index("ProteinAC")
-    except ValueError:
         try:
-            protein_col = headers.index("Protein AC")
+            protein_col = headers.index("ProteinAC")
         except ValueError:
-            print("Column 'ProteinAC' or 'Protein AC' not found.")
+            try:
+                protein_col = headers.index("Protein AC")
+            except ValueError:
+                print("Column 'ProteinAC' or 'Protein AC' not found.")
+                return None, None, None, None
+
+        spc_cols = [i for i, h in enumerate(headers) if isinstance(h, str) and h.startswith("SpC")]
+        tic_cols = [i for i, h in enumerate(headers) if isinstance(h, str) and h.startswith("TIC")]
+
+        if not spc_cols and not tic_cols:
+            print("No 'SpC' or 'TIC' columns found.")
             return None, None, None, None
+        found = True
+        return wb, sheet, protein_col, (spc_cols, tic_cols)
+    finally:
+        if not found:
+            wb.close()
+
+def iter_used_rows(sheet, protein_col, spc_cols, tic_cols):
+    # Yields data rows restricted to the span of columns we use, re-indexed so the original
+    # column positions still apply (cells left of the span are padded with None)
+    first = min([protein_col] + spc_cols + tic_cols)
+    last = max([protein_col] + spc_cols + tic_cols)
+    padding = (None,) * first
+    for row in sheet.iter_rows(min_row=2, min_col=first + 1, max_col=last + 1, values_only=True):
+        yield padding + tuple(row)
+
+SUMMARY_HEADERS = [
+    "Protein AC", "Average SpC", "Average TIC",
+    "Median SpC", "SD SpC", "CV SpC", "Missing SpC",
+    "Median TIC", "SD TIC", "CV TIC", "Missing TIC",
+]
 
-    spc_cols = [i for i, h in enumerate(headers) if isinstance(h, str) and h.startswith("SpC")]
-    tic_cols = [i for i, h in enumerate(headers) if isinstance(h, str) and h.startswith("TIC")]
+# Rows read between progress reports
+PROGRESS_ROWS = 1000
 
-    if not spc_cols and not tic_cols:
-        print("No 'SpC' or 'TIC' columns found.")
-        return None, None, None, None
-    return wb, sheet, protein_col, (spc_cols, tic_cols)
+def read_replicate_matrices(rows, protein_col, spc_cols, tic_cols, progress=None, total=None):
+    # Collects the SpC and TIC replicate columns into (proteins x replicates) float matrices.
+    # Blank and non-numeric cells become NaN; rows without a protein AC are skipped.
+    # progress(rows read, total) is called every PROGRESS_ROWS rows and once at the end.
+    proteins, spc_rows, tic_rows = [], [], []
+    for n, row in enumerate(rows, 1):
+        if progress and n % PROGRESS_ROWS == 0:
+            progress(n, total)
+        protein_ac = row[protein_col]
+        if not protein_ac:
+            continue
+        proteins.append(protein_ac)
+        spc_rows.append([row[i] if isinstance(row[i], (int, float)) else np.nan for i in spc_cols])
+        tic_rows.append([row[i] if isinstance(row[i], (int, float)) else np.nan for i in tic_cols])
+    if progress:
+        progress(total if total is not None else len(proteins), total)
+    spc_values = np.array(spc_rows, dtype=float).reshape(len(proteins), len(spc_cols))
+    tic_values = np.array(tic_rows, dtype=float).reshape(len(proteins), len(tic_cols))
+    return proteins, spc_values, tic_values
+
+def summarize_replicates(values):
+    # NaN-aware per-protein mean, median, SD (n-1), CV and missing count in one vectorized pass
+    present = np.count_nonzero(~np.isnan(values), axis=1)
+    with warnings.catch_warnings():
+        # All-missing rows (and single replicates for the SD) legitimately produce NaN
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        mean = np.nanmean(values, axis=1)
+        median = np.nanmedian(values, axis=1)
+        sd = np.nanstd(values, axis=1, ddof=1)
+    cv = np.full_like(mean, np.nan)
+    np.divide(sd, mean, out=cv, where=(mean != 0) & ~np.isnan(sd))
+    return {"mean": mean, "median": median, "sd": sd, "cv": cv, "missing": values.shape[1] - present}
+
+def average_column(stats):
+    # Averages as the Summary sheet has always reported them: rounded to 2 places, 0.0 when no values
+    return [0.0 if np.isnan(m) else round(float(m), 2) for m in stats["mean"]]
+
+def _cell(value, digits=2):
+    return None if np.isnan(value) else round(float(value), digits)
+
+def build_summary_rows(proteins, spc_stats, tic_stats):
+    avg_spc, avg_tic = average_column(spc_stats), average_column(tic_stats)
+    rows = []
+    for i, protein_ac in enumerate(proteins):
+        rows.append([
+            protein_ac, avg_spc[i], avg_tic[i],
+            _cell(spc_stats["median"][i]), _cell(spc_stats["sd"][i]),
+            _cell(spc_stats["cv"][i], 3), int(spc_stats["missing"][i]),
+            _cell(tic_stats["median"][i]), _cell(tic_stats["sd"][i]),
+            _cell(tic_stats["cv"][i], 3), int(tic_stats["missing"][i]),
+        ])
+    return rows
+
+def select_most_changed(proteins, spc_stats, tic_stats, min_spc, min_tic):
+    avg_spc = np.array(average_column(spc_stats), dtype=float)
+    avg_tic = np.array(average_column(tic_stats), dtype=float)
+    keep = (avg_spc >= min_spc) & (avg_tic >= min_tic)
+    return [proteins[i] for i in np.flatnonzero(keep)]
+
+def write_summary_file(output_path, data_matrix):
+    # Writes the Summary table to its own file without touching the input workbook:
+    # .csv/.tsv as delimited text, anything else as a write-only (streamed) workbook
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext in (".csv", ".tsv"):
+        with open(output_path, "w", newline="") as f:
+            writer = csv.writer(f, delimiter="\t" if ext == ".tsv" else ",")
+            writer.writerow(SUMMARY_HEADERS)
+            writer.writerows(data_matrix)
+        return output_path
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    summary_sheet = wb.create_sheet("Summary")
+    summary_sheet.append(SUMMARY_HEADERS)
+    for row in data_matrix:
+        summary_sheet.append(row)
+    wb.save(output_path)
+    return output_path
 
 def write_summary_sheet(wb, data_matrix):
     if "Summary" in wb.sheetnames:
         del wb["Summary"]
     summary_sheet = wb.create_sheet("Summary")
-    summary_sheet.append(["Protein AC", "Average SpC", "Average TIC"])
+    summary_sheet.append(SUMMARY_HEADERS)
     for row in data_matrix:
         summary_sheet.append(row)
 
-def main():
-    file_path = select_excel_file()
-    if not file_path:
-        print("No file selected.")
-        return
+# Bump when the extraction below changes so cached matrices are re-parsed
+PARSER_VERSION = 1
 
-    min_spc, min_tic = get_thresholds()
-    if min_spc is None or min_tic is None:
-        return
+def _data_rows(sheet):
+    # Data rows below the header, as far as the sheet's dimensions tell (None if they don't)
+    return max(sheet.max_row - 1, 0) if sheet.max_row else None
 
-    output_txt_file = get_output_filename()
-    if not output_txt_file:
-        print("No output filename provided.")
-        return
-
-    wb, sheet, protein_col, (spc_cols, tic_cols) = load_workbook_and_identify_columns(file_path)
+def _parse_replicate_data(file_path, progress=None):
+    wb, sheet, protein_col, columns = load_workbook_and_identify_columns(file_path, read_only=True)
     if not wb:
-        return
+        return None
+    spc_cols, tic_cols = columns
+    try:
+        proteins, spc_values, tic_values = read_replicate_matrices(
+            iter_used_rows(sheet, protein_col, spc_cols, tic_cols), protein_col, spc_cols, tic_cols,
+            progress, _data_rows(sheet))
+    finally:
+        wb.close()
+    return {"proteins": np.array([str(p) for p in proteins], dtype=str), "spc": spc_values, "tic": tic_values}
 
-    data_matrix = []
-    most_changed_proteins = []
+def load_replicate_data(file_path, progress=None):
+    # Streams "Protein list" read-only (or loads it from the parse cache) and returns
+    # (proteins, SpC matrix, TIC matrix), or None if the sheet or columns are missing.
+    # progress is passed on to read_replicate_matrices; a cache hit reads no rows.
+    arrays = cached_parse(file_path, "replicates", PARSER_VERSION,
+                          lambda path: _parse_replicate_data(path, progress))
+    if arrays is None:
+        return None
+    return arrays["proteins"].tolist(), arrays["spc"], arrays["tic"]
 
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        protein_ac = row[protein_col]
-        if not protein_ac:
-            continue
+def process_workbook(file_path, min_spc, min_tic, output_txt_file, summary_path=None, store=None, run=None,
+                     progress=None, check_cancelled=None):
+    # With summary_path, "Protein list" is streamed read-only and the Summary goes to that file;
+    # otherwise the whole workbook is loaded and the Summary sheet is saved back into it.
+    # With store (a results_store.py database), the Summary rows are also loaded into it.
+    # progress(rows read, total rows) reports how far reading "Protein list" has got; check_cancelled()
+    # is called before anything is written and raises to stop (both come from the GUI's Cancel).
+    streaming = summary_path is not None
+    with stage("load", file=file_path) as s:
+        if streaming:
+            data = load_replicate_data(file_path, progress)
+            if data is None:
+                return False
+        else:
+            wb, sheet, protein_col, columns = load_workbook_and_identify_columns(file_path)
+            if not wb:
+                return False
+            spc_cols, tic_cols = columns
+            data = read_replicate_matrices(sheet.iter_rows(min_row=2, values_only=True),
+                                           protein_col, spc_cols, tic_cols, progress, _data_rows(sheet))
+        proteins, spc_values, tic_values = data
+        s.add(len(proteins))
+        s.read(file_path)
 
-        spc_vals = [row[i] for i in spc_cols if isinstance(row[i], (int, float))]
-        tic_vals = [row[i] for i in tic_cols if isinstance(row[i], (int, float))]
+    with stage("aggregate", file=file_path) as s:
+        spc_stats = summarize_replicates(spc_values)
+        tic_stats = summarize_replicates(tic_values)
+        data_matrix = build_summary_rows(proteins, spc_stats, tic_stats)
+        most_changed_proteins = select_most_changed(proteins, spc_stats, tic_stats, min_spc, min_tic)
+        s.add(len(proteins))
 
-        avg_spc = round(statistics.mean(spc_vals), 2) if spc_vals else 0.0
-        avg_tic = round(statistics.mean(tic_vals), 2) if tic_vals else 0.0
+    if check_cancelled:
+        check_cancelled()
+    with stage("write", file=file_path) as s:
+        if streaming:
+            write_summary_file(summary_path, data_matrix)
+            print(f"\nSummary written to {summary_path}")
+        else:
+            write_summary_sheet(wb, data_matrix)
+            wb.save(file_path)
+            print(f"\nSummary written to 'Summary' sheet in {os.path.basename(file_path)}")
 
-        data_matrix.append([protein_ac, avg_spc, avg_tic])
+        with open(output_txt_file, "w") as f:
+            for protein in most_changed_proteins:
+                f.write(str(protein) + "\n")
+        s.add(len(data_matrix))
+        s.wrote(summary_path if streaming else file_path, output_txt_file)
+    if store:
+        from results_store import run_name, store_abundance
+        store_abundance(store, run or run_name(file_path), data_matrix, source=file_path)
 
-        if avg_spc >= min_spc and avg_tic >= min_tic:
-            most_changed_proteins.append(protein_ac)
+    print(f"Significantly changed proteins saved to {output_txt_file}")
+    return True
 
-    write_summary_sheet(wb, data_matrix)
-    wb.save(file_path)
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        parser = argparse.ArgumentParser(
+            prog="most_changed_proteins.py",
+            description="Average SpC/TIC replicates and list proteins above both thresholds. "
+                        "Run with no arguments for the dialog-based version.")
+        parser.add_argument("workbook", help="Excel file with a 'Protein list' sheet")
+        parser.add_argument("--min-spc", type=float, required=True, help="minimum average SpC")
+        parser.add_argument("--min-tic", type=float, required=True, help="minimum average TIC")
+        parser.add_argument("-o", "--output", required=True, help="text file for the protein list")
+        parser.add_argument("--summary",
+                            help="Summary output (.xlsx, .csv or .tsv); default <workbook>_summary.xlsx")
+        parser.add_argument("--in-place", action="store_true",
+                            help="write the Summary sheet back into the workbook instead")
+        parser.add_argument("--store", metavar="DB",
+                            help="also load the Summary into this results store (results_store.py)")
+        parser.add_argument("--run", help="run name in the store (default: from the workbook name)")
+        instrumentation.add_arguments(parser)
+        args = parser.parse_args(argv)
+        instrumentation.configure(args.report, args.profile, tool="most_changed_proteins")
+        summary_path = None if args.in_place else (
+            args.summary or os.path.splitext(args.workbook)[0] + "_summary.xlsx")
+        ok = process_workbook(args.workbook, args.min_spc, args.min_tic, args.output, summary_path,
+                              args.store, args.run)
+        return 0 if ok else 1
 
-    with open(output_txt_file, "w") as f:
-        for protein in most_changed_proteins:
-            f.write(protein + "\n")
+    # One Tk root for the dialogs and the progress window
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    try:
+        file_path = select_excel_file(root)
+        if not file_path:
+            print("No file selected.")
+            return
 
-    print(f"\nSummary written to 'Summary' sheet in {os.path.basename(file_path)}")
-    print(f"Significantly changed proteins saved to {output_txt_file}")
+        min_spc, min_tic = get_thresholds()
+        if min_spc is None or min_tic is None:
+            return
+
+        output_txt_file = get_output_filename()
+        if not output_txt_file:
+            print("No output filename provided.")
+            return
+
+        process_workbook_with_progress(root, file_path, min_spc, min_tic, output_txt_file)
+    finally:
+        root.destroy()
+
+def process_workbook_with_progress(root, file_path, min_spc, min_tic, output_txt_file):
+    # Runs process_workbook on a background thread behind a small progress window in root, so the
+    # window keeps responding while a large workbook is read; the bar follows the rows read
+    import tkinter as tk
+    from gui_worker import BackgroundRunner
+    root.deiconify()
+    root.title("Most changed proteins")
+    tk.Label(root, text=f"Processing {os.path.basename(file_path)}").pack(padx=20, pady=10)
+    runner = BackgroundRunner(root)
+    outcome = []
+
+    def done(results, cancelled):
+        ok, error = results[0]
+        if cancelled:
+            print("Cancelled.")
+        elif error:
+            print(f"Error processing {os.path.basename(file_path)}: {error}")
+        outcome.append(bool(ok) and not cancelled)
+        root.quit()
+
+    runner.run([(process_workbook, (file_path, min_spc, min_tic, output_txt_file, None, None, None,
+                                    runner.report_progress, runner.check_cancelled))], done, processes=False, label="workbook")
+    root.mainloop()
+    return bool(outcome and outcome[0])
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
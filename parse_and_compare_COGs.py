@@ -1,7 +1,14 @@
-import openpyxl
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import numpy as np
 import os
+import sys
+import csv
+import argparse
+from accession_index import AccessionIndex, group_by_membership
+from Cleaner import open_text
+from parse_cache import cached_parse
+import instrumentation
+from instrumentation import stage
+# openpyxl (Excel exports only) and tkinter (GUI only) are imported where they are used
 
 # -------------------------
 # COG code to category name mapping
@@ -23,40 +30,133 @@ COG_CATEGORIES = {
     "Z": "Cytoskeleton", "-": "Not assigned / No COG code"
 }
 
+EGGNOG_FILETYPES = [("eggNOG exports", "*.xlsx *.annotations *.tsv *.gz"), ("All files", "*.*")]
+
 # -------------------------
 # Create_COG_lists
 # -------------------------
-def create_cog_lists(excel_path):
-    wb = openpyxl.load_workbook(excel_path)
-    sheet = wb.active
+# Header names eggNOG-mapper has used for the COG column (v2 and v1 outputs)
+COG_COLUMN_NAMES = ("COG_category", "COG cat", "COG Functional cat.")
+# Column layout assumed when no header row is found, as in the original Excel exports
+DEFAULT_COG_COLUMN = 6
+EXCEL_DEFAULT_FIRST_ROW = 4
+
+def _find_cog_column(row):
+    first = str(row[0]).lstrip("#").strip() if row and row[0] is not None else ""
+    if first not in ("query", "query_name"):
+        return None
+    for name in COG_COLUMN_NAMES:
+        if name in row:
+            return row.index(name)
+    return None
+
+def _iter_annotation_rows(path):
+    # Rows of an eggNOG export as tuples: read-only streamed Excel, or the native tab-separated
+    # .emapper.annotations file (optionally gzipped)
+    if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm"):
+        import openpyxl
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            yield from wb.active.iter_rows(values_only=True)
+        finally:
+            wb.close()
+    else:
+        with open_text(path) as f:
+            for line in f:
+                yield tuple(line.rstrip("\r\n").split("\t"))
 
-    cog_map = {}
-    for row in sheet.iter_rows(min_row=4, values_only=True):
+def iter_eggnog_annotations(path):
+    # Streams (protein id, raw COG_category) pairs from an eggNOG-mapper export.
+    # The COG column is located from the header row; without one, column 7 is used and
+    # Excel data is assumed to start at row 4 like the original exports.
+    is_excel = os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm")
+    cog_col, headerless = None, False
+    for row_number, row in enumerate(_iter_annotation_rows(path), start=1):
+        if not row:
+            continue
+        if cog_col is None:
+            cog_col = _find_cog_column(row)
+            if cog_col is not None:
+                continue
+            if str(row[0]).startswith("#"):
+                continue
+            # Data reached without a recognisable header
+            cog_col, headerless = DEFAULT_COG_COLUMN, True
+        if headerless and is_excel and row_number < EXCEL_DEFAULT_FIRST_ROW:
+            continue
         protein_id = row[0]
-        raw_cog = row[6]
         if not protein_id or str(protein_id).startswith("#"):
             continue
-        if not raw_cog or raw_cog.strip() == "":
-            cog_codes = ["-"]
-        else:
-            cog_codes = list(raw_cog.strip())
-        for code in cog_codes:
+        yield protein_id, row[cog_col] if cog_col < len(row) else None
+
+# Bump when the parsing below changes so cached COG maps are re-parsed
+PARSER_VERSION = 1
+
+def _parse_cog_pairs(path):
+    # The protein-to-COG map as two parallel columns, in the order the map is built
+    codes, proteins = [], []
+    for protein_id, raw_cog in iter_eggnog_annotations(path):
+        raw_cog = str(raw_cog).strip() if raw_cog is not None else ""
+        protein_id = str(protein_id).strip()
+        for code in (raw_cog or "-"):
+            codes.append(code)
+            proteins.append(protein_id)
+    return {"codes": np.array(codes, dtype=str), "proteins": np.array(proteins, dtype=str)}
+
+def parse_cog_map(path):
+    # Reads one eggNOG export into {COG code: [protein ids]}; multi-letter categories count once per letter
+    with stage("load", file=path) as s:
+        arrays = cached_parse(path, "cog_map", PARSER_VERSION, _parse_cog_pairs)
+        cog_map = {}
+        for code, protein_id in zip(arrays["codes"].tolist(), arrays["proteins"].tolist()):
             cog_map.setdefault(code, []).append(protein_id)
+        s.add(len(arrays["codes"]))
+        s.read(path)
+    return cog_map
 
-    base_name = os.path.splitext(os.path.basename(excel_path))[0]
-    output_file = f"{base_name}_proteins_per_COG.txt"
-    with open(output_file, "w") as out:
-        for code in sorted(cog_map.keys()):
-            proteins = cog_map[code]
-            description = COG_CATEGORIES.get(code, "Unknown category")
-            out.write(f"{code} – {description} ({len(proteins)})\n")
-            out.write(", ".join(proteins) + "\n\n")
+def write_cog_lists(cog_map, excel_path, output_file=None):
+    # Default output: <eggNOG file name>_proteins_per_COG.txt in the current directory
+    if output_file is None:
+        base_name = os.path.splitext(os.path.basename(excel_path))[0]
+        output_file = f"{base_name}_proteins_per_COG.txt"
+    with stage("write", file=excel_path) as s:
+        with open(output_file, "w") as out:
+            for code in sorted(cog_map.keys()):
+                proteins = cog_map[code]
+                description = COG_CATEGORIES.get(code, "Unknown category")
+                out.write(f"{code} – {description} ({len(proteins)})\n")
+                out.write(", ".join(proteins) + "\n\n")
+                s.add(len(proteins))
+        s.wrote(output_file)
     return output_file
 
+def create_cog_lists(excel_path, output_file=None, store=None, run=None, check_cancelled=None):
+    # With store (a results_store.py database), the protein-to-COG map is also loaded into it;
+    # check_cancelled() is called before anything is stored or written and raises to stop (GUI Cancel)
+    cog_map = parse_cog_map(excel_path)
+    if check_cancelled:
+        check_cancelled()
+    if store:
+        from results_store import run_name, store_cog_map
+        store_cog_map(store, run or run_name(excel_path), cog_map, source=excel_path)
+    return write_cog_lists(cog_map, excel_path, output_file)
+
+def cog_map_to_file_data(cog_map):
+    # Same shape parse_file() rebuilds from a _proteins_per_COG.txt file, without the round trip
+    return {code: {"title": COG_CATEGORIES.get(code, "Unknown category"), "proteins": proteins}
+            for code, proteins in cog_map.items()}
+
 # -------------------------
 # Compare_COGs helpers
 # -------------------------
 def parse_file(file_path):
+    with stage("load", file=file_path) as s:
+        cog_dict = _parse_cog_list_file(file_path)
+        s.add(sum(len(entry["proteins"]) for entry in cog_dict.values()))
+        s.read(file_path)
+    return cog_dict
+
+def _parse_cog_list_file(file_path):
     cog_dict = {}
     with open(file_path, 'r') as f:
         lines = f.read().splitlines()
@@ -77,40 +177,244 @@ def parse_file(file_path):
             cog_dict[current_code]["proteins"].extend(proteins)
     return cog_dict
 
+def encode_cog_map(cog_map, index):
+    # {COG code: [protein ids]} -> {COG code: sorted integer ID array} using a shared AccessionIndex
+    return {code: index.encode(proteins) for code, proteins in cog_map.items()}
+
 def compare_multiple_cogs(file_data_list, file_titles):
+    # For every COG code, the proteins found in only one of the files that have that code.
+    # Proteins are interned once to integer IDs shared by all codes and files, and each code is
+    # split by membership pattern in one vectorized pass.
+    with stage("compare", files=len(file_data_list)) as s:
+        results = _compare_cog_codes(file_data_list, file_titles)
+        s.add(sum(len(entry.get("proteins", [])) for fd in file_data_list for entry in fd.values()))
+    return results
+
+def _compare_cog_codes(file_data_list, file_titles):
     results = []
+    index = AccessionIndex()
     all_codes = sorted(set().union(*(fd.keys() for fd in file_data_list)))
     for code in all_codes:
         present_files = [i for i, fd in enumerate(file_data_list) if code in fd]
         if not present_files:
             continue
         title = None
-        all_sets = []
+        id_sets = []
         for i in present_files:
             cog_info = file_data_list[i].get(code, {})
             title = cog_info.get("title", title)
-            proteins = set(cog_info.get("proteins", []))
-            all_sets.append(proteins)
+            id_sets.append(index.encode(cog_info.get("proteins", [])))
+        groups = group_by_membership(id_sets)
         results.append(f"{code}: {title}")
-        for i, proteins in enumerate(all_sets):
-            others = set().union(*(s for j, s in enumerate(all_sets) if j != i))
-            unique = proteins - others
+        for i in range(len(id_sets)):
+            unique = index.decode(groups[1 << i]) if (1 << i) in groups else []
             results.append(f"Unique to {file_titles[present_files[i]]}:")
             results.append(', '.join(sorted(unique)) if unique else "(none)")
         results.append("")
     return results
 
+def write_comparison(results, output_path):
+    with stage("write", file=output_path) as s:
+        with open(output_path, "w") as f:
+            f.write("\n".join(results))
+        s.add(len(results))
+        s.wrote(output_path)
+
 def process_files(file_paths, output_path):
     file_data_list = [parse_file(p) for p in file_paths]
     file_titles = [os.path.basename(p) for p in file_paths]
-    results = compare_multiple_cogs(file_data_list, file_titles)
-    with open(output_path, "w") as f:
-        f.write("\n".join(results))
+    write_comparison(compare_multiple_cogs(file_data_list, file_titles), output_path)
+
+def compare_cog_maps(cog_maps, excel_paths, output_path, write_lists=False, check_cancelled=None):
+    # Compares already parsed maps directly;
+    # the per-file _proteins_per_COG.txt lists are only written when asked for
+    if check_cancelled:
+        check_cancelled()
+    list_files = [write_cog_lists(m, p) for m, p in zip(cog_maps, excel_paths)] if write_lists else []
+    file_titles = [os.path.basename(p) for p in excel_paths]
+    results = compare_multiple_cogs([cog_map_to_file_data(m) for m in cog_maps], file_titles)
+    if check_cancelled:
+        check_cancelled()
+    write_comparison(results, output_path)
+    return list_files
+
+def run_pipeline(excel_paths, output_path, write_lists=False, store=None):
+    # Parse every eggNOG export once and compare the in-memory maps (storing each, with store)
+    cog_maps = [parse_cog_map(p) for p in excel_paths]
+    if store:
+        from results_store import run_name, store_cog_map
+        for cog_map, path in zip(cog_maps, excel_paths):
+            store_cog_map(store, run_name(path), cog_map, source=path)
+    return compare_cog_maps(cog_maps, excel_paths, output_path, write_lists)
+
+# -------------------------
+# COG composition and enrichment between files
+# -------------------------
+# Each export becomes a sparse proteins x COG categories 0/1 matrix (rows are protein IDs from an
+# AccessionIndex shared by all files; a "KT" protein has a 1 in both K and T). Column sums give the
+# per-file category counts, and every file pair is tested over all categories at once: for category
+# c with a of N_A proteins in A and b of N_B in B, the hypergeometric p-value that B is enriched,
+# P(X >= b) for X ~ Hypergeom(N_A + N_B, a + b, N_B), and the two-sided Fisher exact p-value of the
+# 2x2 table, with Benjamini-Hochberg q-values over the categories of each pair.
+
+COG_CODES = tuple(COG_CATEGORIES)
+COMPOSITION_COLUMNS = ["Comparison", "COG", "Category", "Count A", "Total A", "Proportion A",
+                       "Count B", "Total B", "Proportion B", "log2 ratio",
+                       "p enriched", "q enriched", "p Fisher", "q Fisher"]
+
+def cog_incidence(pairs, index, codes):
+    # Sparse (proteins x codes) 0/1 matrix from parsed (codes, proteins) arrays; proteins are interned in index
+    from scipy import sparse
+    column = {code: i for i, code in enumerate(codes)}
+    rows = np.fromiter((index.intern(p) for p in pairs["proteins"].tolist()), dtype=np.int64,
+                       count=len(pairs["proteins"]))
+    cols = np.fromiter((column[c] for c in pairs["codes"].tolist()), dtype=np.int64, count=len(pairs["codes"]))
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(len(index), len(codes)))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1          # a protein listed twice with the same category still counts once
+    return matrix
+
+def load_cog_incidence(paths):
+    # Parses every export (through the parse cache) into incidence matrices with shared rows and columns.
+    # Columns are COG_CODES plus, sorted, any other code the files use. Returns (matrices, codes, index).
+    index = AccessionIndex()
+    parsed = []
+    for path in paths:
+        with stage("load", file=path) as s:
+            parsed.append(cached_parse(path, "cog_map", PARSER_VERSION, _parse_cog_pairs))
+            s.add(len(parsed[-1]["codes"]))
+            s.read(path)
+    extra = sorted(set().union(*(set(p["codes"].tolist()) for p in parsed)) - set(COG_CODES))
+    codes = COG_CODES + tuple(extra)
+    matrices = [cog_incidence(p, index, codes) for p in parsed]
+    for matrix in matrices:
+        matrix.resize((len(index), len(codes)))     # earlier files saw fewer proteins
+    return matrices, codes, index
+
+def cog_counts(matrices):
+    # (files x categories) protein counts and the number of proteins per file
+    counts = np.vstack([np.asarray(m.sum(axis=0)).ravel() for m in matrices]).astype(np.int64)
+    totals = np.array([np.count_nonzero(m.getnnz(axis=1)) for m in matrices], dtype=np.int64)
+    return counts, totals
+
+def hypergeometric_tests(k, N, K, n):
+    # For arrays of 2x2 tables given as hypergeometric parameters (k of the n draws are successes, from
+    # N items of which K are successes): the one-sided enrichment p-value P(X >= k) and the two-sided
+    # Fisher exact p-value. As in R's fisher.test, the latter sums the probabilities of all tables no
+    # more likely than the observed one. The pmf is unimodal, so that set is two tails: the observed
+    # side, plus the other side from the first value as unlikely as the observed one, which is found by
+    # a vectorized binary search on log-probabilities. Tail sums are the expensive part, so each table
+    # gets exactly two: its observed tail and its other tail.
+    from scipy.stats import hypergeom
+    k, N, K, n = np.broadcast_arrays(*(np.asarray(x, dtype=np.int64) for x in (k, N, K, n)))
+    low, high = np.maximum(0, n - (N - K)), np.minimum(K, n)
+    mode = (n + 1) * (K + 1) // (N + 2)
+    log_pmf = hypergeom.logpmf(k, N, K, n)
+    threshold = log_pmf + np.log1p(1e-7)
+    below = k <= mode             # observed value in the lower tail; the other tail lies above the mode
+    # Other tail: first x in [max(mode, k + 1), high] with pmf(x) <= pmf(k) when below (high + 1 if none),
+    # else first x in [low, min(mode, k - 1)] with pmf(x) > pmf(k), i.e. one past its end (low if none)
+    lo = np.where(below, np.maximum(mode, k + 1), low)
+    hi = np.where(below, high + 1, np.minimum(mode, k - 1) + 1)
+    while True:
+        active = lo < hi
+        if not active.any():
+            break
+        mid = (lo + hi) // 2
+        unlikely = hypergeom.logpmf(mid, N, K, n) <= threshold
+        go_left = np.where(below, unlikely, ~unlikely)
+        hi = np.where(active & go_left, mid, hi)
+        lo = np.where(active & ~go_left, mid + 1, lo)
+
+    def tail(function, x, rows):
+        out = np.zeros(k.shape)
+        out[rows] = function(x[rows], N[rows], K[rows], n[rows])
+        return out
+
+    # Observed tail P(X <= k) or P(X >= k); other tail P(X >= lo) or P(X <= lo - 1), zero when empty
+    observed = tail(hypergeom.cdf, k, below) + tail(hypergeom.sf, k - 1, ~below)
+    other = tail(hypergeom.sf, lo - 1, below & (lo <= high)) + tail(hypergeom.cdf, lo - 1, ~below & (lo > low))
+    # P(X >= k) is 1 - P(X <= k) + P(X = k) when k is in the lower tail (no cancellation: it is large there)
+    p_enriched = np.where(below, 1 - observed + np.exp(log_pmf), observed)
+    return np.minimum(p_enriched, 1.0), np.minimum(observed + other, 1.0)
+
+def cog_enrichment(counts, totals, pairs):
+    # Every statistic for every (file i, file j) pair and category, as (pairs x categories) arrays;
+    # B is the second file of the pair. Categories neither file has get NaN p-values and are not tested.
+    from differential_abundance import benjamini_hochberg
+    first, second = np.array([p[0] for p in pairs], dtype=np.intp), np.array([p[1] for p in pairs], dtype=np.intp)
+    a, b = counts[first], counts[second]
+    n_a, n_b = totals[first][:, None], totals[second][:, None]
+    K = a + b
+    N, n = np.broadcast_to(n_a + n_b, K.shape), np.broadcast_to(n_b, K.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prop_a, prop_b = a / n_a, b / n_b
+        log2_ratio = np.log2(prop_b / prop_a)
+    tested = K > 0
+    p_enriched, p_fisher = np.full(K.shape, np.nan), np.full(K.shape, np.nan)
+    p_enriched[tested], p_fisher[tested] = hypergeometric_tests(b[tested], N[tested], K[tested], n[tested])
+    return {"count_a": a, "total_a": np.broadcast_to(n_a, a.shape), "prop_a": prop_a,
+            "count_b": b, "total_b": np.broadcast_to(n_b, b.shape), "prop_b": prop_b, "log2_ratio": log2_ratio,
+            "p_enriched": p_enriched, "q_enriched": np.vstack([benjamini_hochberg(row) for row in p_enriched]),
+            "p_fisher": p_fisher, "q_fisher": np.vstack([benjamini_hochberg(row) for row in p_fisher])}
+
+def compare_cog_composition(paths, labels=None, reference=None):
+    # Category counts per file and the enrichment tests for every pair of files
+    # (or every file against the reference label)
+    from differential_abundance import comparison_pairs
+    labels = labels or [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    if len(labels) != len(paths):
+        raise ValueError("Give one label per input file.")
+    if reference is not None and reference not in labels:
+        raise ValueError(f"Reference '{reference}' is not one of the labels: {', '.join(labels)}")
+    matrices, codes, _ = load_cog_incidence(paths)
+    with stage("compare", files=len(paths)) as s:
+        counts, totals = cog_counts(matrices)
+        pairs = comparison_pairs(labels, reference)
+        stats = cog_enrichment(counts, totals, pairs) if pairs else {}
+        s.add(int(totals.sum()))
+    return {"labels": labels, "codes": codes, "counts": counts, "totals": totals,
+            "comparisons": [f"{labels[j]} vs {labels[i]}" for i, j in pairs], "stats": stats}
+
+def _fmt(value):
+    return "NA" if np.isnan(value) else f"{value:.6g}"
+
+def write_cog_composition(result, output_path, counts_path=None):
+    # One row per comparison and category (.tsv, or .csv by extension); counts_path, if given, gets the
+    # per-file counts and proportions (the numbers behind the COG pie charts)
+    delimiter = "," if output_path.lower().endswith(".csv") else "\t"
+    codes, stats = result["codes"], result["stats"]
+    with stage("write", file=output_path) as s:
+        with open(output_path, "w", newline="") as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            writer.writerow(COMPOSITION_COLUMNS)
+            for row, comparison in enumerate(result["comparisons"]):
+                for col, code in enumerate(codes):
+                    writer.writerow([comparison, code, COG_CATEGORIES.get(code, "Unknown category")]
+                                    + [int(stats[name][row, col]) if name.startswith(("count", "total"))
+                                       else _fmt(stats[name][row, col]) for name in
+                                       ("count_a", "total_a", "prop_a", "count_b", "total_b", "prop_b",
+                                        "log2_ratio", "p_enriched", "q_enriched", "p_fisher", "q_fisher")])
+                    s.add(1)
+        s.wrote(output_path)
+        if counts_path:
+            with open(counts_path, "w", newline="") as f:
+                writer = csv.writer(f, delimiter="," if counts_path.lower().endswith(".csv") else "\t")
+                writer.writerow(["File", "COG", "Category", "Proteins", "Total", "Proportion"])
+                for label, row, total in zip(result["labels"], result["counts"], result["totals"]):
+                    for code, count in zip(codes, row):
+                        writer.writerow([label, code, COG_CATEGORIES.get(code, "Unknown category"), int(count),
+                                         int(total), f"{count / total:.6g}" if total else "NA"])
+            s.wrote(counts_path)
+    return output_path
 
 # -------------------------
 # GUI pipeline
 # -------------------------
 def launch_gui():
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from gui_worker import BackgroundRunner, report_errors
     root = tk.Tk()
     root.title("COG Pipeline")
     root.geometry("600x700")
@@ -119,16 +423,25 @@ def launch_gui():
     selected_paths = []
     run_button = None
 
-    # --- Single parse section (unchanged) ---
+    runner = BackgroundRunner(root)
+
+    # --- Single parse section ---
     def parse_one_file():
-        excel_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx *.xls")])
+        excel_path = filedialog.askopenfilename(filetypes=EGGNOG_FILETYPES)
         if not excel_path:
             return
-        try:
-            out_file = create_cog_lists(excel_path)
-            messagebox.showinfo("Done", f"Created: {out_file}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error parsing file:\n{e}")
+
+        def done(results, cancelled):
+            out_file, error = results[0]
+            if cancelled:
+                return
+            if error:
+                messagebox.showerror("Error", f"Error parsing file:\n{error}")
+            else:
+                messagebox.showinfo("Done", f"Created: {out_file}")
+
+        if not runner.run([(create_cog_lists, (excel_path, None, None, None, runner.check_cancelled))], done):
+            messagebox.showinfo("Busy", "Please wait for the current run to finish.")
 
     # --- Helpers for multi-file selection ---
     def check_all_selected():
@@ -138,7 +451,7 @@ def launch_gui():
             run_button.forget()
 
     def browse_file(idx):
-        path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx *.xls")])
+        path = filedialog.askopenfilename(filetypes=EGGNOG_FILETYPES)
         if path:
             selected_paths[idx] = path
             file_buttons[idx].config(text=os.path.basename(path))
@@ -169,25 +482,42 @@ def launch_gui():
             messagebox.showerror("Invalid input", "Please enter an integer ≥ 2.")
 
     def process():
+        # Files are parsed in parallel worker processes, then compared on a background thread
         if not all(selected_paths):
             messagebox.showerror("Error", "Please select all files.")
             return
-        txt_paths = []
-        try:
-            for path in selected_paths:
-                txt_file = create_cog_lists(path)
-                txt_paths.append(txt_file)
-        except Exception as e:
-            messagebox.showerror("Error", f"Error in Create_COG_lists:\n{e}")
-            return
-        output_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt")])
-        if not output_path:
-            return
-        try:
-            process_files(txt_paths, output_path)
-            messagebox.showinfo("Done", f"Comparison saved to: {output_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error in Compare_COGs:\n{e}")
+        paths = list(selected_paths)
+
+        def compared(results, cancelled):
+            run_button.config(state="normal")
+            if cancelled:
+                return
+            if results[0][1]:
+                messagebox.showerror("Error", f"Error in Compare_COGs:\n{results[0][1]}")
+            else:
+                messagebox.showinfo("Done", f"Comparison saved to: {output_path}")
+
+        def parsed(results, cancelled):
+            nonlocal output_path
+            failed = not cancelled and report_errors(results, [os.path.basename(p) for p in paths])
+            if cancelled or failed:
+                run_button.config(state="normal")
+                if failed:
+                    messagebox.showerror("Error", f"Error in Create_COG_lists:\n{failed}")
+                return
+            output_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt")])
+            if not output_path:
+                run_button.config(state="normal")
+                return
+            cog_maps = [cog_map for cog_map, _ in results]
+            runner.run([(compare_cog_maps, (cog_maps, paths, output_path, write_lists_var.get(),
+                                            runner.check_cancelled))], compared, label="comparison")
+
+        output_path = None
+        if runner.run([(parse_cog_map, (path,)) for path in paths], parsed):
+            run_button.config(state="disabled")
+        else:
+            messagebox.showinfo("Busy", "Please wait for the current run to finish.")
 
     # --- Layout ---
     tk.Label(root, text="Parse just 1 file", font=("Arial", 18, "bold")).pack(pady=10)
@@ -204,9 +534,56 @@ def launch_gui():
     file_input_frame = tk.Frame(root)
     file_input_frame.pack(pady=10)
 
+    write_lists_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(root, text="Also save a _proteins_per_COG.txt list per file",
+                   variable=write_lists_var).pack(pady=5)
+
     run_button = tk.Button(root, text="Run Pipeline", command=process, fg="red")
 
     root.mainloop()
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        launch_gui()
+        return 0
+    parser = argparse.ArgumentParser(
+        prog="parse_and_compare_COGs.py",
+        description="Sort proteins by COG category for one eggNOG export, or parse and compare several. "
+                    "Run with no arguments for the GUI.")
+    parser.add_argument("inputs", nargs="+", help="eggNOG-mapper exports")
+    parser.add_argument("-o", "--output", default="COG_comparison.txt",
+                        help="comparison file when several inputs are given")
+    parser.add_argument("--write-lists", action="store_true",
+                        help="also write a _proteins_per_COG.txt list per input when comparing")
+    parser.add_argument("--composition", metavar="TABLE",
+                        help="instead, write category counts and enrichment tests for every pair of inputs (.tsv/.csv)")
+    parser.add_argument("--counts", metavar="TABLE", help="with --composition: also write per-file category counts")
+    parser.add_argument("--labels", help="with --composition: comma-separated labels (default: file names)")
+    parser.add_argument("--reference", help="with --composition: compare every input against this label only")
+    parser.add_argument("--store", metavar="DB",
+                        help="also load each input's protein-to-COG map into this results store (results_store.py)")
+    parser.add_argument("--run", help="run name in the store for a single input (default: from the file name)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    instrumentation.configure(args.report, args.profile, tool="parse_and_compare_COGs")
+    if args.composition:
+        labels = [l.strip() for l in args.labels.split(",")] if args.labels else None
+        result = compare_cog_composition(args.inputs, labels, args.reference)
+        write_cog_composition(result, args.composition, args.counts)
+        print(f"{len(result['comparisons'])} comparison(s) written to {args.composition}")
+        if args.counts:
+            print(f"Counts written to {args.counts}")
+        return 0
+    if len(args.inputs) == 1:
+        print(f"Created: {create_cog_lists(args.inputs[0], store=args.store, run=args.run)}")
+        return 0
+    if args.run:
+        parser.error("--run names a single input; runs are named after the files when comparing")
+    for list_file in run_pipeline(args.inputs, args.output, write_lists=args.write_lists, store=args.store):
+        print(f"Created: {list_file}")
+    print(f"Comparison saved to: {args.output}")
+    return 0
+
 if __name__ == "__main__":
-    launch_gui()
+    sys.exit(main())
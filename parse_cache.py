@@ -0,0 +1,117 @@
+import os
+import hashlib
+import tempfile
+
+# -------------------------
+# On-disk parse cache
+# -------------------------
+# Parsed tables are stored as uncompressed .npz files (one array per column) named after the
+# parser and a hash of (parser name, parser version, input file content). Bumping a parser's
+# version invalidates its old entries. The directory is kept under a size limit by deleting the
+# least recently used entries; a cache hit refreshes the entry's mtime.
+#
+# PROTEOMICS_CACHE_DIR        cache directory (default ~/.cache/proteomics_analysis)
+# PROTEOMICS_CACHE_MAX_BYTES  size limit (default 1 GiB)
+# PROTEOMICS_CACHE=0          disable the cache
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "proteomics_analysis")
+DEFAULT_MAX_BYTES = 1 << 30
+
+def cache_dir():
+    return os.environ.get("PROTEOMICS_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+def cache_enabled():
+    return os.environ.get("PROTEOMICS_CACHE", "1") != "0"
+
+def max_cache_bytes():
+    return int(os.environ.get("PROTEOMICS_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _entry_path(directory, path, parser_name, version):
+    key = hashlib.sha256(f"{parser_name}\0{version}\0{file_digest(path)}".encode()).hexdigest()
+    return os.path.join(directory, f"{parser_name}-{key}.npz")
+
+def _load_entry(entry):
+    import numpy as np
+    try:
+        with np.load(entry, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+    except (OSError, ValueError):
+        return None
+    try:
+        os.utime(entry)
+    except OSError:
+        pass
+    return arrays
+
+def _save_entry(entry, arrays):
+    # Written to a temporary file first so readers never see a partial entry
+    import numpy as np
+    directory = os.path.dirname(entry)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, entry)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def evict(directory=None, max_bytes=None):
+    # Deletes least recently used entries until the cache fits in max_bytes
+    directory = directory or cache_dir()
+    max_bytes = max_cache_bytes() if max_bytes is None else max_bytes
+    if not os.path.isdir(directory):
+        return 0
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".npz"):
+            full = os.path.join(directory, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, full))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, full in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(full)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+def clear(directory=None):
+    return evict(directory, max_bytes=0)
+
+def cached_parse(path, parser_name, version, parse):
+    # Returns parse(path) -- a dict of NumPy arrays, or None when the file is unusable -- from the
+    # cache when this exact file content was already parsed by this parser version
+    if not cache_enabled():
+        return parse(path)
+    directory = cache_dir()
+    entry = _entry_path(directory, path, parser_name, version)
+    if os.path.exists(entry):
+        arrays = _load_entry(entry)
+        if arrays is not None:
+            return arrays
+    arrays = parse(path)
+    if arrays is not None:
+        try:
+            _save_entry(entry, arrays)
+            evict(directory)
+        except OSError as e:
+            print(f"Warning: could not write parse cache entry: {e}")
+    return arrays
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from parse_cache import file_digest
+
+# -------------------------
+# Incremental study pipeline
+# -------------------------
+# Runs the workflow (cleaning, SpC/TIC summaries, COG lists and comparison, exclusivity, ...) from
+# one JSON file instead of one GUI after another. Each stage names a task, its input and output
+# files and parameters:
+#   {"stages": [
+#     {"name": "cogs_run1", "task": "cog_lists", "inputs": ["run1.emapper.annotations"],
+#      "outputs": ["run1_proteins_per_COG.txt"]},
+#     {"name": "exclusivity", "task": "exclusivity", "inputs": ["run1.xlsx", "run2.xlsx"],
+#      "outputs": ["Protein_exclusivity.xlsx"]}]}
+# A stage depends on every stage that produces one of its inputs. A stage is skipped when its task,
+# parameters and input contents (SHA-256) are the same as on its last successful run and its
+# outputs are unchanged; everything else runs, independent stages side by side in worker processes.
+# Paths are relative to the JSON file; run state is kept next to it in .pipeline_state.json.
+
+STATE_FILE = ".pipeline_state.json"
+
+# -------------------------
+# Tasks: task(inputs, outputs, **params), wrapping the existing entry points
+# -------------------------
+def _task_clean_psortb(inputs, outputs):
+    from Cleaner import clean_psortb_file
+    clean_psortb_file(inputs[0], outputs[0])
+
+def _task_clean_cello(inputs, outputs):
+    from Cleaner import clean_cello_file
+    clean_cello_file(inputs[0], outputs[0])
+
+def _task_clean_david(inputs, outputs, format="xlsx"):
+    # DAVID writes several files with fixed names next to the input; list those names as outputs
+    from Cleaner import clean_david_file
+    clean_david_file(inputs[0], format)
+
+def _task_clean_fasta(inputs, outputs, workers=1):
+    from Cleaner import clean_fasta_metadata_file
+    clean_fasta_metadata_file(inputs[0], workers, output_path=outputs[0])
+
+def _task_subset_fasta(inputs, outputs):
+    from Cleaner import extract_fasta_subset, read_accession_list
+    extract_fasta_subset(inputs[0], read_accession_list(inputs[1]), outputs[0])
+
+def _task_summary(inputs, outputs, min_spc, min_tic):
+    # outputs: [most changed protein list, Summary table (.xlsx, .csv or .tsv)]
+    from most_changed_proteins import process_workbook
+    if not process_workbook(inputs[0], min_spc, min_tic, outputs[0], outputs[1]):
+        raise ValueError(f"{os.path.basename(inputs[0])}: no usable 'Protein list' sheet")
+
+def _task_cog_lists(inputs, outputs):
+    from parse_and_compare_COGs import create_cog_lists
+    create_cog_lists(inputs[0], outputs[0])
+
+def _task_compare_cogs(inputs, outputs):
+    from parse_and_compare_COGs import run_pipeline
+    run_pipeline(inputs, outputs[0])
+
+def _task_cog_composition(inputs, outputs, labels=None, reference=None):
+    # outputs: the enrichment table, optionally followed by the per-file counts table
+    from parse_and_compare_COGs import compare_cog_composition, write_cog_composition
+    write_cog_composition(compare_cog_composition(inputs, labels, reference), outputs[0],
+                          outputs[1] if len(outputs) > 1 else None)
+
+def _task_exclusivity(inputs, outputs):
+    from protein_exclusivity import compare_protein_sets
+    compare_protein_sets(inputs, outputs[0])
+
+def _task_consensus(inputs, outputs, sources=None, min_votes=2):
+    # sources names the tool behind each input, in order (default PSORTb, CELLO, SOSUI)
+    from consensus_localization import SOURCES, build_consensus, read_localization_table, write_consensus
+    sources = sources or SOURCES[:len(inputs)]
+    tables = {source: read_localization_table(path, source) for source, path in zip(sources, inputs)}
+    write_consensus(build_consensus(tables, min_votes), outputs[0])
+
+def _task_differential_abundance(inputs, outputs, labels=None, reference=None):
+    from differential_abundance import run_differential_abundance, write_results
+    write_results(run_differential_abundance(inputs, labels, reference), outputs[0])
+
+TASKS = {
+    "clean_psortb": _task_clean_psortb,
+    "clean_cello": _task_clean_cello,
+    "clean_david": _task_clean_david,
+    "clean_fasta": _task_clean_fasta,
+    "subset_fasta": _task_subset_fasta,
+    "summary": _task_summary,
+    "cog_lists": _task_cog_lists,
+    "compare_cogs": _task_compare_cogs,
+    "cog_composition": _task_cog_composition,
+    "exclusivity": _task_exclusivity,
+    "consensus": _task_consensus,
+    "differential_abundance": _task_differential_abundance,
+}
+
+# -------------------------
+# Configuration and dependency graph
+# -------------------------
+def load_config(config_path):
+    # Returns the stages with absolute paths, in file order; raises ValueError on a bad config
+    base = os.path.dirname(os.path.abspath(config_path))
+    with open(config_path) as f:
+        config = json.load(f)
+    stages, producers = [], {}
+    for i, raw in enumerate(config.get("stages", [])):
+        name = raw.get("name") or f"stage{i + 1}"
+        if raw.get("task") not in TASKS:
+            raise ValueError(f"Stage '{name}': unknown task '{raw.get('task')}'. Choose from: {', '.join(TASKS)}")
+        if any(s["name"] == name for s in stages):
+            raise ValueError(f"Stage name '{name}' is used twice")
+        stage = {"name": name, "task": raw["task"], "params": raw.get("params", {}),
+                 "inputs": [os.path.join(base, p) for p in raw.get("inputs", [])],
+                 "outputs": [os.path.join(base, p) for p in raw.get("outputs", [])]}
+        if not stage["outputs"]:
+            raise ValueError(f"Stage '{name}' declares no outputs")
+        for path in stage["outputs"]:
+            if path in producers:
+                raise ValueError(f"{path} is an output of both '{producers[path]}' and '{name}'")
+            producers[path] = name
+        stages.append(stage)
+    for stage in stages:
+        stage["deps"] = sorted({producers[p] for p in stage["inputs"] if p in producers})
+    _check_acyclic(stages)
+    return stages
+
+def _check_acyclic(stages):
+    deps = {s["name"]: s["deps"] for s in stages}
+    done, visiting = set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Stages form a cycle through '{name}'")
+        visiting.add(name)
+        for dep in deps[name]:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in deps:
+        visit(name)
+
+# -------------------------
+# Run state
+# -------------------------
+def load_state(state_path):
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"stages": {}, "digests": {}}
+
+def save_state(state, state_path):
+    tmp = state_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, state_path)
+
+def _digest(state, path):
+    # Content hash, re-computed only when the file's size or modification time has changed
+    st = os.stat(path)
+    cached = state["digests"].get(path)
+    if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+        return cached[2]
+    digest = file_digest(path)
+    state["digests"][path] = [st.st_size, st.st_mtime_ns, digest]
+    return digest
+
+def stage_key(stage, state):
+    # What a stage's result depends on: task, parameters, file names and input contents
+    missing = [p for p in stage["inputs"] if not os.path.exists(p)]
+    if missing:
+        raise ValueError(f"Stage '{stage['name']}': missing input {missing[0]}")
+    blob = json.dumps([stage["task"], stage["params"], stage["inputs"], stage["outputs"],
+                       [_digest(state, p) for p in stage["inputs"]]], sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def is_up_to_date(stage, key, state):
+    previous = state["stages"].get(stage["name"])
+    if not previous or previous["key"] != key:
+        return False
+    outputs = previous.get("outputs", {})
+    return all(os.path.exists(p) and outputs.get(p) == _digest(state, p) for p in stage["outputs"])
+
+# -------------------------
+# Execution
+# -------------------------
+def _run_stage(task, inputs, outputs, params):
+    # Worker entry point; errors are returned rather than raised so other branches keep running
+    start = time.perf_counter()
+    try:
+        TASKS[task](inputs, outputs, **params)
+        missing = [p for p in outputs if not os.path.exists(p)]
+        if missing:
+            raise ValueError(f"task did not write {missing[0]}")
+        return None, time.perf_counter() - start
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+def run_pipeline(config_path, workers=None, force=False, dry_run=False, on_event=None):
+    # Runs every stage that is out of date, as soon as the stages it depends on have finished.
+    # Returns {stage name: "ran" | "up to date" | "would run" | "failed: ..." | "skipped: ..." | "blocked: ..."}.
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    stages = load_config(config_path)
+    by_name = {s["name"]: s for s in stages}
+    state_path = os.path.join(os.path.dirname(os.path.abspath(config_path)), STATE_FILE)
+    state = load_state(state_path)
+    status, pending, running = {}, [s["name"] for s in stages], {}
+    report = on_event or (lambda name, outcome: None)
+
+    def finish(name, outcome):
+        status[name] = outcome
+        report(name, outcome)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            # Dependencies can finish without a worker (up to date, dry run, bad input), so pending
+            # stages are passed over again until a pass neither resolves nor waits on anything
+            resolved = False
+            for name in list(pending):
+                stage = by_name[name]
+                dep_status = [status.get(d) for d in stage["deps"]]
+                if any(s is None for s in dep_status):
+                    continue
+                pending.remove(name)
+                resolved = True
+                blocked = [d for d, s in zip(stage["deps"], dep_status) if s.startswith(("failed", "skipped", "blocked"))]
+                if blocked:
+                    finish(name, f"skipped: '{blocked[0]}' did not finish")
+                    continue
+                if dry_run and "would run" in dep_status:
+                    finish(name, "would run")
+                    continue
+                try:
+                    key = stage_key(stage, state)
+                except (OSError, ValueError) as e:
+                    finish(name, f"failed: {e}")
+                    continue
+                if not force and is_up_to_date(stage, key, state):
+                    finish(name, "up to date")
+                elif dry_run:
+                    finish(name, "would run")
+                else:
+                    future = pool.submit(_run_stage, stage["task"], stage["inputs"], stage["outputs"], stage["params"])
+                    running[future] = (name, key)
+            if not running:
+                if resolved:
+                    continue
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, key = running.pop(future)
+                error, elapsed = future.result()
+                if error:
+                    state["stages"].pop(name, None)
+                    finish(name, f"failed: {error}")
+                    continue
+                state["stages"][name] = {"key": key, "seconds": round(elapsed, 3),
+                                         "outputs": {p: _digest(state, p) for p in by_name[name]["outputs"]}}
+                save_state(state, state_path)
+                finish(name, "ran")
+    for name in pending:
+        waiting = [d for d in by_name[name]["deps"] if d not in status]
+        finish(name, f"blocked: waiting on '{waiting[0] if waiting else '?'}'")
+    if not dry_run:
+        save_state(state, state_path)
+    return status
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="pipeline.py",
+        description="Run the analysis stages listed in a JSON file, re-running only what changed.")
+    parser.add_argument("config", help="pipeline JSON file")
+    parser.add_argument("-j", "--workers", type=int, help="stages run at once (default: number of CPUs)")
+    parser.add_argument("--force", action="store_true", help="re-run every stage")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="only show which stages would run")
+    parser.add_argument("--tasks", action="store_true", help="list the available tasks and exit")
+    args = parser.parse_args(argv)
+    if args.tasks:
+        print("\n".join(TASKS))
+        return 0
+    try:
+        status = run_pipeline(args.config, args.workers, args.force, args.dry_run,
+                              on_event=lambda name, outcome: print(f"{name}: {outcome}"))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 2
+    failed = [n for n, s in status.items() if s.startswith(("failed", "skipped", "blocked"))]
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,11 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import pandas as pd
+import numpy as np
 import os
+import sys
+import argparse
+import instrumentation
+from instrumentation import stage
+from parse_cache import cached_parse
+from accession_index import AccessionIndex, group_by_membership
 
 # Acceptable variations
 SHEET_NAMES = ['protein list', 'protein_list']
@@ -15,40 +19,80 @@ def find_protein_column(df):
             return df[col].dropna().astype(str).str.strip()
     return None
 
+# Bump when the extraction below changes so cached results are re-parsed
+PARSER_VERSION = 1
+
+def _parse_protein_column(path):
+    import pandas as pd
+    xl = pd.ExcelFile(path)
+    # Match sheet name ignoring case and underscores
+    sheet_name = next((s for s in xl.sheet_names if s.strip().lower().replace('_', ' ') in SHEET_NAMES), None)
+    if not sheet_name:
+        raise ValueError("No matching sheet found.")
+    df = xl.parse(sheet_name)
+    col = find_protein_column(df)
+    if col is None:
+        raise ValueError("No matching 'Protein AC' column found.")
+    return {"accessions": np.array(list(dict.fromkeys(col)), dtype=str)}
+
 def load_protein_column_from_excel(path):
-    # Loads protein accession column from a target sheet in a given Excel file.
+    # Loads protein accession column from a target sheet in a given Excel file (via the parse cache).
     try:
-        xl = pd.ExcelFile(path)
-        # Match sheet name ignoring case and underscores
-        sheet_name = next((s for s in xl.sheet_names if s.strip().lower().replace('_', ' ') in SHEET_NAMES), None)
-        if not sheet_name:
-            raise ValueError("No matching sheet found.")
-        df = xl.parse(sheet_name)
-        col = find_protein_column(df)
-        if col is None:
-            raise ValueError("No matching 'Protein AC' column found.")
-        return set(col)
+        with stage("load", file=path) as s:
+            arrays = cached_parse(path, "protein_ac", PARSER_VERSION, _parse_protein_column)
+            s.add(len(arrays["accessions"]))
+            s.read(path)
+        return set(arrays["accessions"].tolist())
     except Exception as e:
         raise ValueError(f"{os.path.basename(path)}: {e}")
 
-def compare_protein_sets(file_paths):
-    # Compares sets of protein accessions and identifies shared and unique entries.
-    protein_sets = []
+def intersection_table(groups, filenames):
+    # UpSet-style rows: which files a combination contains, its size (degree) and its protein count
+    import pandas as pd
+    rows = []
+    for mask, proteins in groups.items():
+        row = {fname: ("X" if mask >> i & 1 else "") for i, fname in enumerate(filenames)}
+        row["Files"] = bin(mask).count("1")
+        row["Proteins"] = len(proteins)
+        rows.append(row)
+    rows.sort(key=lambda r: (-r["Proteins"], -r["Files"]))
+    return pd.DataFrame(rows, columns=list(filenames) + ["Files", "Proteins"])
+
+def compare_protein_sets(file_paths, output_path="Protein_exclusivity.xlsx", store=None, runs=None):
+    # With store (a results_store.py database), membership per run is also loaded into it
+    protein_sets = [load_protein_column_from_excel(path) for path in file_paths]
+    if store:
+        from results_store import run_name, store_exclusivity
+        store_exclusivity(store, runs or [run_name(p) for p in file_paths], protein_sets, source=output_path)
+    return write_exclusivity(protein_sets, file_paths, output_path)
+
+def write_exclusivity(protein_sets, file_paths, output_path="Protein_exclusivity.xlsx", check_cancelled=None):
+    # Compares sets of protein accessions and identifies shared and unique entries,
+    # plus the size of every observed intersection, in time linear in the number of accessions.
+    # Accessions are interned to integer IDs and grouped by membership pattern in one pass.
+    # check_cancelled() is called before the workbook is written and raises to stop (GUI Cancel).
     filenames = [os.path.basename(p) for p in file_paths]
-
-    for path in file_paths:
-        proteins = load_protein_column_from_excel(path)
-        protein_sets.append(proteins)
-
-    # Find shared proteins
-    shared = set.intersection(*protein_sets)
-
-    # Find unique proteins for each file
-    unique_lists = []
-    for i, protein_set in enumerate(protein_sets):
-        others = set.union(*(s for j, s in enumerate(protein_sets) if j != i))
-        unique = protein_set - others
-        unique_lists.append(unique)
+    with stage("compare", files=len(protein_sets)) as s:
+        index = AccessionIndex()
+        id_sets = [index.encode(proteins) for proteins in protein_sets]
+
+        groups = {mask: index.decode(ids) for mask, ids in group_by_membership(id_sets).items()}
+        all_files = (1 << len(id_sets)) - 1
+        shared = groups.get(all_files, [])
+        unique_lists = [groups.get(1 << i, []) for i in range(len(id_sets))]
+        s.add(sum(len(proteins) for proteins in protein_sets))
+
+    if check_cancelled:
+        check_cancelled()
+    with stage("write", file=output_path) as s:
+        _write_exclusivity_workbook(output_path, filenames, groups, shared, unique_lists)
+        s.add(len(groups))
+        s.wrote(output_path)
+    return output_path
+
+def _write_exclusivity_workbook(output_path, filenames, groups, shared, unique_lists):
+    # pandas is only loaded once there is a workbook to read or write, keeping startup fast
+    import pandas as pd
 
     # Create DataFrame to export
     all_lengths = [len(shared)] + [len(u) for u in unique_lists]
@@ -63,9 +107,15 @@ def compare_protein_sets(file_paths):
     data["Shared Proteins"] = shared_list
 
     df_out = pd.DataFrame(data)
-    df_out.to_excel("Protein_exclusivity.xlsx", index=False)
+    with pd.ExcelWriter(output_path) as writer:
+        df_out.to_excel(writer, index=False)
+        intersection_table(groups, filenames).to_excel(writer, index=False, sheet_name="Intersections")
 
 def launch_gui():
+    # tkinter is only needed here, so scripts importing the comparison do not load it
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    from gui_worker import BackgroundRunner
     root = tk.Tk()
     root.title("Protein AC Excel Comparator")
     root.geometry("600x700")
@@ -100,16 +150,38 @@ def launch_gui():
         if path:
             label.config(text=path)
 
+    runner = BackgroundRunner(root)
+
     def process():
+        # Workbooks are read in parallel worker processes, then compared on a background thread
         file_paths = [lbl.cget("text") for lbl in file_labels]
         if not all(file_paths):
             messagebox.showerror("Error", "Please select all files.")
             return
-        try:
-            compare_protein_sets(file_paths)
-            messagebox.showinfo("Done", "Protein_exclusivity.xlsx created successfully.")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+
+        def compared(results, cancelled):
+            compare_button.config(state="normal")
+            if cancelled:
+                return
+            if results[0][1]:
+                messagebox.showerror("Error", results[0][1])
+            else:
+                messagebox.showinfo("Done", "Protein_exclusivity.xlsx created successfully.")
+
+        def loaded(results, cancelled):
+            # Load errors already name the file
+            failed = not cancelled and "\n".join(error for _, error in results if error)
+            if cancelled or failed:
+                compare_button.config(state="normal")
+                if failed:
+                    messagebox.showerror("Error", failed)
+                return
+            runner.run([(write_exclusivity, ([proteins for proteins, _ in results], file_paths,
+                                             "Protein_exclusivity.xlsx", runner.check_cancelled))],
+                       compared, label="comparison")
+
+        if runner.run([(load_protein_column_from_excel, (path,)) for path in file_paths], loaded):
+            compare_button.config(state="disabled")
 
     # Input for number of files
     tk.Label(root, text="How many Excel files do you want to compare? (≥ 2)", justify="center").pack(pady=10)
@@ -122,9 +194,34 @@ def launch_gui():
     file_input_frame.pack(pady=10)
 
     # Run comparison
-    tk.Button(root, text="Compare Files", command=process, bg='green', fg='white').pack(pady=20)
+    compare_button = tk.Button(root, text="Compare Files", command=process, bg='green', fg='white')
+    compare_button.pack(pady=20)
 
     root.mainloop()
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        launch_gui()
+        return 0
+    parser = argparse.ArgumentParser(
+        prog="protein_exclusivity.py",
+        description="Compare the Protein AC columns of several workbooks: proteins unique to each, shared by all, "
+                    "and every intersection. Run with no arguments for the GUI.")
+    parser.add_argument("inputs", nargs="+", help="workbooks with a 'Protein list' sheet")
+    parser.add_argument("-o", "--output", default="Protein_exclusivity.xlsx")
+    parser.add_argument("--store", metavar="DB", help="also load the result into this results store (results_store.py)")
+    parser.add_argument("--runs", help="comma-separated run names for the store (default: from the file names)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    instrumentation.configure(args.report, args.profile, tool="protein_exclusivity")
+    if len(args.inputs) < 2:
+        parser.error("compare at least two workbooks")
+    runs = [r.strip() for r in args.runs.split(",")] if args.runs else None
+    if runs and len(runs) != len(args.inputs):
+        parser.error("give one run name per workbook")
+    print(f"Comparison saved to: {compare_protein_sets(args.inputs, args.output, args.store, runs)}")
+    return 0
+
 if __name__ == "__main__":
-    launch_gui()
+    sys.exit(main())
@@ -0,0 +1,334 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from collections import Counter
+from instrumentation import stage
+
+# -------------------------
+# Results store
+# -------------------------
+# One indexed SQLite file for the results of every tool, so questions that span analyses ("which
+# proteins unique to run1 with SpC >= 10 are membrane-localized and in COG M?") are single indexed
+# queries instead of re-parsing the workbooks and text files each tool writes. The tools insert
+# into it when given --store DB (the usual output files are still written):
+#   most_changed_proteins.py   Summary statistics per protein   -> abundance
+#   protein_exclusivity.py     which compared runs hold it      -> exclusivity
+#   parse_and_compare_COGs.py  COG letters per protein          -> cog
+#   Cleaner.py psortb/cello    predicted localization           -> localization (also consensus_localization.py)
+# Rows belong to a named run (by default the input file name without tool suffixes, e.g. run1 for
+# run1_psortb.txt). Loading a run again replaces what that tool stored for it before.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,   -- condition / run label, e.g. run1
+    created TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS loads (
+    kind TEXT NOT NULL,          -- abundance, exclusivity, cog, localization
+    run_id INTEGER REFERENCES runs(id),
+    detail TEXT,                 -- localization tool or exclusivity comparison
+    source TEXT,                 -- input file
+    rows INTEGER NOT NULL,
+    loaded TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS abundance (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    accession TEXT NOT NULL,
+    avg_spc REAL, avg_tic REAL,
+    median_spc REAL, sd_spc REAL, cv_spc REAL, missing_spc INTEGER,
+    median_tic REAL, sd_tic REAL, cv_tic REAL, missing_tic INTEGER
+);
+CREATE TABLE IF NOT EXISTS exclusivity (
+    comparison TEXT NOT NULL,    -- one protein_exclusivity run, by default its run names joined by "+"
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    accession TEXT NOT NULL,
+    present_in INTEGER NOT NULL, -- compared runs that contain the protein (1 = unique to this run)
+    compared INTEGER NOT NULL    -- runs in the comparison (present_in = compared: shared by all)
+);
+CREATE TABLE IF NOT EXISTS cog (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    accession TEXT NOT NULL,
+    code TEXT NOT NULL           -- one row per letter of multi-letter categories
+);
+CREATE TABLE IF NOT EXISTS localization (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    accession TEXT NOT NULL,
+    tool TEXT NOT NULL,          -- psortb, cello, consensus
+    localization TEXT,           -- as the tool reported it
+    normalized TEXT              -- vocabulary of consensus_localization.py, e.g. CytoplasmicMembrane
+);
+CREATE INDEX IF NOT EXISTS abundance_by_run ON abundance(run_id, accession);
+CREATE INDEX IF NOT EXISTS abundance_by_accession ON abundance(accession);
+CREATE INDEX IF NOT EXISTS abundance_by_spc ON abundance(run_id, avg_spc);
+CREATE INDEX IF NOT EXISTS exclusivity_by_run ON exclusivity(run_id, accession);
+CREATE INDEX IF NOT EXISTS exclusivity_by_accession ON exclusivity(accession);
+CREATE INDEX IF NOT EXISTS exclusivity_by_presence ON exclusivity(run_id, present_in, accession);
+CREATE INDEX IF NOT EXISTS exclusivity_by_comparison ON exclusivity(comparison);
+CREATE INDEX IF NOT EXISTS cog_by_run ON cog(run_id, accession);
+CREATE INDEX IF NOT EXISTS cog_by_accession ON cog(accession, code);
+CREATE INDEX IF NOT EXISTS localization_by_run ON localization(run_id, tool, accession);
+CREATE INDEX IF NOT EXISTS localization_by_accession ON localization(accession, normalized, tool);
+"""
+
+# File name endings dropped to get the default run name (run1_psortb_cleaned.txt -> run1)
+RUN_SUFFIXES = ("_cleaned", "_psortb", "_cello", "_summary", "_eggnog", ".emapper", "_proteins_per_COG")
+
+def run_name(path):
+    name = os.path.basename(path)
+    if name.endswith(".gz"):
+        name = name[:-3]
+    name = os.path.splitext(name)[0]
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in RUN_SUFFIXES:
+            if name.endswith(suffix) and len(name) > len(suffix):
+                name, stripped = name[:-len(suffix)], True
+    return name
+
+def create_store(db_path):
+    # Creates the tables and switches the file to WAL. Done once, before worker processes load into
+    # the store (Cleaner.py -j): schema changes and the journal mode switch need the file to themselves.
+    conn = sqlite3.connect(db_path, timeout=60)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+    finally:
+        conn.close()
+
+def connect(db_path):
+    # Transactions are opened explicitly (_begin); the busy timeout covers waiting for another writer
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def _begin(db_path):
+    # Opens a connection holding the write lock. A deferred transaction that reads before it writes
+    # cannot wait for another writer under WAL (it gets "database is locked" at once), so the lock is
+    # taken up front with BEGIN IMMEDIATE, which does wait out the busy timeout.
+    if not os.path.exists(db_path):
+        create_store(db_path)
+    conn = connect(db_path)
+    conn.execute("BEGIN IMMEDIATE")
+    return conn
+
+def run_id(conn, name):
+    conn.execute("INSERT OR IGNORE INTO runs (name, created) VALUES (?, ?)", (name, time.strftime("%Y-%m-%dT%H:%M:%S")))
+    return conn.execute("SELECT id FROM runs WHERE name = ?", (name,)).fetchone()[0]
+
+def _replace(db_path, kind, run, delete_sql, delete_args, insert_sql, rows, detail=None, source=None):
+    # One transaction: drop what this load replaces (delete_sql gets the run ID, then delete_args),
+    # bulk-insert the new rows (each prefixed with the run ID) and note the load
+    with stage("store", kind=kind, file=source) as s:
+        conn = _begin(db_path)
+        try:
+            with conn:
+                rid = run_id(conn, run)
+                conn.execute(delete_sql, (rid,) + tuple(delete_args))
+                before = conn.total_changes
+                conn.executemany(insert_sql, ((rid,) + tuple(row) for row in rows))
+                count = conn.total_changes - before
+                conn.execute("INSERT INTO loads VALUES (?, ?, ?, ?, ?, ?)",
+                             (kind, rid, detail, source, count, time.strftime("%Y-%m-%dT%H:%M:%S")))
+                # Keeps the planner's statistics current as tables grow; inside the transaction, as
+                # it writes too
+                conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+        s.add(count)
+    return count
+
+# -------------------------
+# Loading (called by the tools)
+# -------------------------
+def store_abundance(db_path, run, rows, source=None):
+    # rows: Summary rows as most_changed_proteins.build_summary_rows makes them (SUMMARY_HEADERS order)
+    return _replace(db_path, "abundance", run, "DELETE FROM abundance WHERE run_id = ?", (),
+                    "INSERT INTO abundance VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((str(row[0]),) + tuple(row[1:11]) for row in rows), source=source)
+
+def store_cog_map(db_path, run, cog_map, source=None):
+    # cog_map: {COG letter: [protein ids]} as parse_and_compare_COGs.parse_cog_map returns it; query
+    # IDs are reduced to accessions like the localizations are, so the two line up in find
+    from consensus_localization import normalize_id
+    rows = ((accession, code) for code, proteins in cog_map.items()
+            for accession in dict.fromkeys(normalize_id(p) for p in proteins) if accession)
+    return _replace(db_path, "cog", run, "DELETE FROM cog WHERE run_id = ?", (),
+                    "INSERT INTO cog VALUES (?, ?, ?)", rows, source=source)
+
+def store_localization(db_path, run, tool, records, source=None):
+    # records: (sequence ID, localization) pairs; IDs are reduced to accessions the way
+    # consensus_localization.py does it (">sp|P12345|NAME" -> P12345)
+    from consensus_localization import normalize_id, normalize_localization
+    rows = ((accession, tool, localization, normalize_localization(localization))
+            for accession, localization in ((normalize_id(seqid), localization) for seqid, localization in records)
+            if accession)
+    return _replace(db_path, "localization", run, "DELETE FROM localization WHERE run_id = ? AND tool = ?",
+                    (tool,), "INSERT INTO localization VALUES (?, ?, ?, ?, ?)", rows, detail=tool, source=source)
+
+def read_cleaned_localizations(path):
+    # (SeqID, localization) pairs from a Cleaner.py _cleaned.txt file, without a header line
+    from consensus_localization import looks_like_header
+    with open(path) as f:
+        for i, line in enumerate(f):
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 2 and not (i == 0 and looks_like_header(fields[0])):
+                yield fields[0], fields[1]
+
+def store_exclusivity(db_path, runs, protein_sets, comparison=None, source=None):
+    # One row per run and protein it contains, with how many of the compared runs contain it
+    comparison = comparison or "+".join(runs)
+    present = Counter(p for proteins in protein_sets for p in set(proteins))
+    with stage("store", kind="exclusivity", file=source) as s:
+        conn = _begin(db_path)
+        try:
+            with conn:
+                ids = [run_id(conn, run) for run in runs]
+                conn.execute("DELETE FROM exclusivity WHERE comparison = ?", (comparison,))
+                conn.executemany("INSERT INTO exclusivity VALUES (?, ?, ?, ?, ?)",
+                                 ((comparison, rid, p, present[p], len(runs))
+                                  for rid, proteins in zip(ids, protein_sets) for p in set(proteins)))
+                count = sum(len(set(proteins)) for proteins in protein_sets)
+                conn.execute("INSERT INTO loads VALUES (?, ?, ?, ?, ?, ?)",
+                             ("exclusivity", None, comparison, source, count, time.strftime("%Y-%m-%dT%H:%M:%S")))
+                conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+        s.add(count)
+    return count
+
+# -------------------------
+# Queries
+# -------------------------
+FIND_COLUMNS = ["Run", "ProteinAC", "Average SpC", "Average TIC", "Present in", "Compared", "COG", "Localization"]
+
+def find_proteins(conn, runs=None, unique=False, shared=False, comparison=None, min_spc=None, min_tic=None,
+                  localizations=None, tool=None, cogs=None):
+    # Proteins per run matching every given filter. Abundance and exclusivity are matched on run and
+    # accession; COG and localization are properties of the protein, so they match on accession alone.
+    # Runs come from the abundance table, or from exclusivity when only exclusivity filters are given.
+    where, params = [], []
+    if (unique or shared) and min_spc is None and min_tic is None:
+        base, a, e = "exclusivity", "a", "p"
+        join = "LEFT JOIN abundance a ON a.run_id = p.run_id AND a.accession = p.accession"
+        if comparison:
+            where.append("p.comparison = ?")
+            params.append(comparison)
+    else:
+        base, a, e = "abundance", "p", "e"
+        join = "LEFT JOIN exclusivity e ON e.run_id = p.run_id AND e.accession = p.accession"
+        if comparison:
+            join += " AND e.comparison = ?"
+            params.append(comparison)
+    if runs:
+        where.append(f"r.name IN ({', '.join('?' * len(runs))})")
+        params.extend(runs)
+    if unique:
+        where.append(f"{e}.present_in = 1")
+    if shared:
+        where.append(f"{e}.present_in = {e}.compared")
+    if min_spc is not None:
+        where.append(f"{a}.avg_spc >= ?")
+        params.append(min_spc)
+    if min_tic is not None:
+        where.append(f"{a}.avg_tic >= ?")
+        params.append(min_tic)
+    if cogs:
+        where.append(f"EXISTS (SELECT 1 FROM cog c WHERE c.accession = p.accession "
+                     f"AND c.code IN ({', '.join('?' * len(cogs))}))")
+        params.extend(cogs)
+    if localizations:
+        where.append(f"EXISTS (SELECT 1 FROM localization l WHERE l.accession = p.accession "
+                     f"AND l.normalized IN ({', '.join('?' * len(localizations))})"
+                     + (" AND l.tool = ?" if tool else "") + ")")
+        params.extend(localizations)
+        if tool:
+            params.append(tool)
+    sql = f"""
+        SELECT DISTINCT r.name, p.accession, {a}.avg_spc, {a}.avg_tic, {e}.present_in, {e}.compared,
+               (SELECT group_concat(code, '') FROM (SELECT DISTINCT code FROM cog c
+                 WHERE c.accession = p.accession ORDER BY code)),
+               (SELECT group_concat(tool || ':' || normalized, ', ') FROM (SELECT DISTINCT tool, normalized
+                 FROM localization l WHERE l.accession = p.accession ORDER BY tool))
+        FROM {base} p JOIN runs r ON r.id = p.run_id
+        {join}
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY r.name, p.accession"""
+    return conn.execute(sql, params).fetchall()
+
+def summarize_store(conn):
+    # Rows stored per run and table
+    counts = {}
+    for table in ("abundance", "exclusivity", "cog", "localization"):
+        for name, n in conn.execute(f"SELECT r.name, COUNT(*) FROM {table} t JOIN runs r ON r.id = t.run_id "
+                                    f"GROUP BY r.name"):
+            counts.setdefault(name, {})[table] = n
+    return counts
+
+def _print_rows(header, rows, output=None):
+    out = open(output, "w") if output else sys.stdout
+    try:
+        out.write("\t".join(header) + "\n")
+        for row in rows:
+            # str() keeps every digit of a float (81169.07, not 81169.1), so -o files lose nothing
+            out.write("\t".join("" if v is None else str(v) for v in row) + "\n")
+    finally:
+        if output:
+            out.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="results_store.py",
+        description="Query the SQLite results store the tools fill when run with --store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    runs = commands.add_parser("runs", help="list runs and the rows each table holds for them")
+    runs.add_argument("db")
+    find = commands.add_parser("find", help="proteins matching abundance, exclusivity, COG and localization filters")
+    find.add_argument("db")
+    find.add_argument("--run", help="comma-separated run names (default: all)")
+    find.add_argument("--unique", action="store_true", help="only in this run of an exclusivity comparison")
+    find.add_argument("--shared", action="store_true", help="in every run of an exclusivity comparison")
+    find.add_argument("--comparison", help="exclusivity comparison to use (default: any)")
+    find.add_argument("--min-spc", type=float, help="minimum average SpC")
+    find.add_argument("--min-tic", type=float, help="minimum average TIC")
+    find.add_argument("--localization",
+                      help="comma-separated normalized localizations, e.g. CytoplasmicMembrane,OuterMembrane")
+    find.add_argument("--tool", help="with --localization: only this tool's prediction (psortb, cello, consensus)")
+    find.add_argument("--cog", help="COG letters, e.g. M or MK (any of them)")
+    find.add_argument("-o", "--output", help="write the table here instead of printing it")
+    sql = commands.add_parser("sql", help="run any SQL query and print the result as a table")
+    sql.add_argument("db")
+    sql.add_argument("query")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist; run a tool with --store {args.db} first")
+    conn = connect(args.db)
+    started = time.perf_counter()
+    if args.command == "runs":
+        counts = summarize_store(conn)
+        tables = ("abundance", "exclusivity", "cog", "localization")
+        _print_rows(("Run",) + tables, [(name,) + tuple(counts[name].get(t, 0) for t in tables) for name in sorted(counts)])
+        return 0
+    if args.command == "sql":
+        try:
+            cursor = conn.execute(args.query)
+            rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Query failed: {e}", file=sys.stderr)
+            return 1
+        _print_rows([d[0] for d in cursor.description or ()], rows)
+    else:
+        split = lambda value: [v.strip() for v in value.split(",") if v.strip()] if value else None
+        rows = find_proteins(conn, split(args.run), args.unique, args.shared, args.comparison, args.min_spc,
+                             args.min_tic, split(args.localization), args.tool, list(args.cog) if args.cog else None)
+        _print_rows(FIND_COLUMNS, rows, args.output)
+    print(f"{len(rows)} rows ({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+    conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# -------------------------
+# Import-time budget for the command-line tools
+# -------------------------
+# Cluster wrappers start these scripts thousands of times on small files, so interpreter and
+# library start-up can dominate. For each tool this imports the module in a fresh interpreter with
+# `python -X importtime`, takes the best of a few runs, and checks it against a time budget and
+# against the heavy packages the module must leave to the code paths that need them.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Module -> (import budget in ms, packages it must not load on import). The budgets leave room
+# for the dependencies each tool cannot work without (numpy, pandas, asyncio).
+TOOLS = {
+    "Cleaner": (80, ("pandas", "openpyxl", "tkinter", "numpy", "concurrent")),
+    "uniprot_store": (80, ("pandas", "openpyxl", "tkinter", "numpy")),
+    "pipeline": (100, ("pandas", "openpyxl", "tkinter", "numpy")),
+    "job_client": (200, ("pandas", "openpyxl", "tkinter", "numpy")),
+    "most_changed_proteins": (200, ("openpyxl", "tkinter", "pandas")),
+    "parse_and_compare_COGs": (200, ("openpyxl", "tkinter", "pandas")),
+    "threshold_index": (200, ("openpyxl", "tkinter", "pandas")),
+    "differential_abundance": (200, ("scipy", "openpyxl", "tkinter", "pandas")),
+    "protein_exclusivity": (200, ("pandas", "openpyxl", "tkinter")),
+    "consensus_localization": (200, ("pandas", "openpyxl", "tkinter")),
+    "results_store": (80, ("pandas", "openpyxl", "tkinter", "numpy")),
+}
+DEFAULT_BUDGET_MS = 200     # modules not listed above
+
+def measure_import(module, python=sys.executable):
+    # Returns (total import time in ms, {package: ms}) for one fresh import; a package's time is its
+    # largest cumulative entry, wherever in the import tree it was first loaded
+    result = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"], cwd=HERE,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    packages, total = {}, 0.0
+    for line in result.stderr.splitlines():
+        # "import time:      self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        ms = int(cumulative) / 1000
+        if not name.startswith("  "):
+            total += ms                   # top-level entries: nested imports are already included
+        top = name.strip().split(".")[0]
+        packages[top] = max(packages.get(top, 0.0), ms)
+    return total, packages
+
+def check_module(module, budget_ms=None, repeat=3):
+    # Best of `repeat` runs (the first also warms the OS file cache) plus any eagerly loaded heavy package
+    default_budget, lazy = TOOLS.get(module, (DEFAULT_BUDGET_MS, ()))
+    budget_ms = budget_ms or default_budget
+    runs = [measure_import(module) for _ in range(repeat)]
+    total, packages = min(runs, key=lambda run: run[0])
+    loaded = [p for p in lazy if p in packages]
+    return {"module": module, "import_ms": round(total, 1), "budget_ms": budget_ms,
+            "eager_imports": loaded, "ok": total <= budget_ms and not loaded,
+            "heaviest": sorted(((p, round(ms, 1)) for p, ms in packages.items() if p != module),
+                               key=lambda x: -x[1])[:4]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="startup_time.py",
+        description="Measure how long each tool takes to import and check it against a start-up budget.")
+    parser.add_argument("modules", nargs="*", help="modules to check (default: all tools)")
+    parser.add_argument("--budget-ms", type=float,
+                        help="import time allowed for every module (default: per-tool budgets in TOOLS)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module; the fastest counts")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = [check_module(m, args.budget_ms, args.repeat) for m in args.modules or TOOLS]
+    for r in results:
+        heaviest = ", ".join(f"{p} {ms:g}" for p, ms in r["heaviest"])
+        status = "OK  " if r["ok"] else "OVER"
+        print(f"{status} {r['module']:<24} {r['import_ms']:7.1f} ms of {r['budget_ms']:g}   ({heaviest})")
+        if r["eager_imports"]:
+            print(f"     loads {', '.join(r['eager_imports'])} at import time")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+    return 0 if all(r["ok"] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
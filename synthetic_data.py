@@ -0,0 +1,219 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+# -------------------------
+# Synthetic inputs at proteome scale
+# -------------------------
+# Writes realistic stand-ins for every input the workflow reads, at any size, from a seed:
+# "Protein list" workbooks with SpC/TIC replicates, eggNOG-mapper exports, PSORTb/CELLO reports,
+# DAVID charts and UniProt flat files. Runs of one study share a configurable fraction of their
+# proteins, so comparisons (exclusivity, COGs) see realistic overlaps. Used by benchmark.py.
+
+PSORTB_LOCALIZATIONS = ("Cytoplasmic", "CytoplasmicMembrane", "Periplasmic", "OuterMembrane",
+                        "Extracellular", "Unknown")
+CELLO_LOCALIZATIONS = ("Cytoplasmic", "InnerMembrane", "Periplasmic", "OuterMembrane", "Extracellular")
+# Single and multi-letter COG categories with rough frequencies from bacterial proteomes
+COG_CODES = ("S", "-", "K", "E", "M", "C", "G", "P", "J", "L", "T", "H", "I", "O", "U", "V", "F", "Q",
+             "N", "D", "EG", "KT", "GM", "IQ")
+COG_WEIGHTS = (20, 12, 8, 8, 6, 6, 6, 5, 5, 4, 4, 3, 3, 3, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1)
+AMINO_ACIDS = np.frombuffer(b"ACDEFGHIKLMNPQRSTVWY", dtype=np.uint8)
+# Background frequencies (%) of the 20 residues above
+AMINO_ACID_WEIGHTS = (8.3, 1.4, 5.5, 6.8, 3.9, 7.1, 2.3, 5.9, 5.8, 9.7, 2.4, 4.1, 4.7, 3.9, 5.4, 6.6, 5.3, 6.9, 1.1, 2.9)
+
+def _choice(rng, options, n, weights=None):
+    p = None if weights is None else np.asarray(weights, dtype=float) / sum(weights)
+    return np.asarray(options, dtype=object)[rng.choice(len(options), size=n, p=p)]
+
+def accessions(n, start=0):
+    # Swiss-Prot style IDs (P00001) for the first 100000, TrEMBL style (A0A0000001) after that
+    return [f"P{i:05d}" if i < 100000 else f"A0A{i:07d}" for i in range(start, start + n)]
+
+def study_proteins(n, runs, shared=0.6, seed=0):
+    # One accession list per run: int(n * shared) proteins found in every run, the rest unique to
+    # the run; each list is shuffled like the order of a real export
+    rng = np.random.default_rng(seed)
+    n_shared = int(n * shared)
+    common = accessions(n_shared)
+    lists = []
+    for r in range(runs):
+        own = accessions(n - n_shared, start=n_shared + r * (n - n_shared))
+        proteins = np.array(common + own, dtype=object)
+        rng.shuffle(proteins)
+        lists.append(proteins.tolist())
+    return lists
+
+# -------------------------
+# Writers
+# -------------------------
+def write_protein_list_workbook(path, proteins, replicates=3, missing_rate=0.1, seed=0):
+    # "Protein list" sheet: ProteinAC, SpC 1..k, TIC 1..k; abundances are log-normal per protein
+    # with replicate noise, and missing_rate of the values are left empty
+    from openpyxl import Workbook
+    rng = np.random.default_rng(seed)
+    n = len(proteins)
+    level = rng.lognormal(2.0, 1.2, size=(n, 1))
+    spc = rng.poisson(level * rng.lognormal(0, 0.3, size=(n, replicates))).astype(float)
+    tic = np.round(level * 2000 * rng.lognormal(0, 0.3, size=(n, replicates)), 1)
+    spc[rng.random((n, replicates)) < missing_rate] = np.nan
+    tic[rng.random((n, replicates)) < missing_rate] = np.nan
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Protein list")
+    ws.append(["ProteinAC"] + [f"SpC {i + 1}" for i in range(replicates)]
+              + [f"TIC {i + 1}" for i in range(replicates)])
+    for protein, spc_row, tic_row in zip(proteins, spc.tolist(), tic.tolist()):
+        ws.append([protein] + [None if v != v else int(v) for v in spc_row]
+                  + [None if v != v else v for v in tic_row])
+    wb.save(path)
+    return path
+
+EGGNOG_HEADER = ["#query", "seed_ortholog", "evalue", "score", "eggNOG_OGs", "max_annot_lvl",
+                 "COG_category", "Description", "Preferred_name"]
+
+def write_eggnog_export(path, proteins, seed=0, annotated=0.9):
+    # eggNOG-mapper annotations: the tab-separated .emapper.annotations file, or with an .xlsx
+    # extension the Excel download (two comment rows, header on row 3, data from row 4).
+    # Only `annotated` of the proteins get a hit, as with real searches.
+    rng = np.random.default_rng(seed)
+    hits = [p for p, keep in zip(proteins, rng.random(len(proteins)) < annotated) if keep]
+    codes = _choice(rng, COG_CODES, len(hits), COG_WEIGHTS)
+    evalues = rng.uniform(1e-120, 1e-5, size=len(hits))
+    preamble = [["## emapper-2.1.12"], ["## command: emapper.py -i proteins.fasta"]]
+    rows = ([p, f"511145.{p}", f"{e:.2e}", "250.0", "COG0000@1|root", "2|Bacteria", c, "-", "-"]
+            for p, e, c in zip(hits, evalues.tolist(), codes))
+    if path.lower().endswith(".xlsx"):
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("annotations")
+        for row in preamble + [EGGNOG_HEADER]:
+            ws.append(row)
+        for row in rows:
+            ws.append(row)
+        wb.save(path)
+        return path
+    with open(path, "w") as f:
+        for row in preamble + [EGGNOG_HEADER]:
+            f.write("\t".join(row) + "\n")
+        for row in rows:
+            f.write("\t".join(row) + "\n")
+        f.write(f"## {len(hits)} queries scanned\n")
+    return path
+
+def write_psortb_report(path, proteins, seed=0):
+    # PSORTb 3 "normal" output, one block per protein
+    rng = np.random.default_rng(seed)
+    locs = _choice(rng, PSORTB_LOCALIZATIONS, len(proteins))
+    scores = rng.uniform(2, 10, size=len(proteins)).tolist()
+    rule = "-" * 79
+    with open(path, "w") as f:
+        for protein, loc, score in zip(proteins, locs, scores):
+            f.write(f"SeqID: {protein}\n  Analysis Report:\n    CMSVM-         Unknown          [No details]\n"
+                    f"    SignalP        No signal peptide detected     [Signal peptide not detected]\n"
+                    f"  Localization Scores:\n    Cytoplasmic            {score:.2f}\n"
+                    f"  Final Prediction:\n    {loc:<22} {score:.2f}\n{rule}\n\n")
+    return path
+
+def write_cello_report(path, proteins, seed=0):
+    # CELLO text results: header, then index, sequence ID and predicted localization per line
+    rng = np.random.default_rng(seed)
+    locs = _choice(rng, CELLO_LOCALIZATIONS, len(proteins))
+    with open(path, "w") as f:
+        f.write("CELLO RESULTS\n")
+        for i, (protein, loc) in enumerate(zip(proteins, locs)):
+            f.write(f"{i + 1}\t{protein}\t{loc}\n")
+    return path
+
+DAVID_HEADER = ["Category", "Term", "Count", "%", "PValue", "Genes", "List Total", "Pop Hits",
+                "Pop Total", "Fold Enrichment", "Bonferroni", "Benjamini", "FDR"]
+
+def write_david_chart(path, proteins, n_terms=1000, seed=0):
+    # DAVID functional annotation chart (tab-separated, FDR as last column)
+    rng = np.random.default_rng(seed)
+    categories = _choice(rng, ("GOTERM_BP_DIRECT", "GOTERM_MF_DIRECT", "GOTERM_CC_DIRECT", "KEGG_PATHWAY"), n_terms)
+    counts = np.minimum(rng.geometric(0.05, size=n_terms) + 2, len(proteins))
+    pvalues = 10 ** -rng.uniform(0, 12, size=n_terms)
+    fdr = np.minimum(pvalues * n_terms / (np.argsort(np.argsort(pvalues)) + 1), 1.0)
+    with open(path, "w") as f:
+        f.write("\t".join(DAVID_HEADER) + "\n")
+        for i in range(n_terms):
+            genes = ", ".join(proteins[j] for j in rng.choice(len(proteins), size=counts[i], replace=False))
+            f.write(f"{categories[i]}\tGO:{i:07d}~synthetic term {i}\t{counts[i]}\t{100 * counts[i] / len(proteins):.2f}\t"
+                    f"{pvalues[i]:.3E}\t{genes}\t{len(proteins)}\t{counts[i] * 3}\t20000\t"
+                    f"{rng.uniform(1, 10):.2f}\t{min(1.0, pvalues[i] * n_terms):.3E}\t{fdr[i]:.3E}\t{fdr[i]:.3E}\n")
+    return path
+
+def write_uniprot_flat_file(path, proteins, seed=0, mean_length=330):
+    # UniProt text (flat file) entries as downloaded from ID mapping: ID/AC/DE/OS lines, SQ header,
+    # sequence in 10-residue blocks, 60 per line, and the // terminator
+    rng = np.random.default_rng(seed)
+    lengths = np.maximum(rng.gamma(2.5, mean_length / 2.5, size=len(proteins)).astype(int), 30)
+    p = np.asarray(AMINO_ACID_WEIGHTS) / sum(AMINO_ACID_WEIGHTS)
+    with open(path, "w") as f:
+        for start in range(0, len(proteins), 10000):
+            block = lengths[start:start + 10000]
+            residues = AMINO_ACIDS[rng.choice(len(AMINO_ACIDS), size=int(block.sum()), p=p)].tobytes().decode()
+            offset = 0
+            for protein, length in zip(proteins[start:start + 10000], block.tolist()):
+                seq = residues[offset:offset + length]
+                offset += length
+                lines = [" ".join(seq[i + j:i + j + 10] for j in range(0, 60, 10) if i + j < length)
+                         for i in range(0, length, 60)]
+                f.write(f"ID   {protein}_ECOLI             Unreviewed;       {length} AA.\n"
+                        f"AC   {protein};\nDE   SubName: Full=Synthetic protein {protein};\n"
+                        f"OS   Escherichia coli (strain K12).\n"
+                        f"SQ   SEQUENCE   {length} AA;  {length * 110} MW;  0000000000000000 CRC64;\n"
+                        + "".join(f"     {line}\n" for line in lines) + "//\n")
+    return path
+
+def generate_study(output_dir, n_proteins=10000, runs=3, replicates=3, shared=0.6, seed=0, kinds=None):
+    # Writes a whole synthetic study; returns {kind: [paths, one per run]} and saves it as manifest.json
+    kinds = kinds or ("workbook", "eggnog", "eggnog_xlsx", "psortb", "cello", "david", "uniprot")
+    os.makedirs(output_dir, exist_ok=True)
+    writers = {
+        "workbook": ("run{}.xlsx", lambda path, proteins, s: write_protein_list_workbook(path, proteins, replicates, seed=s)),
+        "eggnog": ("run{}.emapper.annotations", write_eggnog_export),
+        "eggnog_xlsx": ("run{}_eggnog.xlsx", write_eggnog_export),
+        "psortb": ("run{}_psortb.txt", write_psortb_report),
+        "cello": ("run{}_cello.txt", write_cello_report),
+        "david": ("run{}_david.txt", lambda path, proteins, s: write_david_chart(
+            path, proteins, max(100, min(5000, len(proteins) // 10)), s)),
+        "uniprot": ("run{}_uniprot.txt", write_uniprot_flat_file),
+    }
+    unknown = [k for k in kinds if k not in writers]
+    if unknown:
+        raise ValueError(f"Unknown data kind(s): {', '.join(unknown)}. Choose from: {', '.join(writers)}")
+    manifest = {"proteins": n_proteins, "runs": runs, "replicates": replicates, "shared": shared, "seed": seed,
+                "files": {}}
+    for r, proteins in enumerate(study_proteins(n_proteins, runs, shared, seed)):
+        for kind in kinds:
+            pattern, writer = writers[kind]
+            path = os.path.join(output_dir, pattern.format(r + 1))
+            writer(path, proteins, seed * 1000 + r)
+            manifest["files"].setdefault(kind, []).append(path)
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest["files"]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="synthetic_data.py",
+        description="Write synthetic workbooks, eggNOG, PSORTb, CELLO, DAVID and UniProt files for testing and benchmarks.")
+    parser.add_argument("output_dir")
+    parser.add_argument("-n", "--proteins", type=int, default=10000, help="proteins per run (default 10000)")
+    parser.add_argument("--runs", type=int, default=3, help="runs (conditions) in the study (default 3)")
+    parser.add_argument("--replicates", type=int, default=3, help="SpC/TIC replicate columns (default 3)")
+    parser.add_argument("--shared", type=float, default=0.6, help="fraction of proteins found in every run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", help="comma-separated subset of: workbook, eggnog, eggnog_xlsx, psortb, "
+                                        "cello, david, uniprot (default: all)")
+    args = parser.parse_args(argv)
+    kinds = [k.strip() for k in args.kinds.split(",")] if args.kinds else None
+    files = generate_study(args.output_dir, args.proteins, args.runs, args.replicates, args.shared, args.seed, kinds)
+    for kind, paths in files.items():
+        print(f"{kind}: {', '.join(os.path.basename(p) for p in paths)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
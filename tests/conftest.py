@@ -0,0 +1,11 @@
+import os
+import sys
+import pytest
+
+# The tools are top-level scripts, not a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def no_parse_cache(monkeypatch):
+    # Tests never read from or write to the user's parse cache (parse_cache.py)
+    monkeypatch.setenv("PROTEOMICS_CACHE", "0")
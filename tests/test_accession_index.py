@@ -0,0 +1,52 @@
+import random
+import numpy as np
+import pytest
+import accession_index as ai
+from accession_index import AccessionIndex, group_by_membership
+
+def _random_sets(n_sets, universe=200, seed=0):
+    rng = random.Random(seed)
+    pool = [f"P{i:05d}" for i in range(universe)]
+    # Duplicates within a list and empty sets are allowed
+    return [[rng.choice(pool) for _ in range(rng.randint(0, 150))] for _ in range(n_sets)]
+
+def test_interning_is_dense_and_reversible():
+    index = AccessionIndex(["P2", "P1", "P2"])
+    ids = index.encode(["P3", "P1", "P3"])
+    assert len(index) == 3 and "P3" in index and "P9" not in index
+    assert ids.tolist() == [1, 2] and ids.dtype == ai.ID_DTYPE
+    assert index.decode(ids) == ["P1", "P3"]
+    assert index.lookup(["P9", "P2", "P2"]).tolist() == [0]
+    assert len(index) == 3
+
+@pytest.mark.parametrize("seed", range(5))
+def test_set_algebra_matches_python_sets(seed):
+    a_list, b_list, c_list = _random_sets(3, seed=seed)
+    index = AccessionIndex()
+    a, b, c = (index.encode(s) for s in (a_list, b_list, c_list))
+    decode = lambda ids: set(index.decode(ids))
+    assert decode(ai.union(a, b)) == set(a_list) | set(b_list)
+    assert decode(ai.intersection(a, b)) == set(a_list) & set(b_list)
+    assert decode(ai.difference(a, b)) == set(a_list) - set(b_list)
+    assert decode(ai.union_all([a, b, c])) == set(a_list) | set(b_list) | set(c_list)
+    assert decode(ai.intersection_all([a, b, c])) == set(a_list) & set(b_list) & set(c_list)
+    for ids in (ai.union(a, b), ai.intersection(a, b), ai.difference(a, b)):
+        assert ids.dtype == ai.ID_DTYPE and np.all(np.diff(ids) > 0)
+
+@pytest.mark.parametrize("n_sets", [1, 2, 3, 7, 8, 9, 17])
+def test_membership_groups_match_a_brute_force_split(n_sets):
+    # 8, 9 and 17 sets cross the byte boundaries of the packed presence bits
+    lists = _random_sets(n_sets, universe=60, seed=n_sets)
+    index = AccessionIndex()
+    groups = group_by_membership([index.encode(s) for s in lists])
+    expected = {}
+    for accession in set().union(*map(set, lists)):
+        mask = sum(1 << i for i, s in enumerate(lists) if accession in s)
+        expected.setdefault(mask, set()).add(accession)
+    assert {mask: set(index.decode(ids)) for mask, ids in groups.items()} == expected
+    assert all(np.all(np.diff(ids) > 0) for ids in groups.values())
+
+def test_empty_inputs():
+    assert group_by_membership([]) == {}
+    assert group_by_membership([np.empty(0, dtype=ai.ID_DTYPE)] * 3) == {}
+    assert ai.union_all([]).tolist() == [] and ai.intersection_all([]).tolist() == []
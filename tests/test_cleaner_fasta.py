@@ -0,0 +1,72 @@
+import pytest
+from Cleaner import clean_fasta_metadata_file, read_fasta_index
+
+ENTRY = """ID   {name}_ECOLI             Reviewed;         {length} AA.
+AC   {accession};
+DE   RecName: Full=Test protein;
+SQ   SEQUENCE   {length} AA;  1000 MW;  0000000000000000 CRC64;
+{sequence}//
+"""
+
+def _entry(name, accession, residues):
+    # Sequence lines are indented and grouped in tens, as in UniProt text exports
+    lines = ["     " + " ".join(residues[i:i + 60][j:j + 10] for j in range(0, 60, 10)).strip()
+             for i in range(0, len(residues), 60)]
+    return ENTRY.format(name=name, accession=accession, length=len(residues), sequence="\n".join(lines) + "\n")
+
+# Sequence lines that begin with the residues I D or S Q look like line codes once stripped
+RECORDS = [("P0A7Z4", "MKVLAAGIDNNVLAEKLAQ" * 4), ("P0A9K9", "IDKLMNPQRS" * 7), ("P0AES4", "SQVPLLQEKT" * 8),
+           ("P0A6F5", "MAAKDVKFGN" * 6)]
+
+def _read_fasta(path):
+    records, name = {}, None
+    with open(path) as f:
+        for line in f:
+            if line.startswith(">"):
+                name = line[1:].strip()
+                records[name] = ""
+            else:
+                records[name] += line.strip()
+    return records
+
+def _write_export(path):
+    with open(path, "w") as f:
+        for accession, residues in RECORDS:
+            f.write(_entry(accession.lower(), accession, residues))
+
+def test_sequence_lines_starting_with_line_codes_are_kept(tmp_path):
+    source = str(tmp_path / "uniprot.txt")
+    _write_export(source)
+    output = clean_fasta_metadata_file(source, output_path=str(tmp_path / "out.fasta"))
+    assert _read_fasta(output) == {accession.lower(): residues for accession, residues in RECORDS}
+
+def test_parallel_chunks_match_the_sequential_output(tmp_path):
+    source = str(tmp_path / "uniprot.txt")
+    _write_export(source)
+    sequential = clean_fasta_metadata_file(source, output_path=str(tmp_path / "one.fasta"))
+    parallel = clean_fasta_metadata_file(source, workers=2, chunk_size=200, output_path=str(tmp_path / "two.fasta"))
+    with open(sequential, "rb") as a, open(parallel, "rb") as b:
+        assert a.read() == b.read()
+    assert sorted(read_fasta_index(parallel)) == sorted(accession.lower() for accession, _ in RECORDS)
+
+def test_the_index_written_with_the_fasta_is_not_stale(tmp_path, monkeypatch):
+    import os
+    import time
+    import Cleaner
+    write = Cleaner._write_uniprot_fasta
+
+    def write_then_flush_late(input_path, output_path, *args):
+        # As when the FASTA's last buffered bytes reach the disk after the index was closed
+        written = write(input_path, output_path, *args)
+        time.sleep(0.05)
+        os.utime(output_path)
+        return written
+
+    monkeypatch.setattr(Cleaner, "_write_uniprot_fasta", write_then_flush_late)
+    source = str(tmp_path / "uniprot.txt")
+    _write_export(source)
+    output = clean_fasta_metadata_file(source, output_path=str(tmp_path / "out.fasta"))
+    assert os.path.getmtime(output + ".fai") >= os.path.getmtime(output)
+    # subset must use the index as written instead of rescanning the FASTA
+    monkeypatch.setattr(Cleaner, "write_fasta_index", lambda path: pytest.fail("index rebuilt"))
+    assert sorted(read_fasta_index(output)) == sorted(accession.lower() for accession, _ in RECORDS)
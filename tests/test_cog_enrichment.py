@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+stats = pytest.importorskip("scipy.stats")
+from parse_and_compare_COGs import (hypergeometric_tests, cog_enrichment, compare_cog_composition,
+                                    parse_cog_map, COG_CODES)
+
+def _random_tables(seed, count=400, max_total=300):
+    # (count in B, total B, count in A, total A), including empty and full categories
+    rng = np.random.default_rng(seed)
+    n_a, n_b = rng.integers(1, max_total, count), rng.integers(1, max_total, count)
+    a, b = rng.integers(0, n_a + 1), rng.integers(0, n_b + 1)
+    a[:10], b[:10] = 0, n_b[:10]
+    a[10:20], b[10:20] = n_a[10:20], 0
+    n_a[20:30], n_b[20:30], a[20:30], b[20:30] = 40, 40, 10, 10      # symmetric: ties in the pmf
+    return b, n_b, a, n_a
+
+@pytest.mark.parametrize("seed", range(3))
+def test_hypergeometric_tests_match_scipy_table_by_table(seed):
+    b, n_b, a, n_a = _random_tables(seed)
+    keep = a + b > 0
+    b, n_b, a, n_a = b[keep], n_b[keep], a[keep], n_a[keep]
+    p_enriched, p_fisher = hypergeometric_tests(b, n_a + n_b, a + b, n_b)
+    for k in range(len(b)):
+        table = [[b[k], n_b[k] - b[k]], [a[k], n_a[k] - a[k]]]
+        assert p_fisher[k] == pytest.approx(stats.fisher_exact(table).pvalue, rel=1e-9, abs=1e-13)
+        expected = stats.hypergeom.sf(b[k] - 1, n_a[k] + n_b[k], a[k] + b[k], n_b[k])
+        assert p_enriched[k] == pytest.approx(expected, rel=1e-9, abs=1e-13)
+
+def test_large_tables_stay_accurate():
+    # Proteome-sized files, where tail probabilities are tiny
+    b, n_b, a, n_a = np.array([900, 40, 3000]), np.array([20000, 20000, 15000]), \
+        np.array([400, 60, 1200]), np.array([18000, 25000, 16000])
+    p_enriched, p_fisher = hypergeometric_tests(b, n_a + n_b, a + b, n_b)
+    for k in range(3):
+        table = [[b[k], n_b[k] - b[k]], [a[k], n_a[k] - a[k]]]
+        assert p_fisher[k] == pytest.approx(stats.fisher_exact(table).pvalue, rel=1e-7)
+        assert p_enriched[k] == pytest.approx(stats.hypergeom.sf(b[k] - 1, n_a[k] + n_b[k], a[k] + b[k], n_b[k]),
+                                              rel=1e-7)
+
+def test_cog_enrichment_tests_every_pair_and_category():
+    rng = np.random.default_rng(4)
+    totals = np.array([120, 95, 200])
+    counts = np.minimum(rng.integers(0, 40, (3, 6)), totals[:, None])
+    counts[:, 5] = 0                                  # a category no file has
+    pairs = [(0, 1), (0, 2), (1, 2)]
+    result = cog_enrichment(counts, totals, pairs)
+    for row, (i, j) in enumerate(pairs):
+        for c in range(6):
+            if c == 5:
+                assert np.isnan(result["p_fisher"][row, c]) and np.isnan(result["q_fisher"][row, c])
+                continue
+            a, b = counts[i, c], counts[j, c]
+            table = [[b, totals[j] - b], [a, totals[i] - a]]
+            assert result["p_fisher"][row, c] == pytest.approx(stats.fisher_exact(table).pvalue, rel=1e-9, abs=1e-13)
+        tested = ~np.isnan(result["p_fisher"][row])
+        np.testing.assert_allclose(result["q_fisher"][row, tested],
+                                   stats.false_discovery_control(result["p_fisher"][row, tested]), rtol=1e-12)
+        np.testing.assert_allclose(result["prop_b"][row], counts[j] / totals[j])
+
+def test_composition_counts_match_the_parsed_cog_lists(tmp_path):
+    from synthetic_data import generate_study
+    paths = generate_study(str(tmp_path), 400, runs=3, seed=3, kinds=("eggnog",))["eggnog"]
+    result = compare_cog_composition(paths, labels=["A", "B", "C"], reference="A")
+    assert result["comparisons"] == ["B vs A", "C vs A"]
+    for f, path in enumerate(paths):
+        cog_map = parse_cog_map(path)
+        assert result["totals"][f] == len(set().union(*map(set, cog_map.values())))
+        for c, code in enumerate(result["codes"]):
+            assert result["counts"][f, c] == len(set(cog_map.get(code, ())))
+    assert result["codes"][:len(COG_CODES)] == COG_CODES
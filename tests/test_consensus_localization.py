@@ -0,0 +1,38 @@
+import pytest
+from consensus_localization import looks_like_header, read_localization_table, build_consensus, UNKNOWN
+
+@pytest.mark.parametrize("cell", ["SeqID", "ID", "Protein name", "Protein AC", "protein_ac", "Sequence ID", "CELLO"])
+def test_column_names_are_headers(cell):
+    assert looks_like_header(cell)
+
+@pytest.mark.parametrize("cell", ["id-1234", "ID_0001", "P12345", "sp|P12345|NAME_ECOLI", "name1", "protein42"])
+def test_ids_are_not_headers(cell):
+    assert not looks_like_header(cell)
+
+def _write(path, lines):
+    path.write_text("".join(line + "\n" for line in lines))
+    return str(path)
+
+def test_a_data_row_that_looks_like_an_id_is_kept(tmp_path):
+    path = _write(tmp_path / "psortb_cleaned.txt", ["id-0001\tCytoplasmic", "id-0002\tOuterMembrane"])
+    table = read_localization_table(path, "PSORTb")
+    assert table["PSORTb"].to_dict() == {"id-0001": "Cytoplasmic", "id-0002": "OuterMembrane"}
+
+def test_header_rows_are_dropped_and_ids_normalized(tmp_path):
+    path = _write(tmp_path / "cello_cleaned.txt",
+                  ["CELLO\tRESULTS", "sp|P00001|A_ECOLI\tInnerMembrane", "P00002\tcytoplasm", "P00002\tPeriplasmic"])
+    table = read_localization_table(path, "CELLO")
+    assert table["CELLO"].to_dict() == {"P00001": "CytoplasmicMembrane", "P00002": "Cytoplasmic"}
+
+def test_consensus_needs_two_agreeing_sources(tmp_path):
+    tables = {
+        "PSORTb": read_localization_table(_write(tmp_path / "p.txt", ["SeqID\tLocalization", "P1\tCytoplasmic",
+                                                                      "P2\tUnknown", "P3\tPeriplasmic"]), "PSORTb"),
+        "CELLO": read_localization_table(_write(tmp_path / "c.txt", ["P1\tCytoplasmic", "P2\tPeriplasmic",
+                                                                     "P3\tOuterMembrane", "P4\tExtracellular"]), "CELLO"),
+        "SOSUI": read_localization_table(_write(tmp_path / "s.tsv", ["P2\tPeriplasmic", "P3\tExtracellular"]), "SOSUI"),
+    }
+    merged = build_consensus(tables).set_index("ProteinAC")
+    assert merged["Consensus"].dropna().to_dict() == {"P1": "Cytoplasmic", "P2": "Periplasmic"}
+    assert merged.loc["P4", "PSORTb"] == UNKNOWN
+    assert merged["Sources"].to_dict() == {"P1": 2, "P2": 2, "P3": 3, "P4": 1}
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+stats = pytest.importorskip("scipy.stats")
+from differential_abundance import (welch_ttest, mann_whitney, benjamini_hochberg, shared_rows,
+                                    compare_conditions)
+
+def _replicates(seed, rows=300, n_a=3, n_b=4, missing=0.15):
+    # Small integer counts (so many rows have ties) with some replicates missing
+    rng = np.random.default_rng(seed)
+    a = rng.poisson(rng.uniform(1, 20, (rows, 1)), (rows, n_a)).astype(float)
+    b = rng.poisson(rng.uniform(1, 20, (rows, 1)), (rows, n_b)).astype(float)
+    a[rng.random(a.shape) < missing] = np.nan
+    b[rng.random(b.shape) < missing] = np.nan
+    # A few rows without variance or with a single value per group
+    a[:5], b[:5] = 7.0, 7.0
+    a[5:10, 1:] = np.nan
+    return a, b
+
+def _present(row):
+    return row[~np.isnan(row)]
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")      # scipy on near-identical replicates
+def test_welch_matches_scipy_row_by_row(seed):
+    a, b = _replicates(seed)
+    p = welch_ttest(a, b)
+    for k in range(len(a)):
+        x, y = _present(a[k]), _present(b[k])
+        if len(x) < 2 or len(y) < 2 or (np.var(x) == 0 and np.var(y) == 0):
+            assert np.isnan(p[k])
+        else:
+            assert p[k] == pytest.approx(stats.ttest_ind(y, x, equal_var=False).pvalue, rel=1e-9)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_mann_whitney_matches_scipy_row_by_row(seed):
+    # scipy picks the exact or the tie-corrected normal test per call; one call per row is the reference
+    a, b = _replicates(seed, rows=200, n_a=5, n_b=6)
+    p = mann_whitney(a, b)
+    for k in range(len(a)):
+        x, y = _present(a[k]), _present(b[k])
+        if not len(x) or not len(y):
+            assert np.isnan(p[k])
+            continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected = stats.mannwhitneyu(y, x, alternative="two-sided").pvalue
+        np.testing.assert_allclose(p[k], expected, rtol=1e-9, equal_nan=True)
+
+def test_benjamini_hochberg_matches_scipy_and_skips_nan():
+    rng = np.random.default_rng(0)
+    p = np.concatenate([rng.uniform(0, 1, 500), rng.uniform(0, 1e-3, 50), [0.5, 0.5, 0.5]])
+    p[rng.random(len(p)) < 0.1] = np.nan
+    q = benjamini_hochberg(p)
+    tested = ~np.isnan(p)
+    assert np.isnan(q[~tested]).all()
+    np.testing.assert_allclose(q[tested], stats.false_discovery_control(p[tested], method="bh"), rtol=1e-12)
+    assert np.isnan(benjamini_hochberg([np.nan, np.nan])).all()
+
+def test_shared_rows_keep_condition_a_order_and_first_duplicates():
+    rows_a, rows_b = shared_rows(["P3", "P1", "P2", "P1", "P9"], ["P1", "P2", "P3", "P2"])
+    assert rows_a.tolist() == [0, 1, 2] and rows_b.tolist() == [2, 0, 1]
+
+def test_compare_conditions_pairs_rows_by_protein():
+    a, b = _replicates(5, rows=4)
+    cond_a = {"proteins": ["P1", "P2", "P3", "P4"], "SpC": a, "TIC": a * 100}
+    # Condition B lists the proteins in another order and lacks P2
+    cond_b = {"proteins": ["P4", "P1", "P3", "P5"], "SpC": b, "TIC": b * 100}
+    result = compare_conditions(cond_a, cond_b)
+    assert result["proteins"] == ["P1", "P3", "P4"]
+    spc = result["SpC"]
+    np.testing.assert_allclose(spc["log2fc"], np.log2(np.nanmean(b[[1, 2, 0]], axis=1) / np.nanmean(a[[0, 2, 3]], axis=1)))
+    np.testing.assert_allclose(spc["p_welch"], welch_ttest(a[[0, 2, 3]], b[[1, 2, 0]]), equal_nan=True)
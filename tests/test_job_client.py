@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from job_client import TransientError, run_batch
+
+class FlakyBackend:
+    # Fails the first `failures` calls of each kind and ends the first `failed_jobs` jobs as "failed"
+    def __init__(self, failures=0, failed_jobs=0, always_fail=False):
+        self.calls = {"submit": 0, "status": 0, "fetch": 0}
+        self.jobs = 0
+        self.failures, self.failed_jobs, self.always_fail = failures, failed_jobs, always_fail
+
+    def _call(self, kind):
+        self.calls[kind] += 1
+        if self.always_fail or self.calls[kind] <= self.failures:
+            raise TransientError(f"{kind} unavailable")
+
+    async def submit(self, tool, fasta):
+        self._call("submit")
+        self.jobs += 1
+        return self.jobs
+
+    async def status(self, job_id):
+        self._call("status")
+        return "failed" if job_id <= self.failed_jobs else "done"
+
+    async def fetch(self, job_id):
+        self._call("fetch")
+        return f"report {job_id}"
+
+def _run(backend, retries):
+    return asyncio.run(run_batch(backend, "psortb", ">P1\nMK\n", retries=retries, backoff=0, poll_interval=0))
+
+def test_retries_are_one_budget_per_batch():
+    backend = FlakyBackend(always_fail=True)
+    with pytest.raises(TransientError):
+        _run(backend, retries=3)
+    assert backend.calls == {"submit": 4, "status": 0, "fetch": 0}
+
+def test_transient_errors_and_failed_jobs_share_the_budget():
+    backend = FlakyBackend(failures=1, failed_jobs=1)
+    # submit, status and fetch each fail once and the first job fails: 4 retries
+    assert _run(backend, retries=4) == "report 2"
+    with pytest.raises(TransientError):
+        _run(FlakyBackend(failures=1, failed_jobs=1), retries=3)
@@ -0,0 +1,57 @@
+import os
+import pytest
+from most_changed_proteins import process_workbook, PROGRESS_ROWS
+
+class Stop(Exception):
+    pass
+
+@pytest.fixture
+def workbook(tmp_path):
+    from synthetic_data import generate_study
+    return generate_study(str(tmp_path), 2500, runs=1, seed=5, kinds=("workbook",))["workbook"][0]
+
+def test_progress_reports_rows_read(workbook, tmp_path):
+    seen = []
+    summary = str(tmp_path / "summary.tsv")
+    assert process_workbook(workbook, 1, 1, str(tmp_path / "hits.txt"), summary,
+                            progress=lambda done, total: seen.append((done, total)))
+    assert [done for done, _ in seen[:-1]] == list(range(PROGRESS_ROWS, 2500, PROGRESS_ROWS))
+    assert seen[-1][0] == 2500
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_cancel_while_reading_writes_nothing(workbook, tmp_path, streaming):
+    # The GUI's progress callback raises once Cancel is pressed
+    def progress(done, total):
+        if done >= PROGRESS_ROWS:
+            raise Stop()
+    hits, summary = str(tmp_path / "hits.txt"), str(tmp_path / "summary.tsv")
+    before = os.path.getmtime(workbook)
+    with pytest.raises(Stop):
+        process_workbook(workbook, 1, 1, hits, summary if streaming else None, progress=progress)
+    assert not os.path.exists(hits) and not os.path.exists(summary)
+    assert os.path.getmtime(workbook) == before
+
+def test_cancel_after_reading_writes_nothing(workbook, tmp_path):
+    def check_cancelled():
+        raise Stop()
+    hits, summary = str(tmp_path / "hits.txt"), str(tmp_path / "summary.tsv")
+    with pytest.raises(Stop):
+        process_workbook(workbook, 1, 1, hits, summary, check_cancelled=check_cancelled)
+    assert not os.path.exists(hits) and not os.path.exists(summary)
+
+@pytest.mark.parametrize("sheet, header", [("Other", ["ProteinAC", "SpC 1"]), ("Protein list", ["ID", "SpC 1"]),
+                                           ("Protein list", ["ProteinAC", "Count"])])
+@pytest.mark.parametrize("read_only", [True, False])
+def test_unusable_workbooks_are_closed(tmp_path, monkeypatch, sheet, header, read_only):
+    import openpyxl
+    from openpyxl.workbook.workbook import Workbook
+    from most_changed_proteins import load_workbook_and_identify_columns
+    path = str(tmp_path / "bad.xlsx")
+    wb = openpyxl.Workbook()
+    wb.active.title = sheet
+    wb.active.append(header)
+    wb.save(path)
+    closed, close = [], Workbook.close
+    monkeypatch.setattr(Workbook, "close", lambda self: closed.append(self) or close(self))
+    assert load_workbook_and_identify_columns(path, read_only=read_only) == (None, None, None, None)
+    assert len(closed) == 1
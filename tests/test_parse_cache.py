@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pytest
+import parse_cache
+from parse_cache import cached_parse
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setenv("PROTEOMICS_CACHE", "1")
+    monkeypatch.setenv("PROTEOMICS_CACHE_DIR", str(directory))
+    return directory
+
+def _input(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        with open(path) as f:
+            return {"lines": np.array(f.read().splitlines(), dtype=str)}
+
+def _entries(directory):
+    return sorted(p for p in os.listdir(directory) if p.endswith(".npz")) if os.path.isdir(directory) else []
+
+def test_unchanged_content_is_a_hit(cache, tmp_path):
+    path, parse = _input(tmp_path, "a.txt", "P1\nP2\n"), CountingParser()
+    first = cached_parse(path, "lines", 1, parse)
+    second = cached_parse(path, "lines", 1, parse)
+    assert parse.calls == 1
+    assert second["lines"].tolist() == first["lines"].tolist() == ["P1", "P2"]
+    # Keyed by content, so an identical copy under another name hits too
+    cached_parse(_input(tmp_path, "copy.txt", "P1\nP2\n"), "lines", 1, parse)
+    assert parse.calls == 1 and len(_entries(cache)) == 1
+
+def test_changed_content_or_version_is_a_miss(cache, tmp_path):
+    path, parse = _input(tmp_path, "a.txt", "P1\nP2\n"), CountingParser()
+    cached_parse(path, "lines", 1, parse)
+    _input(tmp_path, "a.txt", "P1\nP3\n")
+    assert cached_parse(path, "lines", 1, parse)["lines"].tolist() == ["P1", "P3"]
+    cached_parse(path, "lines", 2, parse)
+    assert parse.calls == 3 and len(_entries(cache)) == 3
+
+def test_least_recently_used_entries_are_evicted(cache, tmp_path, monkeypatch):
+    parse = CountingParser()
+    paths = [_input(tmp_path, f"{i}.txt", f"P{i}\n" * 50) for i in range(3)]
+    cached_parse(paths[0], "lines", 1, parse)
+    entry_size = os.path.getsize(cache / _entries(cache)[0])
+    monkeypatch.setenv("PROTEOMICS_CACHE_MAX_BYTES", str(2 * entry_size))
+    cached_parse(paths[1], "lines", 1, parse)
+    # Both entries look old (mtime resolution can be coarse); a hit then makes entry 0 the most recent
+    for name in _entries(cache):
+        os.utime(cache / name, (1000, 1000))
+    cached_parse(paths[0], "lines", 1, parse)
+    assert parse.calls == 2
+    cached_parse(paths[2], "lines", 1, parse)        # over the limit: entry 1 goes
+    assert len(_entries(cache)) == 2
+    cached_parse(paths[0], "lines", 1, parse)
+    assert parse.calls == 3
+    cached_parse(paths[1], "lines", 1, parse)
+    assert parse.calls == 4
+
+def test_disabled_cache_always_parses_and_writes_nothing(cache, tmp_path, monkeypatch):
+    monkeypatch.setenv("PROTEOMICS_CACHE", "0")
+    path, parse = _input(tmp_path, "a.txt", "P1\n"), CountingParser()
+    cached_parse(path, "lines", 1, parse)
+    cached_parse(path, "lines", 1, parse)
+    assert parse.calls == 2 and not os.path.exists(cache)
+
+def test_unusable_files_are_not_cached(cache, tmp_path):
+    path = _input(tmp_path, "a.txt", "")
+    assert cached_parse(path, "lines", 1, lambda p: None) is None
+    assert _entries(cache) == []
+    parse_cache.clear(str(cache))
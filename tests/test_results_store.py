@@ -0,0 +1,78 @@
+from concurrent.futures import ProcessPoolExecutor
+from Cleaner import clean_batch
+from results_store import create_store, connect, store_localization, summarize_store, find_proteins, store_abundance
+
+RECORDS = [(f"sp|P{i:05d}|PROT{i}_ECOLI", "Cytoplasmic" if i % 2 else "OuterMembrane") for i in range(2000)]
+
+def _cello_report(path, n=500):
+    with open(path, "w") as f:
+        f.write("CELLO RESULTS\n")
+        for i in range(n):
+            f.write(f"SeqID: sp|P{i:05d}|PROT{i}_ECOLI\tExtracellular\t0.1\tPeriplasmic\t0.2\tOuterMembrane\t0.9\n")
+
+def test_parallel_loads_into_one_store(tmp_path):
+    # Every worker writes its own run at the same time; none may fail with "database is locked"
+    for round_ in range(5):
+        db = str(tmp_path / f"results{round_}.db")
+        create_store(db)
+        runs = [f"run{i}" for i in range(12)]
+        with ProcessPoolExecutor(max_workers=12) as pool:
+            counts = list(pool.map(store_localization, [db] * 12, runs, ["cello"] * 12, [RECORDS] * 12))
+        assert counts == [len(RECORDS)] * 12
+        conn = connect(db)
+        assert {run: n["localization"] for run, n in summarize_store(conn).items()} == dict.fromkeys(runs, 2000)
+        conn.close()
+
+def test_cleaner_batch_loads_a_new_store_in_parallel(tmp_path):
+    paths = []
+    for i in range(8):
+        paths.append(str(tmp_path / f"run{i}_cello.txt"))
+        _cello_report(paths[-1])
+    db = str(tmp_path / "results.db")
+    results = clean_batch("cello", paths, workers=8, store=db)
+    assert [error for _, _, error in results] == [None] * 8
+    conn = connect(db)
+    counts = summarize_store(conn)
+    conn.close()
+    # The "CELLO RESULTS" title line is not stored as a protein
+    assert {run: n["localization"] for run, n in counts.items()} == {f"run{i}": 500 for i in range(8)}
+
+def test_reloading_a_run_replaces_its_rows(tmp_path):
+    db = str(tmp_path / "results.db")
+    store_localization(db, "run1", "psortb", RECORDS)
+    store_localization(db, "run1", "psortb", RECORDS[:10])
+    store_localization(db, "run1", "cello", RECORDS[:5])
+    conn = connect(db)
+    assert summarize_store(conn)["run1"]["localization"] == 15
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+def test_find_combines_abundance_and_localization(tmp_path):
+    db = str(tmp_path / "results.db")
+    store_abundance(db, "run1", [("P00001", 12.0, 100.0) + (None,) * 8, ("P00002", 3.0, 50.0) + (None,) * 8])
+    store_localization(db, "run1", "psortb", RECORDS[:3])
+    conn = connect(db)
+    rows = find_proteins(conn, runs=["run1"], min_spc=10, localizations=["Cytoplasmic"])
+    conn.close()
+    assert [(r[0], r[1], r[2]) for r in rows] == [("run1", "P00001", 12.0)]
+
+def test_find_output_keeps_full_float_precision(tmp_path):
+    from results_store import main
+    db, hits = str(tmp_path / "results.db"), str(tmp_path / "hits.tsv")
+    store_abundance(db, "run1", [("P00001", 81169.07, 2621060.125) + (None,) * 8])
+    assert main(["find", db, "-o", hits]) == 0
+    with open(hits) as f:
+        row = f.read().splitlines()[1].split("\t")
+    assert float(row[2]) == 81169.07 and float(row[3]) == 2621060.125
+
+def test_find_matches_eggnog_ids_to_localized_accessions(tmp_path):
+    from results_store import store_cog_map
+    db = str(tmp_path / "results.db")
+    store_abundance(db, "run1", [(f"P0000{i}", 5.0, 10.0) + (None,) * 8 for i in range(3)])
+    store_cog_map(db, "run1", {"M": ["sp|P00001|PROT1_ECOLI", "sp|P00002|PROT2_ECOLI"], "K": ["P00001"]})
+    store_localization(db, "run1", "psortb", RECORDS[:3])
+    conn = connect(db)
+    rows = find_proteins(conn, runs=["run1"], localizations=["Cytoplasmic"], cogs=["M"])
+    assert conn.execute("SELECT COUNT(*) FROM cog").fetchone()[0] == 3
+    conn.close()
+    assert [(r[1], r[6], r[7]) for r in rows] == [("P00001", "KM", "psortb:Cytoplasmic")]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from threshold_index import ThresholdIndex
+
+def _brute_force(proteins, avg_spc, avg_tic, min_spc, min_tic):
+    return [p for p, spc, tic in zip(proteins, avg_spc, avg_tic) if spc >= min_spc and tic >= min_tic]
+
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 64, 100, 1000])
+def test_queries_match_a_brute_force_filter(n):
+    rng = np.random.default_rng(n)
+    # Few distinct values, so cutoffs fall on ties; some averages missing
+    avg_spc = rng.integers(0, 12, n).astype(float)
+    avg_tic = rng.integers(0, 12, n).astype(float) * 1000
+    avg_spc[rng.random(n) < 0.05] = np.nan
+    avg_tic[rng.random(n) < 0.05] = np.nan
+    proteins = [f"P{i:05d}" for i in range(n)]
+    index = ThresholdIndex.build(proteins, avg_spc, avg_tic)
+    for min_spc in (-np.inf, 0, 0.5, 3, 6, 11, 12):
+        for min_tic in (-np.inf, 0, 2500, 6000, 11000, 12000):
+            expected = _brute_force(proteins, avg_spc, avg_tic, min_spc, min_tic)
+            assert index.query(min_spc, min_tic) == expected
+            assert index.count(min_spc, min_tic) == len(expected)
+
+def test_a_saved_index_answers_the_same(tmp_path):
+    rng = np.random.default_rng(1)
+    avg_spc, avg_tic = rng.gamma(2, 5, 500).round(2), rng.gamma(2, 5000, 500).round(2)
+    proteins = [f"P{i:05d}" for i in range(500)]
+    index = ThresholdIndex.build(proteins, avg_spc, avg_tic)
+    loaded = ThresholdIndex.load(index.save(str(tmp_path / "run.thresholds.npz")))
+    for min_spc, min_tic in [(0, 0), (5, 5000), (10.5, 12000.25), (40, 0)]:
+        assert loaded.query(min_spc, min_tic) == index.query(min_spc, min_tic) \
+            == _brute_force(proteins, avg_spc, avg_tic, min_spc, min_tic)
+
+def test_a_workbook_index_matches_most_changed_proteins(tmp_path):
+    from synthetic_data import generate_study
+    from most_changed_proteins import load_replicate_data, summarize_replicates, select_most_changed
+    workbook = generate_study(str(tmp_path), 300, runs=1, seed=7, kinds=("workbook",))["workbook"][0]
+    index = ThresholdIndex.from_workbook(workbook)
+    proteins, spc_values, tic_values = load_replicate_data(workbook)
+    spc_stats, tic_stats = summarize_replicates(spc_values), summarize_replicates(tic_values)
+    for min_spc, min_tic in [(0, 0), (5, 1000), (10, 20000), (25, 50000)]:
+        assert index.query(min_spc, min_tic) == select_most_changed(proteins, spc_stats, tic_stats, min_spc, min_tic)
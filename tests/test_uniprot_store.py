@@ -0,0 +1,70 @@
+import sqlite3
+import pytest
+from uniprot_store import build_store, connect, lookup
+
+FLAT_FILE = """ID   ACCA_ECOLI              Reviewed;          12 AA.
+AC   P0ABD5; P30867;
+SQ   SEQUENCE   12 AA;
+     MSLNFLDFEQ PI
+//
+ID   ACCD_ECOLI              Reviewed;          10 AA.
+AC   P0A9Q5;
+SQ   SEQUENCE   10 AA;
+     MSWIERIKSN
+//
+"""
+
+def _flat_file(tmp_path, text=FLAT_FILE):
+    path = tmp_path / "uniprot.txt"
+    path.write_text(text)
+    return str(path)
+
+def _counts(db):
+    conn = sqlite3.connect(db)
+    counts = [conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("entries", "accessions", "xrefs")]
+    conn.close()
+    return counts
+
+def test_building_twice_does_not_duplicate_rows(tmp_path):
+    db, flat = str(tmp_path / "uniprot.db"), _flat_file(tmp_path)
+    idmapping = tmp_path / "idmapping.dat"
+    idmapping.write_text("P0ABD5\tGene_Name\taccA\nP0A9Q5\tGene_Name\taccD\n")
+    assert build_store(db, [flat], [str(idmapping)]) == (2, 2)
+    assert build_store(db, [flat], [str(idmapping)]) == (2, 0)
+    assert _counts(db) == [2, 3, 2]
+    conn = connect(db)
+    mapped, unmapped = lookup(conn, ["P30867", "accD", "ACCA_ECOLI", "P99999"])
+    conn.close()
+    assert [(ident, fasta_id, sequence) for ident, fasta_id, sequence, _ in mapped] == [
+        ("P30867", "ACCA", "MSLNFLDFEQPI"), ("accD", "ACCD", "MSWIERIKSN"), ("ACCA_ECOLI", "ACCA", "MSLNFLDFEQPI")]
+    assert unmapped == ["P99999"]
+
+def test_a_reloaded_entry_is_updated_in_place(tmp_path):
+    db = str(tmp_path / "uniprot.db")
+    build_store(db, [_flat_file(tmp_path)])
+    build_store(db, [_flat_file(tmp_path, FLAT_FILE.replace("MSWIERIKSN", "MSWIERIKSA"))])
+    conn = connect(db)
+    (_, _, sequence, _), = lookup(conn, ["P0A9Q5"])[0]
+    conn.close()
+    assert sequence == "MSWIERIKSA"
+    assert _counts(db)[:2] == [2, 3]
+
+def test_a_failed_build_leaves_the_store_unchanged(tmp_path):
+    db = str(tmp_path / "uniprot.db")
+    build_store(db, [_flat_file(tmp_path)])
+    with pytest.raises(OSError):
+        build_store(db, [_flat_file(tmp_path, FLAT_FILE.replace("ACCA", "ACCB")), str(tmp_path / "missing.txt")])
+    assert _counts(db) == [2, 3, 0]
+
+def test_an_unknown_excel_column_is_a_usage_error(tmp_path, capsys):
+    import pandas as pd
+    from uniprot_store import main
+    db = str(tmp_path / "uniprot.db")
+    build_store(db, [_flat_file(tmp_path)])
+    proteins = str(tmp_path / "proteins.xlsx")
+    pd.DataFrame({"Shared Proteins": ["P11111"], "Unique to run1.xlsx": ["P22222"]}).to_excel(proteins, index=False)
+    with pytest.raises(SystemExit) as exit_info:
+        main(["fasta", db, proteins, "--column", "Nope"])
+    assert exit_info.value.code == 2
+    error = capsys.readouterr().err
+    assert "no column 'Nope'" in error and "Shared Proteins, Unique to run1.xlsx" in error
@@ -0,0 +1,178 @@
+import os
+import sys
+import argparse
+import numpy as np
+from most_changed_proteins import load_replicate_data, summarize_replicates, average_column
+
+# -------------------------
+# Threshold index
+# -------------------------
+# Proteins are sorted by average SpC (descending), so "SpC >= min" is always a prefix of that order.
+# Level L cuts the order into aligned blocks of 2**L proteins and keeps each block sorted by TIC.
+# Any prefix is the union of at most log2(n) such blocks (one per set bit of its length), so a
+# (min SpC, min TIC) query is a binary search per block: O(log² n) to count, + O(k) to list.
+
+INDEX_SUFFIX = ".thresholds.npz"
+
+class ThresholdIndex:
+    def __init__(self, proteins, avg_spc, avg_tic, levels):
+        self.proteins = proteins          # workbook order
+        self.avg_spc = avg_spc
+        self.avg_tic = avg_tic
+        self.levels = levels              # [(tic sorted within blocks, protein indices)] per level
+        order = levels[0][1]
+        self._neg_spc = -avg_spc[order]   # ascending, for searchsorted
+
+    @classmethod
+    def build(cls, proteins, avg_spc, avg_tic):
+        avg_spc = np.asarray(avg_spc, dtype=float)
+        avg_tic = np.asarray(avg_tic, dtype=float)
+        n = len(avg_spc)
+        by_spc = np.argsort(-avg_spc, kind="stable")
+        tic_by_pos = avg_tic[by_spc]
+        positions = np.arange(n)
+        levels = []
+        for level in range(max(n, 1).bit_length()):
+            within_blocks = np.lexsort((tic_by_pos, positions >> level))
+            levels.append((tic_by_pos[within_blocks], by_spc[within_blocks]))
+        return cls(np.asarray(proteins, dtype=str), avg_spc, avg_tic, levels)
+
+    @classmethod
+    def from_workbook(cls, file_path):
+        data = load_replicate_data(file_path)
+        if data is None:
+            raise ValueError(f"{os.path.basename(file_path)}: no usable 'Protein list' sheet")
+        proteins, spc_values, tic_values = data
+        return cls.build([str(p) for p in proteins],
+                         average_column(summarize_replicates(spc_values)),
+                         average_column(summarize_replicates(tic_values)))
+
+    def save(self, path):
+        arrays = {"proteins": self.proteins, "avg_spc": self.avg_spc, "avg_tic": self.avg_tic}
+        for level, (tic, order) in enumerate(self.levels):
+            arrays[f"tic_{level}"] = tic
+            arrays[f"order_{level}"] = order
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            levels = []
+            while f"tic_{len(levels)}" in data:
+                levels.append((data[f"tic_{len(levels)}"], data[f"order_{len(levels)}"]))
+            return cls(data["proteins"], data["avg_spc"], data["avg_tic"], levels)
+
+    def _blocks(self, min_spc):
+        # (level, start) of the aligned blocks that make up the "SpC >= min_spc" prefix
+        prefix = int(np.searchsorted(self._neg_spc, -min_spc, side="right"))
+        start = 0
+        for level in reversed(range(prefix.bit_length())):
+            if prefix & (1 << level):
+                yield level, start
+                start += 1 << level
+
+    @staticmethod
+    def _passing(tic, min_tic):
+        # Slice bounds of the TIC-sorted block values >= min_tic; NaN averages sort last and never pass
+        return int(np.searchsorted(tic, min_tic, side="left")), int(np.searchsorted(tic, np.inf, side="right"))
+
+    def count(self, min_spc, min_tic):
+        total = 0
+        for level, start in self._blocks(min_spc):
+            first, end = self._passing(self.levels[level][0][start:start + (1 << level)], min_tic)
+            total += end - first
+        return total
+
+    def query(self, min_spc, min_tic):
+        # Proteins with average SpC >= min_spc and average TIC >= min_tic, in workbook order
+        hits = []
+        for level, start in self._blocks(min_spc):
+            tic, order = self.levels[level]
+            first, end = self._passing(tic[start:start + (1 << level)], min_tic)
+            hits.append(order[start + first:start + end])
+        if not hits:
+            return []
+        return self.proteins[np.sort(np.concatenate(hits))].tolist()
+
+def index_path_for(workbook_path):
+    return os.path.splitext(workbook_path)[0] + INDEX_SUFFIX
+
+def open_index(path):
+    # Accepts a saved index or a workbook; a workbook's index is (re)built when missing or older than it
+    if path.endswith(INDEX_SUFFIX):
+        return ThresholdIndex.load(path)
+    cached = index_path_for(path)
+    if os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(path):
+        return ThresholdIndex.load(cached)
+    index = ThresholdIndex.from_workbook(path)
+    index.save(cached)
+    return index
+
+def write_grid(index, spc_values, tic_values, output_path, lists_dir=None):
+    # One row per (min SpC, min TIC) pair with its protein count; optionally each list as its own file
+    if lists_dir:
+        os.makedirs(lists_dir, exist_ok=True)
+    with open(output_path, "w") as out:
+        out.write("min_SpC\tmin_TIC\tcount\n")
+        for min_spc in spc_values:
+            for min_tic in tic_values:
+                if lists_dir:
+                    proteins = index.query(min_spc, min_tic)
+                    count = len(proteins)
+                    list_path = os.path.join(lists_dir, f"SpC_{min_spc:g}_TIC_{min_tic:g}.txt")
+                    with open(list_path, "w") as f:
+                        f.writelines(p + "\n" for p in proteins)
+                else:
+                    count = index.count(min_spc, min_tic)
+                out.write(f"{min_spc:g}\t{min_tic:g}\t{count}\n")
+    return output_path
+
+def _float_list(text):
+    return [float(v) for v in text.split(",") if v.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="threshold_index.py",
+        description="Build a reusable index over per-protein SpC/TIC averages and query any cutoffs instantly.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="index a workbook's 'Protein list' sheet")
+    build.add_argument("workbook")
+    build.add_argument("-o", "--output", help=f"index file (default: <workbook>{INDEX_SUFFIX})")
+
+    query = commands.add_parser("query", help="list proteins passing one (min SpC, min TIC) pair")
+    query.add_argument("source", help=f"workbook or {INDEX_SUFFIX} index")
+    query.add_argument("--min-spc", type=float, required=True)
+    query.add_argument("--min-tic", type=float, required=True)
+    query.add_argument("-o", "--output", help="text file for the protein list (default: print count only)")
+
+    grid = commands.add_parser("grid", help="protein counts for every combination of cutoffs")
+    grid.add_argument("source", help=f"workbook or {INDEX_SUFFIX} index")
+    grid.add_argument("--spc", type=_float_list, required=True, help="comma-separated SpC cutoffs")
+    grid.add_argument("--tic", type=_float_list, required=True, help="comma-separated TIC cutoffs")
+    grid.add_argument("-o", "--output", default="threshold_grid.tsv")
+    grid.add_argument("--lists", help="also write each protein list into this directory")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        path = ThresholdIndex.from_workbook(args.workbook).save(args.output or index_path_for(args.workbook))
+        print(f"Index written to {path}")
+    elif args.command == "query":
+        index = open_index(args.source)
+        if args.output:
+            proteins = index.query(args.min_spc, args.min_tic)
+            with open(args.output, "w") as f:
+                f.writelines(p + "\n" for p in proteins)
+            print(f"{len(proteins)} proteins saved to {args.output}")
+        else:
+            print(index.count(args.min_spc, args.min_tic))
+    else:
+        index = open_index(args.source)
+        write_grid(index, args.spc, args.tic, args.output, args.lists)
+        print(f"Threshold grid saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import os
+import re
+import sys
+import sqlite3
+import argparse
+from Cleaner import open_text, read_accession_list, write_fasta_index
+
+# -------------------------
+# Offline UniProt mapping store
+# -------------------------
+# Replaces the UniProt ID-mapping website (README "FIRST" steps 1-7). Downloaded UniProt flat files
+# (uniprot_sprot.dat.gz, proteome .txt exports, ...) and optionally the idmapping.dat(.gz) file are
+# loaded once into an indexed SQLite database; protein lists are then turned into the same
+# _cleaned.fasta that Cleaner.py writes (">{ID line prefix}\n{sequence}\n"), without network access.
+
+# The unique keys double as the lookup indexes and make loading the same file again a no-op
+# (an entry loaded again is updated in place)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,   -- e.g. ACCA_ECOLI
+    fasta_id TEXT NOT NULL,      -- header used by Cleaner.py, e.g. ACCA
+    sequence TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS accessions (
+    accession TEXT NOT NULL,     -- primary and secondary accessions
+    entry_id INTEGER NOT NULL REFERENCES entries(id),
+    is_primary INTEGER NOT NULL,
+    UNIQUE (accession, entry_id)
+);
+CREATE TABLE IF NOT EXISTS xrefs (
+    external_id TEXT NOT NULL,   -- e.g. a RefSeq, EMBL or gene name from idmapping.dat
+    id_type TEXT NOT NULL,
+    accession TEXT NOT NULL,
+    UNIQUE (external_id, id_type, accession)
+);
+"""
+
+BATCH_SIZE = 10000
+NON_RESIDUE = re.compile(r"[^A-Za-z]+")
+
+def iter_flat_file_records(path):
+    # Yields (entry name, [accessions], sequence) per UniProt record ("//" terminated)
+    name, accessions, seq, in_seq = None, [], [], False
+    with open_text(path) as f:
+        for line in f:
+            code = line[:2]
+            if code == "ID":
+                name, accessions, seq, in_seq = line.split()[1], [], [], False
+            elif code == "AC":
+                accessions.extend(a for a in line[2:].replace(";", " ").split())
+            elif code == "SQ":
+                in_seq = True
+            elif code == "//":
+                if name:
+                    yield name, accessions, "".join(seq)
+                name, accessions, seq, in_seq = None, [], [], False
+            elif in_seq:
+                seq.append(NON_RESIDUE.sub("", line))
+
+def iter_idmapping(path):
+    # idmapping.dat: accession <tab> ID type <tab> external ID
+    with open_text(path) as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 3:
+                yield parts[2], parts[1], parts[0]
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def _batched(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def build_store(db_path, flat_files, idmapping_files=()):
+    # Loads flat files (and ID mapping tables) into the database in one transaction, so an
+    # interrupted build leaves the database as it was. Entries already in the store (same entry
+    # name) are updated, and cross-references already in it are skipped.
+    # Returns (entries, cross-references) loaded.
+    conn = connect(db_path)
+    n_entries = n_xrefs = 0
+    try:
+        if not any(unique for _, _, unique, *_ in conn.execute("PRAGMA index_list(entries)")):
+            raise ValueError(f"{db_path} was built by an older version without unique keys; build into a new file")
+        with conn:
+            for path in flat_files:
+                for batch in _batched(iter_flat_file_records(path)):
+                    conn.executemany(
+                        "INSERT INTO entries (name, fasta_id, sequence) VALUES (?, ?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET fasta_id = excluded.fasta_id, sequence = excluded.sequence",
+                        ((name, name.split("_")[0], sequence) for name, _, sequence in batch))
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO accessions SELECT ?, id, ? FROM entries WHERE name = ?",
+                        ((acc, int(i == 0), name) for name, accessions, _ in batch for i, acc in enumerate(accessions)))
+                    n_entries += len(batch)
+            for path in idmapping_files:
+                for batch in _batched(iter_idmapping(path)):
+                    before = conn.total_changes
+                    conn.executemany("INSERT OR IGNORE INTO xrefs VALUES (?, ?, ?)", batch)
+                    n_xrefs += conn.total_changes - before
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return n_entries, n_xrefs
+
+def lookup(conn, identifiers):
+    # Maps identifiers (accessions, entry names or idmapping IDs) to entries in one set-based query.
+    # Returns ([(identifier, fasta_id, sequence, entry id)] in input order, [unmapped identifiers]).
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS query (pos INTEGER PRIMARY KEY, ident TEXT)")
+    conn.execute("DELETE FROM query")
+    conn.executemany("INSERT INTO query VALUES (?, ?)", enumerate(identifiers))
+    rows = conn.execute("""
+        SELECT q.pos, q.ident, e.fasta_id, e.sequence, e.id FROM query q
+        JOIN entries e ON e.id = COALESCE(
+            (SELECT a.entry_id FROM accessions a WHERE a.accession = q.ident ORDER BY a.is_primary DESC LIMIT 1),
+            (SELECT n.id FROM entries n WHERE n.name = q.ident LIMIT 1),
+            (SELECT a.entry_id FROM xrefs x JOIN accessions a ON a.accession = x.accession
+             WHERE x.external_id = q.ident ORDER BY a.is_primary DESC LIMIT 1))
+        ORDER BY q.pos""").fetchall()
+    found = {pos for pos, *_ in rows}
+    unmapped = [ident for pos, ident in enumerate(identifiers) if pos not in found]
+    return [(ident, fasta_id, sequence, entry_id) for _, ident, fasta_id, sequence, entry_id in rows], unmapped
+
+def write_cleaned_fasta(conn, identifiers, output_path):
+    # Same layout as Cleaner.py's _cleaned.fasta (plus its .fai index); each entry is written once
+    mapped, unmapped = lookup(conn, identifiers)
+    written, seen = 0, set()
+    with open(output_path, "w") as out:
+        for ident, fasta_id, sequence, entry_id in mapped:
+            if not sequence:
+                # Cleaner.py never writes records without sequence lines either
+                unmapped.append(ident)
+                continue
+            if entry_id in seen:
+                continue
+            seen.add(entry_id)
+            out.write(f">{fasta_id}\n{sequence}\n")
+            written += 1
+    write_fasta_index(output_path)
+    return written, unmapped
+
+def read_identifier_list(path, column=None):
+    # Text lists (most_changed_proteins.py) or Excel output (protein_exclusivity.py); for Excel,
+    # every non-empty cell of the first sheet is used, or only the given column (ValueError if the
+    # sheet has no such column)
+    if os.path.splitext(path)[1].lower() not in (".xlsx", ".xls"):
+        return read_accession_list(path)
+    import pandas as pd
+    df = pd.read_excel(path, dtype=str)
+    if column and column not in df.columns:
+        raise ValueError(f"{os.path.basename(path)} has no column '{column}'; "
+                         f"its columns are: {', '.join(map(str, df.columns))}")
+    values = df[column] if column else df.stack()
+    return list(dict.fromkeys(v.strip() for v in values.dropna() if v.strip()))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="uniprot_store.py",
+        description="Local UniProt ID mapping: build an indexed SQLite store once, then write cleaned FASTA offline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="load UniProt flat files into the store")
+    build.add_argument("db", help="SQLite database file (created if missing)")
+    build.add_argument("flat_files", nargs="*", help="UniProt text/flat files (.dat, .txt, optionally .gz)")
+    build.add_argument("--idmapping", action="append", default=[],
+                       help="UniProt idmapping.dat(.gz) for non-UniProt identifiers (repeatable)")
+    fasta = commands.add_parser("fasta", help="write _cleaned.fasta for a protein list")
+    fasta.add_argument("db")
+    fasta.add_argument("proteins", help="text list (one ID per line) or Excel file")
+    fasta.add_argument("--column", help="Excel column to read, e.g. 'Shared Proteins'")
+    fasta.add_argument("-o", "--output", help="output FASTA (default: <list>_cleaned.fasta)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        try:
+            entries, xrefs = build_store(args.db, args.flat_files, args.idmapping)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+        print(f"Loaded {entries} entries and {xrefs} new cross-references into {args.db}")
+        return 0
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist; run 'build' first")
+    output_path = args.output or os.path.splitext(args.proteins)[0] + "_cleaned.fasta"
+    try:
+        identifiers = read_identifier_list(args.proteins, args.column)
+    except ValueError as e:
+        parser.error(str(e))
+    conn = connect(args.db)
+    written, unmapped = write_cleaned_fasta(conn, identifiers, output_path)
+    conn.close()
+    print(f"{written} sequences written to {output_path}")
+    if unmapped:
+        print(f"{len(unmapped)} identifiers not found: {', '.join(unmapped[:20])}"
+              + (" ..." if len(unmapped) > 20 else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())